@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""Benchmark building, parsing, and storing DiffX DOM sections.
+
+This reports how many sections per second can be built using the DOM API,
+parsed into a DOM with :py:meth:`DiffX.from_bytes()
+<pydiffx.dom.objects.DiffX.from_bytes>`, and read with the lower-level
+:py:class:`~pydiffx.reader.DiffXReader` (for comparison), along with the
+memory used by the parsed DOM.
+
+Usage:
+
+    python benchmarks/dom_sections.py [--changes N] [--files N]
+"""
+
+import argparse
+import gc
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                                '..')))
+
+from pydiffx.dom.objects import DiffX
+from pydiffx.reader import DiffXReader
+
+
+DIFF = (
+    b'--- a\n'
+    b'+++ b\n'
+    b'@@ -1 +1 @@\n'
+    b'-a\n'
+    b'+b\n'
+)
+
+
+def build_diffx(num_changes, num_files):
+    """Build a DiffX DOM.
+
+    Args:
+        num_changes (int):
+            The number of changes to add.
+
+        num_files (int):
+            The number of files to add to each change.
+
+    Returns:
+        pydiffx.dom.objects.DiffX:
+        The resulting DiffX DOM.
+    """
+    diffx = DiffX()
+
+    for change_num in range(num_changes):
+        change = diffx.add_change()
+
+        for file_num in range(num_files):
+            diff_file = change.add_file()
+            diff_file.meta = {
+                'path': 'file%d' % file_num,
+            }
+            diff_file.diff = DIFF
+            diff_file.diff_line_endings = 'unix'
+
+    return diffx
+
+
+def count_sections(diffx):
+    """Return the number of sections in a DiffX DOM.
+
+    Args:
+        diffx (pydiffx.dom.objects.DiffX):
+            The DiffX DOM.
+
+    Returns:
+        int:
+        The number of sections.
+    """
+    num_sections = 0
+    pending = [diffx]
+
+    while pending:
+        section = pending.pop()
+        num_sections += 1
+        pending += getattr(section, 'subsections', [])
+
+    return num_sections
+
+
+def time_best(func, repeat):
+    """Return the fastest time for a function out of several runs.
+
+    Args:
+        func (callable):
+            The function to time.
+
+        repeat (int):
+            The number of times to run the function.
+
+    Returns:
+        float:
+        The fastest run time, in seconds.
+    """
+    times = []
+
+    for i in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    return min(times)
+
+
+def measure_memory(data):
+    """Return the memory used by a DOM parsed from DiffX data.
+
+    Args:
+        data (bytes):
+            The DiffX data to parse.
+
+    Returns:
+        int:
+        The number of bytes allocated for the DOM.
+    """
+    gc.collect()
+    tracemalloc.start()
+
+    try:
+        diffx = DiffX.from_bytes(data)
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+    del diffx
+
+    return size
+
+
+def main():
+    """Run the benchmarks."""
+    parser = argparse.ArgumentParser(
+        description='Benchmark building and parsing DiffX DOM sections.')
+    parser.add_argument('--changes',
+                        type=int,
+                        default=10,
+                        help='The number of changes to generate.')
+    parser.add_argument('--files',
+                        type=int,
+                        default=2000,
+                        help='The number of files in each change.')
+    parser.add_argument('--repeat',
+                        type=int,
+                        default=5,
+                        help='The number of times to run each benchmark.')
+    options = parser.parse_args()
+
+    diffx = build_diffx(options.changes, options.files)
+    num_sections = count_sections(diffx)
+    data = diffx.to_bytes()
+    del diffx
+
+    print('Sections: %d' % num_sections)
+
+    elapsed = time_best(lambda: build_diffx(options.changes, options.files),
+                        options.repeat)
+    print('Build:  %10.0f sections/sec' % (num_sections / elapsed))
+
+    elapsed = time_best(lambda: DiffX.from_bytes(data), options.repeat)
+    print('Parse:  %10.0f sections/sec' % (num_sections / elapsed))
+
+    elapsed = time_best(lambda: list(DiffXReader(io.BytesIO(data))),
+                        options.repeat)
+    print('Reader: %10.0f sections/sec' % (num_sections / elapsed))
+
+    print('Parsed DOM: %.1f MiB' % (measure_memory(data) / 1048576.0))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,21 @@
+"""asyncio support for reading and writing DiffX files.
+
+This module provides convenience imports for the asyncio reader and writer:
+
+.. autosummary::
+   :nosignatures:
+
+   ~pydiffx.aio.reader.AsyncDiffXReader
+   ~pydiffx.aio.writer.AsyncDiffXWriter
+"""
+
+from pydiffx.aio.reader import AsyncDiffXReader
+from pydiffx.aio.writer import AsyncDiffXWriter
+
+
+__all__ = (
+    'AsyncDiffXReader',
+    'AsyncDiffXWriter',
+)
+
+__autodoc_excludes__ = __all__
@@ -0,0 +1,242 @@
+"""An asyncio streaming reader for DiffX files."""
+
+import asyncio
+
+from pydiffx.reader import BaseDiffXReader
+from pydiffx.sections import CONTENT_SECTIONS
+
+
+class AsyncDiffXReader(BaseDiffXReader):
+    """An asyncio streaming reader for DiffX files.
+
+    This is the asyncio counterpart to :py:class:`~pydiffx.reader.DiffXReader`.
+    It reads from an :py:class:`asyncio.StreamReader` (or any object
+    providing awaitable ``readuntil()`` and ``readexactly()`` methods), such
+    as the body of a request in an asyncio web server, without blocking the
+    event loop or buffering the whole file.
+
+    Sections are parsed and validated exactly as they are by
+    :py:class:`~pydiffx.reader.DiffXReader`, and the same information is
+    returned for each section. See
+    :py:meth:`DiffXReader.iter_sections
+    <pydiffx.reader.DiffXReader.iter_sections>` for details.
+
+    Example:
+        .. code-block:: python
+
+           async for section in AsyncDiffXReader(stream):
+               ...
+    """
+
+    #: The maximum amount of data read at once when skipping content.
+    #:
+    #: Type:
+    #:     int
+    SKIP_CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, stream, json_codec=None):
+        """Initialize the reader.
+
+        Args:
+            stream (asyncio.StreamReader):
+                The stream to read from.
+
+            json_codec (pydiffx.json_codecs.BaseJSONCodec, optional):
+                The codec used to decode JSON metadata. This defaults to
+                the result of
+                :py:func:`~pydiffx.json_codecs.get_default_json_codec`.
+        """
+        super(AsyncDiffXReader, self).__init__(json_codec=json_codec)
+
+        self._stream = stream
+
+    def __aiter__(self):
+        """Iterate through all sections of a DiffX file.
+
+        This is a convenience wrapper around :py:meth:`iter_sections`. See
+        that method for details.
+
+        Yields:
+            dict:
+            Information on the section.
+
+        Raises:
+            pydiffx.errors.DiffXParseError:
+                The file or a section was unable to be parsed. Information
+                will be provided in the message and the instance's attributes.
+        """
+        return self.iter_sections()
+
+    async def iter_sections(self, file_filter=None, lazy_metadata=False,
+                            section_records=False):
+        """Iterate through all sections of a DiffX file.
+
+        Each section will be read from the stream as it's requested. The
+        information returned for each section matches that of
+        :py:meth:`DiffXReader.iter_sections
+        <pydiffx.reader.DiffXReader.iter_sections>`.
+
+        Note:
+            If any given section fails to parse, an error will be raised and
+            parsing will stop.
+
+        Args:
+            file_filter (callable, optional):
+                A function used to choose which files to return. This takes
+                the file's metadata dictionary as its only argument, and
+                returns whether the file should be returned.
+
+                The diffs of files that don't match will be skipped without
+                being decoded.
+
+            lazy_metadata (bool, optional):
+                Whether to defer decoding the JSON in metadata sections until
+                the metadata is first accessed.
+
+            section_records (bool, optional):
+                Whether to return each section as a
+                :py:class:`~pydiffx.reader.DiffXSectionInfo` rather than a
+                dictionary.
+
+        Yields:
+            dict or pydiffx.reader.DiffXSectionInfo:
+            Information on the section.
+
+        Raises:
+            pydiffx.errors.DiffXParseError:
+                The file or a section was unable to be parsed. Information
+                will be provided in the message and the instance's attributes.
+        """
+        self._begin_sections(file_filter=file_filter,
+                             lazy_metadata=lazy_metadata,
+                             section_records=section_records)
+
+        while True:
+            section = await self._read_header()
+
+            if section is None:
+                # We've read the last section. We're done parsing.
+                break
+
+            encoding = self._start_section(section)
+            section_id, level, linenum, options = \
+                self._get_section_fields(section)
+
+            if section_id in CONTENT_SECTIONS:
+                length = options['length']
+
+                if self._skipping_file:
+                    # This belongs to a file that was filtered out. Skip
+                    # past it. Line numbers can't be tracked from here on.
+                    self._check_skipped_content(
+                        length=length,
+                        skipped=await self._skip_bytes(length),
+                        linenum=linenum)
+                    self._linenum = None
+                else:
+                    data = await self._read_bytes(length)
+                    content, num_lines = self._decode_content(
+                        section_id=section_id,
+                        data=data,
+                        options=options,
+                        encoding=encoding,
+                        linenum=linenum)
+
+                    if self._linenum is not None:
+                        self._linenum += num_lines
+
+                    self._set_section_field(section,
+                                            self._CONTENT_KEYS[section_id],
+                                            content)
+
+            # Pass the section (along with any held back before it) up to
+            # the caller for processing.
+            for ready_section in self._finish_section(section):
+                yield ready_section
+
+    async def _read_header(self):
+        """Read a header at the current position within the stream.
+
+        Any blank lines before the header will be skipped. The header will
+        then be parsed and validated by :py:meth:`_parse_header`.
+
+        Returns:
+            dict:
+            Information on the section for further processing. This will be
+            ``None`` if we've reached the end of the file.
+
+        Raises:
+            pydiffx.errors.DiffXParseError:
+                The section header could not be found, was invalid for this
+                stage of parsing, or contained invalid formatting.
+        """
+        stream = self._stream
+
+        # As with DiffXReader, blank lines before a header or at the end of
+        # the file are skipped.
+        while True:
+            chunks = []
+
+            while True:
+                try:
+                    chunks.append(await stream.readuntil(b'\n'))
+                    break
+                except asyncio.LimitOverrunError as e:
+                    # The line is longer than the stream's buffer limit.
+                    # Take what's been buffered so far and keep looking.
+                    chunks.append(await stream.readexactly(e.consumed))
+                except asyncio.IncompleteReadError:
+                    # We've reached the end of the file.
+                    return None
+
+            header = b''.join(chunks)
+
+            if header.strip():
+                break
+
+        return self._parse_header(header)
+
+    async def _read_bytes(self, length):
+        """Read a number of bytes from the stream.
+
+        Args:
+            length (int):
+                The number of bytes to read.
+
+        Returns:
+            bytes:
+            The resulting byte string. This will only be shorter than
+            ``length`` if the end of the file was reached.
+        """
+        try:
+            return await self._stream.readexactly(length)
+        except asyncio.IncompleteReadError as e:
+            return e.partial
+
+    async def _skip_bytes(self, length):
+        """Skip past a number of bytes in the stream.
+
+        The bytes will be read and discarded in bounded chunks.
+
+        Args:
+            length (int):
+                The number of bytes to skip.
+
+        Returns:
+            int:
+            The number of bytes skipped. This will only be less than
+            ``length`` if the end of the file was reached.
+        """
+        stream = self._stream
+        chunk_size = self.SKIP_CHUNK_SIZE
+        remaining = length
+
+        while remaining > 0:
+            try:
+                remaining -= len(await stream.readexactly(
+                    min(remaining, chunk_size)))
+            except asyncio.IncompleteReadError as e:
+                remaining -= len(e.partial)
+                break
+
+        return length - remaining
@@ -0,0 +1,242 @@
+"""An asyncio streaming writer for DiffX files."""
+
+from pydiffx.errors import DiffXContentError
+from pydiffx.options import MetaFormat
+from pydiffx.writer import DiffXWriter
+
+
+class AsyncDiffXWriter(object):
+    """An asyncio streaming writer for DiffX files.
+
+    This is the asyncio counterpart to :py:class:`~pydiffx.writer.DiffXWriter`.
+    It writes to an :py:class:`asyncio.StreamWriter` (or any object providing
+    a ``write()`` method and an awaitable ``drain()`` method), such as a
+    connection to a client in an asyncio server.
+
+    Each section is validated and prepared exactly as it is by
+    :py:class:`~pydiffx.writer.DiffXWriter`. Once a section has been written,
+    the stream is drained, pausing the caller until the stream's buffer is
+    below its high-water mark. This keeps memory usage bounded when writing
+    to slow clients.
+
+    Raw :py:class:`asyncio.Transport` objects don't offer a way to wait on
+    their buffers, and should be wrapped in a :py:class:`asyncio.StreamWriter`
+    first.
+
+    Example:
+        .. code-block:: python
+
+           writer = AsyncDiffXWriter(stream)
+           await writer.new_change()
+           await writer.new_file()
+           await writer.write_meta({...})
+           await writer.write_diff(diff)
+    """
+
+    #: The supported version of the DiffX specification.
+    VERSION = DiffXWriter.VERSION
+
+    #: Default indentation to apply to preamble sections.
+    DEFAULT_PREAMBLE_INDENT = DiffXWriter.DEFAULT_PREAMBLE_INDENT
+
+    #: Default encoding to use for the DiffX file.
+    DEFAULT_ENCODING = DiffXWriter.DEFAULT_ENCODING
+
+    def __init__(self, stream, encoding=DEFAULT_ENCODING, version=VERSION,
+                 json_codec=None):
+        """Initialize the writer.
+
+        The main DiffX header will be written to the stream's buffer
+        immediately, and drained along with the first section written.
+
+        Args:
+            stream (asyncio.StreamWriter):
+                The stream to write to.
+
+            encoding (unicode, optional):
+                The default encoding for content in the file. This will
+                generally be left as the default of "utf-8".
+
+            version (unicode, optional):
+                The version of the DiffX file to write.
+
+                This must currently be ``1.0``.
+
+            json_codec (pydiffx.json_codecs.BaseJSONCodec, optional):
+                The codec used to encode JSON metadata. This defaults to
+                the result of
+                :py:func:`~pydiffx.json_codecs.get_default_json_codec`.
+
+        Raises:
+            pydiffx.errors.DiffXOptionValueError:
+                An option value was invalid.
+        """
+        self.stream = stream
+        self._writer = DiffXWriter(stream,
+                                   encoding=encoding,
+                                   version=version,
+                                   json_codec=json_codec)
+
+    async def new_change(self, encoding=None):
+        """Write a new change section to the stream.
+
+        See :py:meth:`DiffXWriter.new_change
+        <pydiffx.writer.DiffXWriter.new_change>` for details.
+
+        Args:
+            encoding (unicode, optional):
+                The encoding to use for the section. Defaults to the main
+                DiffX file encoding.
+
+        Raises:
+            pydiffx.errors.DiffXSectionOrderError:
+                This was called at the wrong point in diff generation.
+        """
+        self._writer.new_change(encoding=encoding)
+        await self.stream.drain()
+
+    async def new_file(self, encoding=None):
+        """Write a new file section to the stream.
+
+        See :py:meth:`DiffXWriter.new_file
+        <pydiffx.writer.DiffXWriter.new_file>` for details.
+
+        Args:
+            encoding (unicode, optional):
+                The encoding to use for the section. Defaults to the parent
+                change section's encoding.
+
+        Raises:
+            pydiffx.errors.DiffXSectionOrderError:
+                This was called at the wrong point in diff generation.
+        """
+        self._writer.new_file(encoding=encoding)
+        await self.stream.drain()
+
+    async def write_preamble(self,
+                             text,
+                             encoding=None,
+                             indent=DEFAULT_PREAMBLE_INDENT,
+                             line_endings=None,
+                             mimetype=None):
+        """Write a new preamble section for a change or a file.
+
+        See :py:meth:`DiffXWriter.write_preamble
+        <pydiffx.writer.DiffXWriter.write_preamble>` for details.
+
+        Args:
+            text (unicode):
+                The text to write.
+
+            encoding (unicode, optional):
+                The encoding to use for the section. Defaults to the parent
+                change section's encoding.
+
+            indent (int, optional):
+                The optional indentation level for the text. This defaults to
+                4 spaces.
+
+            line_endings (unicode, optional):
+                The line endings used for the preamble. This can be "dos" or
+                "unix".
+
+            mimetype (unicode, optional):
+                The optional mimetype for the file contents.
+
+        Raises:
+            pydiffx.errors.DiffXContentError:
+                The content was empty or was an invalid type.
+
+            pydiffx.errors.DiffXOptionValueError:
+                An option value was invalid.
+
+            pydiffx.errors.DiffXSectionOrderError:
+                This was called at the wrong point in diff generation.
+        """
+        self._writer.write_preamble(text,
+                                    encoding=encoding,
+                                    indent=indent,
+                                    line_endings=line_endings,
+                                    mimetype=mimetype)
+        await self.stream.drain()
+
+    async def write_meta(self, metadata, encoding=None,
+                         meta_format=MetaFormat.JSON):
+        """Write a new meta section for DiffX, a change, or a file.
+
+        See :py:meth:`DiffXWriter.write_meta
+        <pydiffx.writer.DiffXWriter.write_meta>` for details.
+
+        Args:
+            metadata (dict):
+                The metadata to write.
+
+            encoding (unicode, optional):
+                The encoding to use for the section. Defaults to the parent
+                change section's encoding.
+
+            meta_format (unicode, optional):
+                The format for this metadata section.
+
+        Raises:
+            pydiffx.errors.DiffXContentError:
+                The metadata was empty or was an invalid type.
+
+            pydiffx.errors.DiffXOptionValueError:
+                An option value was invalid.
+
+            pydiffx.errors.DiffXSectionOrderError:
+                This was called at the wrong point in diff generation.
+        """
+        self._writer.write_meta(metadata,
+                                encoding=encoding,
+                                meta_format=meta_format)
+        await self.stream.drain()
+
+    async def write_diff(self, content, diff_type=None, encoding=None,
+                         line_endings=None):
+        """Write a new diff section for a file.
+
+        See :py:meth:`DiffXWriter.write_diff
+        <pydiffx.writer.DiffXWriter.write_diff>` for details.
+
+        Unlike :py:class:`~pydiffx.writer.DiffXWriter`, the content must
+        already be in memory. Files, paths, and iterables aren't accepted,
+        as reading from them would block the event loop. Large diffs should
+        be read (for instance, using :py:meth:`loop.run_in_executor()
+        <asyncio.loop.run_in_executor>`) before being passed in.
+
+        Args:
+            content (bytes or bytearray or memoryview):
+                The diff content to write.
+
+            diff_type (unicode, optional):
+                The type of diff to write.
+
+            encoding (unicode, optional):
+                The encoding to use for the section. This does not inherit
+                from previous sections.
+
+            line_endings (unicode, optional):
+                The line endings used for the diff. This can be
+                "dos" or "unix".
+
+        Raises:
+            pydiffx.errors.DiffXContentError:
+                The diff was an invalid type.
+
+            pydiffx.errors.DiffXOptionValueError:
+                An option value was invalid.
+
+            pydiffx.errors.DiffXSectionOrderError:
+                This was called at the wrong point in diff generation.
+        """
+        if not isinstance(content, (bytes, bytearray, memoryview)):
+            raise DiffXContentError('diff must be a byte string, not %s'
+                                    % type(content))
+
+        self._writer.write_diff(content,
+                                diff_type=diff_type,
+                                encoding=encoding,
+                                line_endings=line_endings)
+        await self.stream.drain()
@@ -13,6 +13,7 @@ import io
 import logging
 from copy import deepcopy
 
+from pydiffx.dom.paths import DiffXPathIndex
 from pydiffx.dom.properties import (ContainerOptionsMixin,
                                     DiffOptionsMixin,
                                     DiffTypeOptionProperty,
@@ -20,14 +21,17 @@ from pydiffx.dom.properties import (ContainerOptionsMixin,
                                     LineEndingsOptionProperty,
                                     MetaFormatOptionProperty,
                                     MetaOptionsMixin,
+                                    OptionProperty,
                                     PreambleIndentOptionProperty,
                                     PreambleMimeTypeOptionProperty,
                                     PreambleOptionsMixin,
-                                    VersionOptionProperty)
-from pydiffx.dom.reader import DiffXDOMReader
+                                    VersionOptionProperty,
+                                    get_shared_options)
+from pydiffx.dom.reader import DiffXDOMReader, DiffXLazyContent
 from pydiffx.dom.writer import DiffXDOMWriter
 from pydiffx.errors import DiffXUnknownOptionError
 from pydiffx.options import DiffType, MetaFormat
+from pydiffx.reader import DiffXLazyMetadata
 from pydiffx.utils.text import (get_newline_for_type,
                                 guess_line_endings,
                                 split_lines)
@@ -44,12 +48,12 @@ class BaseDiffXSection(object):
     This manages option storage and controls the initialization process for
     the subclass.
 
-    Attributes:
-        options (dict):
-            The options set for this section. This can be manipulated directly
-            without any type checking, but it's recommended that consumers
-            go through the dedicated class-level attributes.
+    Sections use ``__slots__`` and have no instance dictionary, keeping
+    large documents small in memory. Only the attributes defined by the
+    section can be set. This is also how unknown options passed when
+    constructing a section are caught.
 
+    Attributes:
         section_id (unicode):
             The ID of this section. This corresponds to a value in
             :py:class:`~pydiffx.sections.Section`.
@@ -73,11 +77,63 @@ class BaseDiffXSection(object):
     default_options = {}
 
     __slots__ = (
-        'options',
         'section_id',
         '_level',
+        '_options',
+        '_raw',
     )
 
+    # The section IDs for this section at each level of a DiffX file. These
+    # are computed for each subclass.
+    _section_ids = ()
+
+    def __init_subclass__(cls, **kwargs):
+        """Set up a new subclass.
+
+        This will compute the section IDs for the subclass.
+
+        Args:
+            **kwargs (dict):
+                Keyword arguments for the parent method.
+        """
+        super(BaseDiffXSection, cls).__init_subclass__(**kwargs)
+
+        if cls.section_name is not None:
+            cls._section_ids = tuple(
+                '%s%s' % ('.' * level, cls.section_name)
+                for level in range(4)
+            )
+
+    @classmethod
+    def _create(cls, level, options=None):
+        """Create a section without validating any state.
+
+        This is a faster alternative to the constructor, used when the
+        state for the section is already known to be valid, such as when
+        building sections while parsing a DiffX file.
+
+        Args:
+            level (int):
+                The level of the section within the DiffX file.
+
+            options (dict, optional):
+                The options for the section. If not provided, the default
+                options will be used.
+
+        Returns:
+            BaseDiffXSection:
+            The new section.
+        """
+        section = cls.__new__(cls)
+        section._init_section(level)
+
+        if options is None:
+            section._options = None
+        else:
+            section._options = get_shared_options(options)
+
+        return section
+
     def __init__(self, parent_section=None, **attrs):
         """Initialize the section.
 
@@ -99,11 +155,8 @@ class BaseDiffXSection(object):
         else:
             level = parent_section._level + 1
 
-        self.options = self.default_options.copy()
-        self.section_id = '%s%s' % ('.' * level, self.section_name)
-        self._level = level
-
-        self._setup_state()
+        self._init_section(level)
+        self._options = None
 
         for name, value in attrs.items():
             try:
@@ -113,10 +166,136 @@ class BaseDiffXSection(object):
                     '"%s" is not a valid option or content section'
                     % name)
 
+    @property
+    def options(self):
+        """The options set for this section.
+
+        This can be manipulated directly without any type checking, but it's
+        recommended that consumers go through the dedicated class-level
+        attributes.
+
+        Until accessed, options are stored in a read-only dictionary shared
+        by all sections with the same options. Accessing this gives the
+        section its own copy, which can then be modified.
+
+        Type:
+            dict
+        """
+        options = self._options
+
+        if type(options) is not dict:
+            options = dict(self._get_current_options())
+            self._options = options
+
+        # The options may be modified by the caller, so the original bytes
+        # can no longer be trusted.
+        self._raw = None
+
+        return options
+
+    @options.setter
+    def options(self, value):
+        """The options set for this section.
+
+        Args:
+            value (dict):
+                The new options. These will be copied.
+        """
+        self._set_current_options(value)
+
+    @classmethod
+    def _has_known_options(cls, options):
+        """Return whether all options are known to the section.
+
+        Args:
+            options (dict):
+                The options to check.
+
+        Returns:
+            bool:
+            ``True`` if each option has an option property on the section.
+        """
+        for name in options:
+            if not isinstance(getattr(cls, name, None), OptionProperty):
+                return False
+
+        return True
+
+    def _init_section(self, level):
+        """Initialize the common state for the section.
+
+        Args:
+            level (int):
+                The level of the section within the DiffX file.
+        """
+        try:
+            section_id = self._section_ids[level]
+        except IndexError:
+            section_id = '%s%s' % ('.' * level, self.section_name)
+
+        self.section_id = section_id
+        self._level = level
+
+        # The original bytes for the section, if parsed from a DiffX file
+        # and unchanged since. See DiffXDOMReader.keep_raw_bytes.
+        self._raw = None
+
+        self._setup_state()
+
     def _setup_state(self):
         """Set up subsections and subsection-related state."""
         pass
 
+    def _get_current_options(self):
+        """Return the current options.
+
+        The result must not be modified.
+
+        Returns:
+            dict:
+            The current options for the section.
+        """
+        options = self._options
+
+        if options is None:
+            options = self.default_options
+
+        return options
+
+    def _set_current_options(self, options):
+        """Set new options.
+
+        Args:
+            options (dict):
+                The new options. These will be copied.
+        """
+        self._options = get_shared_options(options)
+        self._raw = None
+
+    def _set_option(self, name, value):
+        """Set the value of an option.
+
+        If the section has its own options (from accessing
+        :py:attr:`options`), they'll be modified in place. Otherwise, the
+        shared options will be copied.
+
+        Args:
+            name (unicode):
+                The name of the option.
+
+            value (object):
+                The new value.
+        """
+        options = self._options
+
+        if type(options) is dict:
+            options[name] = value
+            self._raw = None
+        else:
+            options = dict(self._get_current_options())
+            options[name] = value
+            self._set_current_options(options)
+
     def __eq__(self, other):
         """Return whether this section is equal to another section.
 
@@ -131,7 +310,7 @@ class BaseDiffXSection(object):
         return (
             type(self) is type(other) and
             self.section_id == other.section_id and
-            self.options == other.options
+            self._get_current_options() == other._get_current_options()
         )
 
     def __repr__(self):
@@ -144,7 +323,7 @@ class BaseDiffXSection(object):
         return '<%s(level=%s, options=%r)>' % (
             self.__class__.__name__,
             self._level,
-            self.options
+            self._get_current_options()
         )
 
 
@@ -214,30 +393,26 @@ class BaseDiffXContentSection(BaseDiffXSection):
     #:     object
     default_value = None
 
-    __slots__ = ('_content')
-
-    def __init__(self, **kwargs):
-        """Initialize the section.
-
-        Args:
-            **kwargs (dict):
-                Keyword arguments to pass to the parent. See the
-                documentation for details.
-        """
-        if self.default_value is None:
-            self._content = None
-        else:
-            self._content = deepcopy(self.default_value)
-
-        super(BaseDiffXContentSection, self).__init__(**kwargs)
+    __slots__ = ('_content',)
 
     @property
     def content(self):
         """The content of this section.
 
         The type will be that of :py:attr:`data_type`.
+
+        If the content is being loaded lazily, it will be loaded (or fetched
+        from the cache) on each access.
+
+        Raises:
+            pydiffx.errors.DiffXContentError:
+                Content that's being loaded lazily could not be loaded, as
+                the DiffX file was closed.
+
+            pydiffx.errors.DiffXParseError:
+                Content that's being loaded lazily could not be parsed.
         """
-        return self._content
+        return self._load_content()
 
     @content.setter
     def content(self, value):
@@ -246,13 +421,19 @@ class BaseDiffXContentSection(BaseDiffXSection):
         The type will be that of :py:attr:`data_type`.
 
         Args:
-            value (object):
+            value (object or pydiffx.dom.reader.DiffXLazyContent):
                 The content to set.
 
         Raises:
             TypeError:
                 The value was an unsupported type.
         """
+        self._raw = None
+
+        if isinstance(value, DiffXLazyContent):
+            self._content = value
+            return
+
         if not isinstance(value, self.data_type):
             raise TypeError(
                 'Expected the content to be a %(expected_type)s type, '
@@ -264,6 +445,77 @@ class BaseDiffXContentSection(BaseDiffXSection):
 
         self._content = value
 
+    def _setup_state(self):
+        """Set up content-related state."""
+        # The default value will be set on first access.
+        self._content = None
+
+    def _load_content(self):
+        """Return the content of this section.
+
+        Unlike :py:attr:`content`, this is only used internally, and won't
+        assume the caller is going to modify the content.
+
+        Returns:
+            object:
+            The content of this section.
+
+        Raises:
+            pydiffx.errors.DiffXContentError:
+                Content that's being loaded lazily could not be loaded, as
+                the DiffX file was closed.
+
+            pydiffx.errors.DiffXParseError:
+                Content that's being loaded lazily could not be parsed.
+        """
+        content = self._content
+
+        if content is None:
+            content = self._get_default_content()
+        elif isinstance(content, DiffXLazyContent):
+            content = content.load()
+
+        return content
+
+    def _set_parsed_content(self, content, options, raw=None):
+        """Set content and options parsed from a DiffX file.
+
+        The content and options won't be validated.
+
+        Args:
+            content (object or pydiffx.dom.reader.DiffXLazyContent):
+                The parsed content.
+
+            options (dict):
+                The options for the section.
+
+            raw (memoryview, optional):
+                The original bytes for the section, if being kept.
+        """
+        self._content = content
+        self._options = get_shared_options(options)
+        self._raw = raw
+
+    def _get_default_content(self):
+        """Return the default content for the section.
+
+        If the content type is mutable, the default will be stored as the
+        section's content, so that changes to it are kept.
+
+        Returns:
+            object:
+            The default content.
+        """
+        default_value = self.default_value
+
+        if default_value is None:
+            return None
+
+        content = deepcopy(default_value)
+        self._content = content
+
+        return content
+
     def __eq__(self, other):
         """Return whether this section is equal to another section.
 
@@ -277,7 +529,7 @@ class BaseDiffXContentSection(BaseDiffXSection):
         """
         return (
             super(BaseDiffXContentSection, self).__eq__(other) and
-            self.content == other.content
+            self._load_content() == other._load_content()
         )
 
 
@@ -360,6 +612,8 @@ class DiffX(ContainerOptionsMixin,
         'changes',
         'meta_section',
         'preamble_section',
+        '_content_source',
+        '_path_index',
     )
 
     #: The version of the DiffX file.
@@ -371,13 +625,16 @@ class DiffX(ContainerOptionsMixin,
     version = VersionOptionProperty()
 
     @classmethod
-    def from_bytes(cls, data):
+    def from_bytes(cls, data, **kwargs):
         """Construct an instance from a DiffX file stored in a byte string.
 
         Args:
             data (bytes):
                 The DiffX file contents to parse.
 
+            **kwargs (dict):
+                Additional keyword arguments to pass to :py:meth:`from_stream`.
+
         Returns:
             DiffX:
             The resulting DiffX instance.
@@ -387,10 +644,75 @@ class DiffX(ContainerOptionsMixin,
                 The DiffX contents could not be parsed. Details will be in
                 the error message.
         """
-        return cls.from_stream(io.BytesIO(data))
+        return cls.from_stream(io.BytesIO(data), **kwargs)
+
+    @classmethod
+    def from_path(cls, path, lazy=False, content_cache_size=None,
+                  **kwargs):
+        """Construct an instance from a DiffX file on disk.
+
+        By default, the whole file will be read and parsed up-front.
+
+        If ``lazy`` is set, only the headers will be parsed up-front. The
+        preamble, metadata, and diff content of each section will be loaded
+        from the file the first time it's accessed. Loaded preamble and diff
+        content is kept in a bounded cache, and loaded again once evicted,
+        so that very large files can be worked with without holding all of
+        their content in memory.
+
+        When loading lazily, the file is kept open until :py:meth:`close` is
+        called (or until the instance is used as a context manager and that
+        context exits).
+
+        Args:
+            path (unicode):
+                The path to the DiffX file.
+
+            lazy (bool, optional):
+                Whether to load content from the file on first access.
+
+            content_cache_size (int, optional):
+                The maximum total size of content to cache, in bytes, when
+                loading lazily. This defaults to
+                :py:attr:`DiffXContentSource.DEFAULT_CACHE_SIZE
+                <pydiffx.dom.reader.DiffXContentSource.DEFAULT_CACHE_SIZE>`.
+
+            **kwargs (dict):
+                Additional keyword arguments to pass to :py:meth:`from_stream`.
+
+        Returns:
+            DiffX:
+            The resulting DiffX instance.
+
+        Raises:
+            OSError:
+                The file could not be opened.
+
+            pydiffx.errors.DiffXParseError:
+                The DiffX contents could not be parsed. Details will be in
+                the error message.
+        """
+        stream = open(path, 'rb')
+
+        try:
+            if not lazy:
+                return cls.from_stream(stream, **kwargs)
+
+            reader = DiffXDOMReader(cls,
+                                    lazy_content=True,
+                                    content_cache_size=content_cache_size,
+                                    **kwargs)
+
+            return reader.parse(stream)
+        except Exception:
+            # The stream won't have been closed if the reader couldn't be
+            # set up.
+            stream.close()
+            raise
 
     @classmethod
-    def from_stream(cls, stream):
+    def from_stream(cls, stream, lazy_metadata=False, json_codec=None,
+                    keep_raw_bytes=False):
         """Construct an instance from a DiffX file read from a stream.
 
         This will close the stream after it's been read.
@@ -399,6 +721,24 @@ class DiffX(ContainerOptionsMixin,
             data (file or io.IOBase):
                 The stream to read from.
 
+            lazy_metadata (bool, optional):
+                Whether to defer decoding metadata until it's first accessed.
+
+                Any errors in the metadata will then be raised on that first
+                access.
+
+            json_codec (pydiffx.json_codecs.BaseJSONCodec, optional):
+                The codec used to decode JSON metadata. This defaults to
+                the result of
+                :py:func:`~pydiffx.json_codecs.get_default_json_codec`.
+
+            keep_raw_bytes (bool, optional):
+                Whether to keep the original bytes of each section, so that
+                sections that aren't modified can be written back out as-is.
+
+                See :py:attr:`DiffXDOMReader.keep_raw_bytes
+                <pydiffx.dom.reader.DiffXDOMReader.keep_raw_bytes>`.
+
         Returns:
             DiffX:
             The resulting DiffX instance.
@@ -408,7 +748,12 @@ class DiffX(ContainerOptionsMixin,
                 The DiffX contents could not be parsed. Details will be in
                 the error message.
         """
-        return DiffXDOMReader(cls).parse(stream)
+        reader = DiffXDOMReader(cls,
+                                lazy_metadata=lazy_metadata,
+                                json_codec=json_codec,
+                                keep_raw_bytes=keep_raw_bytes)
+
+        return reader.parse(stream)
 
     @property
     def subsections(self):
@@ -422,6 +767,36 @@ class DiffX(ContainerOptionsMixin,
             self.meta_section,
         ] + self.changes
 
+    def close(self):
+        """Close the file that content is being loaded from.
+
+        This only applies to instances created through :py:meth:`from_path`
+        with ``lazy=True``. Any content that hasn't already been loaded can
+        no longer be accessed.
+        """
+        if self._content_source is not None:
+            self._content_source.close()
+
+    def __enter__(self):
+        """Enter a context for the instance.
+
+        Returns:
+            DiffX:
+            This instance.
+        """
+        return self
+
+    def __exit__(self, *args):
+        """Exit the context for the instance.
+
+        This will close any file that content is being loaded from.
+
+        Args:
+            *args (tuple):
+                Exception information, if an exception was raised.
+        """
+        self.close()
+
     def add_change(self, **attrs):
         """Add a new change section.
 
@@ -440,10 +815,107 @@ class DiffX(ContainerOptionsMixin,
         """
         change_section = DiffXChangeSection(parent_section=self,
                                             **attrs)
-        self.changes.append(change_section)
+        self._attach_change(change_section)
+
+        return change_section
+
+    def _add_parsed_change(self, options, raw=None):
+        """Add a new change section parsed from a DiffX file.
+
+        The option values won't be validated. If there are any unknown
+        options, this will fall back to :py:meth:`add_change`, which will
+        report them.
+
+        Args:
+            options (dict):
+                The options for the section.
+
+            raw (memoryview, optional):
+                The original bytes for the section's header, if being kept.
+
+        Returns:
+            DiffXChangeSection:
+            The newly-added change section.
+
+        Raises:
+            pydiffx.errors.DiffXUnknownOptionError:
+                One or more option names are invalid.
+        """
+        if not DiffXChangeSection._has_known_options(options):
+            return self.add_change(**options)
+
+        change_section = DiffXChangeSection._create(level=self._level + 1,
+                                                    options=options)
+        change_section._raw = raw
+        self._attach_change(change_section)
 
         return change_section
 
+    def _attach_change(self, change_section):
+        """Attach a new change section to this file.
+
+        Args:
+            change_section (DiffXChangeSection):
+                The change section to attach.
+        """
+        path_index = self._path_index
+
+        change_section._path_index = path_index
+        change_section._path_state = path_index.add_change()
+        self.changes.append(change_section)
+
+    def find_files(self, path):
+        """Return all file sections for a path.
+
+        This will match the ``path`` in each file's metadata. If the file
+        was moved, renamed, or copied, this will match either the old or the
+        new path.
+
+        This uses an index of paths, which is kept up-to-date as files are
+        added and their metadata is changed, including metadata that's
+        modified in place after being accessed. The paths of any file whose
+        metadata has been accessed are checked again on each call.
+
+        Files added or removed by modifying :py:attr:`changes` or
+        :py:attr:`DiffXChangeSection.files` directly won't be reflected.
+
+        Args:
+            path (unicode):
+                The path to find.
+
+        Returns:
+            list of DiffXFileSection:
+            The matching file sections, in the order in which they appear in
+            the DiffX file.
+
+        Raises:
+            pydiffx.errors.DiffXParseError:
+                Metadata that was read lazily could not be parsed.
+        """
+        return self._path_index.find_files(path)
+
+    def files_matching(self, pattern):
+        """Return all file sections with paths matching a glob pattern.
+
+        This works like :py:meth:`find_files`, but matches paths against a
+        glob pattern, as supported by :py:mod:`fnmatch`. Matching is
+        case-sensitive, and ``*`` will match across ``/`` characters.
+
+        Args:
+            pattern (unicode):
+                The glob pattern to match.
+
+        Returns:
+            list of DiffXFileSection:
+            The matching file sections, in the order in which they appear in
+            the DiffX file.
+
+        Raises:
+            pydiffx.errors.DiffXParseError:
+                Metadata that was read lazily could not be parsed.
+        """
+        return self._path_index.files_matching(pattern)
+
     def generate_stats(self):
         """Generate statistics for the DiffX metadata.
 
@@ -453,6 +925,16 @@ class DiffX(ContainerOptionsMixin,
         This should only be run once the diff is complete, before writing
         it.
         """
+        for change_section in self.changes:
+            change_section.generate_stats()
+
+        self._update_stats_from_changes()
+
+    def _update_stats_from_changes(self):
+        """Update the DiffX statistics from each change's statistics.
+
+        Each change must already have statistics in its metadata.
+        """
         stats = {
             'changes': len(self.changes),
             'deletions': 0,
@@ -462,7 +944,6 @@ class DiffX(ContainerOptionsMixin,
         }
 
         for change_section in self.changes:
-            change_section.generate_stats()
             change_stats = change_section.meta['stats']
 
             stats['files'] += change_stats['files']
@@ -477,9 +958,15 @@ class DiffX(ContainerOptionsMixin,
         else:
             self.meta['stats'] = stats
 
-    def to_bytes(self):
+    def to_bytes(self, json_codec=None):
         """Write and return the DiffX file contents.
 
+        Args:
+            json_codec (pydiffx.json_codecs.BaseJSONCodec, optional):
+                The codec used to encode JSON metadata. This defaults to
+                the result of
+                :py:func:`~pydiffx.json_codecs.get_default_json_codec`.
+
         Returns:
             bytes:
             The DiffX file contents.
@@ -489,15 +976,19 @@ class DiffX(ContainerOptionsMixin,
                 There was an error generating the content.
         """
         with io.BytesIO() as stream:
-            DiffXDOMWriter().write_stream(self, stream)
+            DiffXDOMWriter(json_codec=json_codec).write_stream(self, stream)
 
             return stream.getvalue()
 
     def _setup_state(self):
         """Set up subsections and subsection-related state."""
-        self.preamble_section = DiffXPreambleSection(parent_section=self)
-        self.meta_section = DiffXMetaSection(parent_section=self)
+        level = self._level + 1
+
+        self.preamble_section = DiffXPreambleSection._create(level)
+        self.meta_section = DiffXMetaSection._create(level)
         self.changes = []
+        self._content_source = None
+        self._path_index = DiffXPathIndex()
 
 
 class DiffXChangeSection(ContainerOptionsMixin,
@@ -568,6 +1059,8 @@ class DiffXChangeSection(ContainerOptionsMixin,
         'meta_section',
         'preamble_section',
         'files',
+        '_path_index',
+        '_path_state',
     )
 
     @property
@@ -599,10 +1092,54 @@ class DiffXChangeSection(ContainerOptionsMixin,
                 One or more attribute names are invalid.
         """
         file_section = DiffXFileSection(parent_section=self, **attrs)
-        self.files.append(file_section)
+        self._attach_file(file_section)
 
         return file_section
 
+    def _add_parsed_file(self, options, raw=None):
+        """Add a new file section parsed from a DiffX file.
+
+        The option values won't be validated. If there are any unknown
+        options, this will fall back to :py:meth:`add_file`, which will
+        report them.
+
+        Args:
+            options (dict):
+                The options for the section.
+
+            raw (memoryview, optional):
+                The original bytes for the section's header, if being kept.
+
+        Returns:
+            DiffXFileSection:
+            The newly-added file section.
+
+        Raises:
+            pydiffx.errors.DiffXUnknownOptionError:
+                One or more option names are invalid.
+        """
+        if not DiffXFileSection._has_known_options(options):
+            return self.add_file(**options)
+
+        file_section = DiffXFileSection._create(level=self._level + 1,
+                                                options=options)
+        file_section._raw = raw
+        self._attach_file(file_section)
+
+        return file_section
+
+    def _attach_file(self, file_section):
+        """Attach a new file section to this change.
+
+        Args:
+            file_section (DiffXFileSection):
+                The file section to attach.
+        """
+        self.files.append(file_section)
+
+        if self._path_index is not None:
+            self._path_index.add_file(self._path_state, file_section)
+
     def generate_stats(self):
         """Generate statistics for the change section's metadata.
 
@@ -636,9 +1173,13 @@ class DiffXChangeSection(ContainerOptionsMixin,
 
     def _setup_state(self):
         """Set up subsections and subsection-related state."""
-        self.preamble_section = DiffXPreambleSection(parent_section=self)
-        self.meta_section = DiffXMetaSection(parent_section=self)
+        level = self._level + 1
+
+        self.preamble_section = DiffXPreambleSection._create(level)
+        self.meta_section = DiffXMetaSection._create(level)
         self.files = []
+        self._path_index = None
+        self._path_state = None
 
 
 class DiffXFileSection(ContainerOptionsMixin,
@@ -771,8 +1312,10 @@ class DiffXFileSection(ContainerOptionsMixin,
 
     def _setup_state(self):
         """Set up subsections and subsection-related state."""
-        self.meta_section = DiffXMetaSection(parent_section=self)
-        self.diff_section = DiffXFileDiffSection(parent_section=self)
+        level = self._level + 1
+
+        self.meta_section = DiffXMetaSection._create(level)
+        self.diff_section = DiffXFileDiffSection._create(level)
         self.subsections = [
             self.meta_section,
             self.diff_section,
@@ -883,7 +1426,106 @@ class DiffXMetaSection(BaseDiffXContentSection):
     #:     unicode
     format = MetaFormatOptionProperty()
 
-    __slots__ = ()
+    __slots__ = ('_path_index',)
+
+    @property
+    def content(self):
+        """The metadata for this section.
+
+        If the metadata was read lazily, it will be loaded and decoded the
+        first time it's accessed. Since metadata can be modified, it's then
+        kept on the section, rather than loaded again on later accesses.
+
+        Type:
+            dict
+
+        Raises:
+            pydiffx.errors.DiffXContentError:
+                Metadata that's being loaded lazily could not be loaded, as
+                the DiffX file was closed.
+
+            pydiffx.errors.DiffXParseError:
+                Metadata that was read lazily could not be parsed.
+        """
+        content = self._load_content()
+
+        # The caller may modify the metadata, so its paths will need to be
+        # watched for changes, and it will need to be written again.
+        self._raw = None
+
+        if self._path_index is not None:
+            self._path_index.watch(self)
+
+        return content
+
+    @content.setter
+    def content(self, value):
+        """The metadata for this section.
+
+        Args:
+            value (dict or pydiffx.reader.DiffXLazyMetadata or
+                   pydiffx.dom.reader.DiffXLazyContent):
+                The metadata to set.
+
+        Raises:
+            TypeError:
+                The value was an unsupported type.
+        """
+        path_index = self._path_index
+
+        if isinstance(value, (DiffXLazyContent, DiffXLazyMetadata)):
+            self._content = value
+            self._raw = None
+
+            if path_index is not None:
+                path_index.mark_stale(self)
+        else:
+            BaseDiffXContentSection.content.fset(self, value)
+
+            # The caller still holds the metadata, and may modify it.
+            if path_index is not None:
+                path_index.watch(self)
+
+    def _load_content(self):
+        """Return the metadata for this section.
+
+        Unlike :py:attr:`content`, this is only used internally, and won't
+        assume the caller is going to modify the metadata.
+
+        Returns:
+            dict:
+            The metadata for this section.
+
+        Raises:
+            pydiffx.errors.DiffXContentError:
+                Metadata that's being loaded lazily could not be loaded, as
+                the DiffX file was closed.
+
+            pydiffx.errors.DiffXParseError:
+                Metadata that was read lazily could not be parsed.
+        """
+        content = self._content
+
+        if content is None:
+            content = self._get_default_content()
+        elif isinstance(content, DiffXLazyContent):
+            content = content.load()
+            self._content = content
+
+        if isinstance(content, DiffXLazyMetadata):
+            content = content.load()
+            self._content = content
+
+        return content
+
+    def _setup_state(self):
+        """Set up content-related state."""
+        super(DiffXMetaSection, self)._setup_state()
+
+        # This will be set if this belongs to a file section in a DiffX
+        # file, so that the file's paths can be re-indexed when the
+        # metadata may have changed.
+        self._path_index = None
 
 
 class DiffXFileDiffSection(BaseDiffXContentSection):
@@ -0,0 +1,261 @@
+"""An index of file paths in the DiffX Object Model.
+
+This is considered internal API, and should not be used outside of this
+codebase. Consumers will want to use :py:meth:`DiffX.find_files
+<pydiffx.dom.objects.DiffX.find_files>` and :py:meth:`DiffX.files_matching
+<pydiffx.dom.objects.DiffX.files_matching>` instead.
+"""
+
+import re
+from fnmatch import translate
+
+
+class DiffXPathIndex(object):
+    """An index mapping file paths to file sections.
+
+    File sections are registered as they're added to a change. Their paths
+    are taken from the ``path`` key in their metadata, which may be a
+    string or a dictionary containing ``old`` and ``new`` paths. Both forms
+    are indexed.
+
+    Paths aren't read when a file section is registered. Instead, the file
+    section is marked as stale, and its paths are read the next time the
+    index is queried. This keeps registration cheap, and avoids loading
+    metadata for files in lazily-loaded DiffX files until they're needed.
+
+    Once a file's decoded metadata has been handed out (by accessing or
+    setting it), the caller may modify it at any time. From then on, the
+    file is watched, and its paths are compared again on every query.
+
+    Results are always returned in the order in which the files appear in
+    the DiffX file.
+    """
+
+    __slots__ = (
+        '_entries',
+        '_files_by_path',
+        '_next_change_key',
+        '_stale',
+        '_watched',
+    )
+
+    def __init__(self):
+        """Initialize the index."""
+        # A mapping of metadata section IDs to [sort key, file section,
+        # metadata section, paths] entries.
+        self._entries = {}
+
+        # A mapping of paths to dictionaries of metadata section IDs to
+        # entries.
+        self._files_by_path = {}
+
+        # A mapping of metadata section IDs to entries whose paths must be
+        # read again.
+        self._stale = {}
+
+        # A mapping of metadata section IDs to entries whose metadata may
+        # be modified by the caller, and whose paths must be compared on
+        # every query.
+        self._watched = {}
+
+        self._next_change_key = 0
+
+    def add_change(self):
+        """Register a new change section.
+
+        Returns:
+            list:
+            State for the change, to be passed to :py:meth:`add_file` when
+            adding files to the change.
+        """
+        change_key = self._next_change_key
+        self._next_change_key += 1
+
+        # This holds the change's position and the number of files
+        # registered for it so far.
+        return [change_key, 0]
+
+    def add_file(self, change_state, file_section):
+        """Register a new file section.
+
+        Args:
+            change_state (list):
+                The state for the file's change, as returned by
+                :py:meth:`add_change`.
+
+            file_section (pydiffx.dom.objects.DiffXFileSection):
+                The file section to register.
+        """
+        meta_section = file_section.meta_section
+        entry = [
+            (change_state[0], change_state[1]),
+            file_section,
+            meta_section,
+            (),
+        ]
+        change_state[1] += 1
+
+        key = id(meta_section)
+        self._entries[key] = entry
+        self._stale[key] = entry
+
+        meta_section._path_index = self
+
+    def mark_stale(self, meta_section):
+        """Mark a file's metadata as replaced.
+
+        The file's paths will be read again on the next query.
+
+        Args:
+            meta_section (pydiffx.dom.objects.DiffXMetaSection):
+                The metadata section of a registered file section.
+        """
+        key = id(meta_section)
+        self._stale[key] = self._entries[key]
+        self._watched.pop(key, None)
+
+    def watch(self, meta_section):
+        """Watch a file's metadata for changes.
+
+        This must be called when the decoded metadata is handed to a
+        caller, who may then modify it. The file's paths will be compared
+        on every query from then on.
+
+        Args:
+            meta_section (pydiffx.dom.objects.DiffXMetaSection):
+                The metadata section of a registered file section.
+        """
+        key = id(meta_section)
+        self._watched[key] = self._entries[key]
+
+    def find_files(self, path):
+        """Return all file sections matching a path.
+
+        Args:
+            path (unicode):
+                The path to find. This must match either the file's path, or
+                its old or new path.
+
+        Returns:
+            list of pydiffx.dom.objects.DiffXFileSection:
+            The matching file sections, in order.
+        """
+        self._update()
+
+        return self._get_sorted_files(
+            self._files_by_path.get(path, {}).values())
+
+    def files_matching(self, pattern):
+        """Return all file sections with paths matching a glob pattern.
+
+        Args:
+            pattern (unicode):
+                The glob pattern to match, as supported by
+                :py:mod:`fnmatch`. Matching is case-sensitive, and ``*``
+                will match across ``/`` characters.
+
+        Returns:
+            list of pydiffx.dom.objects.DiffXFileSection:
+            The matching file sections, in order.
+        """
+        self._update()
+
+        match = re.compile(translate(pattern)).match
+        entries = {}
+
+        for path, path_entries in self._files_by_path.items():
+            if match(path):
+                entries.update(path_entries)
+
+        return self._get_sorted_files(entries.values())
+
+    def _update(self):
+        """Read the paths for all stale and watched file sections."""
+        stale = self._stale
+
+        if stale:
+            for key, entry in stale.items():
+                self._update_entry(key, entry)
+
+            stale.clear()
+
+        for key, entry in self._watched.items():
+            self._update_entry(key, entry)
+
+    def _update_entry(self, key, entry):
+        """Read the paths for a file section, and index any changes.
+
+        Args:
+            key (int):
+                The ID of the file's metadata section.
+
+            entry (list):
+                The index entry for the file section.
+        """
+        old_paths = entry[3]
+        paths = self._get_paths(entry[2]._load_content())
+
+        if paths == old_paths:
+            return
+
+        files_by_path = self._files_by_path
+
+        for path in old_paths:
+            path_entries = files_by_path[path]
+            del path_entries[key]
+
+            if not path_entries:
+                del files_by_path[path]
+
+        entry[3] = paths
+
+        for path in paths:
+            files_by_path.setdefault(path, {})[key] = entry
+
+    def _get_paths(self, meta):
+        """Return the paths listed in a file's metadata.
+
+        Args:
+            meta (dict):
+                The file's metadata.
+
+        Returns:
+            tuple of unicode:
+            The unique paths listed in the metadata.
+        """
+        path = meta.get('path')
+
+        if isinstance(path, str):
+            return (path,)
+        elif isinstance(path, dict):
+            old_path = path.get('old')
+            new_path = path.get('new')
+
+            if old_path == new_path:
+                paths = (old_path,)
+            else:
+                paths = (old_path, new_path)
+
+            return tuple(
+                _path
+                for _path in paths
+                if isinstance(_path, str)
+            )
+
+        return ()
+
+    def _get_sorted_files(self, entries):
+        """Return file sections from entries, in order.
+
+        Args:
+            entries (iterable of list):
+                The index entries for the file sections.
+
+        Returns:
+            list of pydiffx.dom.objects.DiffXFileSection:
+            The file sections, in order.
+        """
+        return [
+            entry[1]
+            for entry in sorted(entries, key=lambda entry: entry[0])
+        ]
@@ -13,6 +13,100 @@ from pydiffx.options import (DiffType,
                              SpecVersion)
 
 
+# Shared options, keyed by their contents.
+_shared_options = {}
+
+# The maximum number of entries in _shared_options.
+_SHARED_OPTIONS_MAX_SIZE = 256
+
+# The types of option values that allow options to be shared. These can
+# never compare equal to each other, so options can be keyed by their
+# contents without matching options of a different type.
+_SHAREABLE_VALUE_TYPES = (int, str)
+
+
+class SharedOptions(dict):
+    """A read-only dictionary of options that can be shared by sections.
+
+    Most sections in a DiffX file have one of a small number of combinations
+    of options. Rather than each section storing its own dictionary, sections
+    store one of these, as returned by :py:func:`get_shared_options`, and
+    replace it when their options change. A section only gets its own
+    modifiable copy once its options are accessed directly.
+    """
+
+    __slots__ = ()
+
+    def _disallow_changes(self, *args, **kwargs):
+        """Disallow changes to the options.
+
+        Args:
+            *args (tuple, unused):
+                Positional arguments for the method.
+
+            **kwargs (dict, unused):
+                Keyword arguments for the method.
+
+        Raises:
+            TypeError:
+                Changes aren't allowed.
+        """
+        raise TypeError('Shared options cannot be modified')
+
+    __setitem__ = _disallow_changes
+    __delitem__ = _disallow_changes
+    __ior__ = _disallow_changes
+    clear = _disallow_changes
+    pop = _disallow_changes
+    popitem = _disallow_changes
+    setdefault = _disallow_changes
+    update = _disallow_changes
+
+    def __reduce__(self):
+        """Return state used to pickle or copy the options.
+
+        Returns:
+            tuple:
+            The function and arguments used to recreate the options.
+        """
+        return get_shared_options, (dict(self),)
+
+
+def get_shared_options(options):
+    """Return shared, read-only options with the same contents.
+
+    Options with the same contents will share the same instance. Options
+    containing values other than strings and integers will still be
+    read-only, but won't be shared. Nor will new combinations of options,
+    once a limit has been reached.
+
+    Args:
+        options (dict):
+            The options to share.
+
+    Returns:
+        SharedOptions:
+        The shared options.
+    """
+    if type(options) is SharedOptions:
+        return options
+
+    for value in options.values():
+        if type(value) not in _SHAREABLE_VALUE_TYPES:
+            return SharedOptions(options)
+
+    key = frozenset(options.items())
+    shared_options = _shared_options.get(key)
+
+    if shared_options is None:
+        shared_options = SharedOptions(options)
+
+        if len(_shared_options) < _SHARED_OPTIONS_MAX_SIZE:
+            _shared_options[key] = shared_options
+
+    return shared_options
+
+
 class OptionProperty(object):
     """A property for accessing and setting an option in a section."""
 
@@ -56,7 +150,8 @@ class OptionProperty(object):
             object:
             The option value.
         """
-        return instance.options.get(self.option_name, self.default)
+        return instance._get_current_options().get(self.option_name,
+                                                   self.default)
 
     def __set__(self, instance, value):
         """Set the value for an option.
@@ -91,7 +186,7 @@ class OptionProperty(object):
                 value=value,
                 choices=self.choices)
 
-        instance.options[self.option_name] = value
+        instance._set_option(self.option_name, value)
 
 
 class SubsectionAttrProperty(object):
@@ -1,7 +1,12 @@
 """Reader for parsing a DiffX file into DOM objects."""
 
+import io
+import threading
+from collections import OrderedDict
+
+from pydiffx.errors import DiffXContentError
 from pydiffx.reader import DiffXReader
-from pydiffx.sections import Section
+from pydiffx.sections import META_SECTIONS, Section
 
 
 class DiffXDOMReader(object):
@@ -18,9 +23,27 @@ class DiffXDOMReader(object):
     If constructing manually, one instance can be reused for multiple streams.
 
     Attributes:
+        content_cache_size (int):
+            The maximum total size of content cached when loading content
+            lazily.
+
         diffx_cls (type):
             The :py:class:`~pydiffx.dom.objects.DiffX` class or subclass
             to create when parsing.
+
+        json_codec (pydiffx.json_codecs.BaseJSONCodec):
+            The codec used to decode JSON metadata, or ``None`` to use the
+            default.
+
+        keep_raw_bytes (bool):
+            Whether to keep the original bytes of each section, so that
+            unmodified sections can be written back out as-is.
+
+        lazy_content (bool):
+            Whether to defer loading content until it's first accessed.
+
+        lazy_metadata (bool):
+            Whether to defer decoding metadata until it's first accessed.
     """
 
     #: The class to instantiate for reading from a stream.
@@ -31,21 +54,82 @@ class DiffXDOMReader(object):
     #:     type
     reader_cls = DiffXReader
 
-    def __init__(self, diffx_cls):
+    def __init__(self, diffx_cls, lazy_metadata=False, json_codec=None,
+                 lazy_content=False,
+                 content_cache_size=None,
+                 keep_raw_bytes=False):
         """Initialize the reader.
 
         Args:
             diffx_cls (type):
                 The :py:class:`~pydiffx.dom.objects.DiffX` class or subclass
                 to create when parsing.
+
+            lazy_metadata (bool, optional):
+                Whether to defer decoding metadata until it's first accessed.
+
+                If set, the JSON content of each metadata section will be
+                kept, and only decoded the first time the section's ``meta``
+                is accessed.
+
+            json_codec (pydiffx.json_codecs.BaseJSONCodec, optional):
+                The codec used to decode JSON metadata. This defaults to
+                the result of
+                :py:func:`~pydiffx.json_codecs.get_default_json_codec`.
+
+            lazy_content (bool, optional):
+                Whether to defer loading content until it's first accessed.
+
+                If set, only the headers of the file will be parsed up-front,
+                and the stream will be kept open for loading content. See
+                :py:meth:`parse` for details.
+
+            content_cache_size (int, optional):
+                The maximum total size of content cached when loading content
+                lazily. This defaults to
+                :py:attr:`DiffXContentSource.DEFAULT_CACHE_SIZE`.
+
+            keep_raw_bytes (bool, optional):
+                Whether to keep the original bytes of each section.
+
+                If set, the whole stream will be read into memory, and each
+                section will reference its header and content within it.
+                When writing, any section whose content and options (and
+                whose parents' options) haven't changed will be copied
+                as-is, rather than encoded again.
+
+                This can't be used along with ``lazy_content``.
+
+        Raises:
+            ValueError:
+                Both ``lazy_content`` and ``keep_raw_bytes`` were set.
         """
+        if lazy_content and keep_raw_bytes:
+            raise ValueError('keep_raw_bytes cannot be used along with '
+                             'lazy_content')
+
+        if content_cache_size is None:
+            content_cache_size = DiffXContentSource.DEFAULT_CACHE_SIZE
+
         self.diffx_cls = diffx_cls
+        self.lazy_metadata = lazy_metadata
+        self.json_codec = json_codec
+        self.lazy_content = lazy_content
+        self.content_cache_size = content_cache_size
+        self.keep_raw_bytes = keep_raw_bytes
 
     def parse(self, stream):
         """Parse a stream and construct the DOM objects.
 
         The stream will be closed after reading.
 
+        If loading content lazily, the stream must be seekable. The structure
+        of the file will be built from its headers, and the preamble, meta,
+        and diff content of each section will be loaded from the stream
+        the first time it's accessed. The stream will then be kept open
+        until the resulting :py:class:`~pydiffx.dom.objects.DiffX` is
+        closed.
+
         Args:
             stream (file or io.IOBase):
                 The byte stream containing a valid DiffX file.
@@ -55,40 +139,97 @@ class DiffXDOMReader(object):
             The resulting DiffX instance.
 
         Raises:
+            ValueError:
+                Content was to be loaded lazily, but the stream can't seek.
+
             pydiffx.errors.DiffXParseError:
                 The DiffX contents could not be parsed. Details will be in
                 the error message.
         """
+        if self.lazy_content:
+            if not stream.seekable():
+                stream.close()
+
+                raise ValueError('Content can only be loaded lazily from '
+                                 'seekable streams')
+
+            try:
+                return self._parse(stream)
+            except Exception:
+                stream.close()
+                raise
+
         with stream:
-            reader = self.reader_cls(stream)
-            diffx = self.diffx_cls()
-
-            section_handlers = {
-                Section.MAIN: self._read_main_section,
-                Section.MAIN_META: self._read_meta_section,
-                Section.MAIN_PREAMBLE: self._read_preamble_section,
-                Section.CHANGE: self._read_change_section,
-                Section.CHANGE_PREAMBLE: self._read_preamble_section,
-                Section.CHANGE_META: self._read_meta_section,
-                Section.FILE: self._read_file_section,
-                Section.FILE_META: self._read_meta_section,
-                Section.FILE_DIFF: self._read_diff_section,
-            }
-
-            cur_section = diffx
-
-            for section_info in reader:
-                section_id = section_info['section']
-                section_handler = section_handlers[section_id]
-
-                cur_section = (
-                    section_handler(diffx, cur_section, section_info) or
-                    cur_section
-                )
+            return self._parse(stream)
+
+    def _parse(self, stream):
+        """Parse a stream and construct the DOM objects.
+
+        Args:
+            stream (file or io.IOBase):
+                The byte stream containing a valid DiffX file.
+
+        Returns:
+            pydiffx.dom.objects.DiffX:
+            The resulting DiffX instance.
+
+        Raises:
+            pydiffx.errors.DiffXParseError:
+                The DiffX contents could not be parsed. Details will be in
+                the error message.
+        """
+        if self.keep_raw_bytes:
+            # Sections will reference their bytes within the whole file.
+            data = stream.read()
+            raw_view = memoryview(data)
+            stream = io.BytesIO(data)
+        else:
+            raw_view = None
+
+        reader = self.reader_cls(stream, json_codec=self.json_codec)
+        diffx = self.diffx_cls()
+
+        if self.lazy_content:
+            source = DiffXContentSource(reader=reader,
+                                        stream=stream,
+                                        cache_size=self.content_cache_size)
+            diffx._content_source = source
+        else:
+            source = None
+
+        section_handlers = {
+            Section.MAIN: self._read_main_section,
+            Section.MAIN_META: self._read_meta_section,
+            Section.MAIN_PREAMBLE: self._read_preamble_section,
+            Section.CHANGE: self._read_change_section,
+            Section.CHANGE_PREAMBLE: self._read_preamble_section,
+            Section.CHANGE_META: self._read_meta_section,
+            Section.FILE: self._read_file_section,
+            Section.FILE_META: self._read_meta_section,
+            Section.FILE_DIFF: self._read_diff_section,
+        }
+
+        cur_section = diffx
+
+        for section_info in reader.iter_sections(
+            lazy_content=self.lazy_content,
+            lazy_metadata=self.lazy_metadata):
+            section_id = section_info['section']
+            section_handler = section_handlers[section_id]
+
+            if raw_view is None:
+                raw = None
+            else:
+                raw = raw_view[reader.section_offset:reader.offset]
+
+            cur_section = (
+                section_handler(diffx, cur_section, section_info, raw) or
+                cur_section
+            )
 
         return diffx
 
-    def _read_meta_section(self, diffx, section, section_info):
+    def _read_meta_section(self, diffx, section, section_info, raw):
         """Read a meta section.
 
         This will add the metadata content and options to the section.
@@ -102,12 +243,17 @@ class DiffXDOMReader(object):
 
             section_info (dict):
                 Information on the section from the streaming reader.
+
+            raw (memoryview):
+                The original bytes for the section, or ``None`` if not being
+                kept.
         """
-        section.meta = section_info['metadata']
-        self._set_content_options(section.meta_section,
-                                  section_info['options'])
+        section.meta_section._set_parsed_content(
+            self._get_content(diffx, section_info, 'metadata'),
+            self._get_content_options(section_info),
+            raw)
 
-    def _read_preamble_section(self, diffx, section, section_info):
+    def _read_preamble_section(self, diffx, section, section_info, raw):
         """Read a preamble section.
 
         This will add the preamble text and options to the section.
@@ -121,12 +267,17 @@ class DiffXDOMReader(object):
 
             section_info (dict):
                 Information on the section from the streaming reader.
+
+            raw (memoryview):
+                The original bytes for the section, or ``None`` if not being
+                kept.
         """
-        section.preamble = section_info['text']
-        self._set_content_options(section.preamble_section,
-                                  section_info['options'])
+        section.preamble_section._set_parsed_content(
+            self._get_content(diffx, section_info, 'text'),
+            self._get_content_options(section_info),
+            raw)
 
-    def _read_diff_section(self, diffx, section, section_info):
+    def _read_diff_section(self, diffx, section, section_info, raw):
         """Read a diff section.
 
         This will add the diff content and options to the section.
@@ -140,12 +291,17 @@ class DiffXDOMReader(object):
 
             section_info (dict):
                 Information on the section from the streaming reader.
+
+            raw (memoryview):
+                The original bytes for the section, or ``None`` if not being
+                kept.
         """
-        section.diff = section_info['diff']
-        self._set_content_options(section.diff_section,
-                                  section_info['options'])
+        section.diff_section._set_parsed_content(
+            self._get_content(diffx, section_info, 'diff'),
+            self._get_content_options(section_info),
+            raw)
 
-    def _read_main_section(self, diffx, section, section_info):
+    def _read_main_section(self, diffx, section, section_info, raw):
         """Read the main section.
 
         This will set options on the main section.
@@ -159,11 +315,15 @@ class DiffXDOMReader(object):
 
             section_info (dict):
                 Information on the section from the streaming reader.
+
+            raw (memoryview):
+                The original bytes for the section, or ``None`` if not being
+                kept.
         """
-        diffx.options.clear()
-        diffx.options.update(section_info['options'])
+        diffx.options = dict(section_info['options'])
+        diffx._raw = raw
 
-    def _read_change_section(self, diffx, section, section_info):
+    def _read_change_section(self, diffx, section, section_info, raw):
         """Read a change section.
 
         This will add a new change section to the main DiffX section.
@@ -178,13 +338,17 @@ class DiffXDOMReader(object):
             section_info (dict):
                 Information on the section from the streaming reader.
 
+            raw (memoryview):
+                The original bytes for the section, or ``None`` if not being
+                kept.
+
         Returns:
             pydiffx.dom.objects.DiffXChangeSection:
             The new change section.
         """
-        return diffx.add_change(**section_info['options'])
+        return diffx._add_parsed_change(section_info['options'], raw)
 
-    def _read_file_section(self, diffx, section, section_info):
+    def _read_file_section(self, diffx, section, section_info, raw):
         """Read a file section.
 
         This will add a new file section to the current change section.
@@ -199,14 +363,239 @@ class DiffXDOMReader(object):
             section_info (dict):
                 Information on the section from the streaming reader.
 
+            raw (memoryview):
+                The original bytes for the section, or ``None`` if not being
+                kept.
+
         Returns:
             pydiffx.dom.objects.DiffXFileSection:
             The new file section.
         """
-        return diffx.changes[-1].add_file(**section_info['options'])
+        return diffx.changes[-1]._add_parsed_file(section_info['options'],
+                                                  raw)
+
+    def _get_content(self, diffx, section_info, key):
+        """Return the content for a content section.
+
+        If content is being loaded lazily, this will be a reference to the
+        content in the stream.
+
+        Args:
+            diffx (pydiffx.dom.objects.DiffX):
+                The DiffX object being populated.
+
+            section_info (dict):
+                Information on the section from the streaming reader.
+
+            key (unicode):
+                The key in ``section_info`` containing the loaded content.
+
+        Returns:
+            object:
+            The content, or a :py:class:`DiffXLazyContent` referencing it.
+        """
+        handle = section_info.get('handle')
+
+        if handle is None:
+            return section_info[key]
 
-    def _set_content_options(self, section, options):
+        return DiffXLazyContent(source=diffx._content_source,
+                                handle=handle)
+
+    def _get_content_options(self, section_info):
+        """Return the options for a content section.
+
+        Args:
+            section_info (dict):
+                Information on the section from the streaming reader.
+
+        Returns:
+            dict:
+            A new dictionary of options, without the content length.
+        """
+        options = dict(section_info['options'])
         options.pop('length', None)
 
-        section.options.clear()
-        section.options.update(options)
+        return options
+
+
+class DiffXContentSource(object):
+    """A source for loading content lazily into DOM objects.
+
+    This is created by :py:class:`DiffXDOMReader` when loading content
+    lazily. It owns the stream and reader used to parse the file, and loads
+    content from them on demand.
+
+    Loaded preamble and diff content is kept in a bounded cache, with the
+    least recently used content evicted first. Metadata is stored on its
+    section once loaded, as it may be modified, so it isn't cached here.
+
+    Content can be loaded from multiple threads.
+
+    Attributes:
+        cache_size (int):
+            The maximum total size of content to cache, in bytes.
+    """
+
+    #: The default maximum total size of content to cache, in bytes.
+    #:
+    #: Type:
+    #:     int
+    DEFAULT_CACHE_SIZE = 32 * 1024 * 1024
+
+    def __init__(self, reader, stream, cache_size=DEFAULT_CACHE_SIZE):
+        """Initialize the source.
+
+        Args:
+            reader (pydiffx.reader.DiffXReader):
+                The reader that parsed the file.
+
+            stream (file or io.IOBase):
+                The seekable stream the reader reads from.
+
+            cache_size (int, optional):
+                The maximum total size of content to cache, in bytes.
+        """
+        self.cache_size = cache_size
+
+        self._reader = reader
+        self._stream = stream
+        self._cache = OrderedDict()
+        self._cached_size = 0
+        self._closed = False
+        self._lock = threading.Lock()
+
+    @property
+    def closed(self):
+        """Whether the source has been closed.
+
+        Type:
+            bool
+        """
+        return self._closed
+
+    def load(self, handle):
+        """Load content from the stream.
+
+        Args:
+            handle (pydiffx.reader.DiffXContentHandle):
+                The handle for the content to load.
+
+        Returns:
+            object:
+            The loaded content.
+
+        Raises:
+            pydiffx.errors.DiffXContentError:
+                The source has been closed.
+
+            pydiffx.errors.DiffXParseError:
+                The content could not be parsed.
+        """
+        cache = self._cache
+        key = handle.offset
+
+        with self._lock:
+            if self._closed:
+                raise DiffXContentError(
+                    'Content for section "%s" cannot be loaded, as the DiffX '
+                    'file has been closed'
+                    % handle.section_id)
+
+            try:
+                cache.move_to_end(key)
+
+                return cache[key][0]
+            except KeyError:
+                pass
+
+            content = handle.read()
+            length = handle.length
+
+            if (handle.section_id not in META_SECTIONS and
+                length <= self.cache_size):
+                cache[key] = (content, length)
+                self._cached_size += length
+
+                # Evict the least recently used content until we're within
+                # the limit.
+                while self._cached_size > self.cache_size:
+                    self._cached_size -= cache.popitem(last=False)[1][1]
+
+        return content
+
+    def close(self):
+        """Close the source and its stream.
+
+        Any content that hasn't been loaded can no longer be accessed.
+        """
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._cache.clear()
+                self._cached_size = 0
+                self._reader.close()
+                self._stream.close()
+
+
+class DiffXLazyContent(object):
+    """A reference to content that will be loaded on first access.
+
+    This is stored on content sections in a
+    :py:class:`~pydiffx.dom.objects.DiffX` that was parsed with content
+    loaded lazily, in place of the content itself.
+
+    Attributes:
+        handle (pydiffx.reader.DiffXContentHandle):
+            The handle for the content within the stream.
+
+        source (DiffXContentSource):
+            The source used to load the content.
+    """
+
+    __slots__ = (
+        'handle',
+        'source',
+    )
+
+    def __init__(self, source, handle):
+        """Initialize the reference.
+
+        Args:
+            source (DiffXContentSource):
+                The source used to load the content.
+
+            handle (pydiffx.reader.DiffXContentHandle):
+                The handle for the content within the stream.
+        """
+        self.source = source
+        self.handle = handle
+
+    def load(self):
+        """Load and return the content.
+
+        Returns:
+            object:
+            The loaded content.
+
+        Raises:
+            pydiffx.errors.DiffXContentError:
+                The source has been closed.
+
+            pydiffx.errors.DiffXParseError:
+                The content could not be parsed.
+        """
+        return self.source.load(self.handle)
+
+    def __repr__(self):
+        """Return a string representation of the reference.
+
+        Returns:
+            unicode:
+            The string representation.
+        """
+        return '<%s(section_id=%r, offset=%r, length=%r)>' % (
+            self.__class__.__name__,
+            self.handle.section_id,
+            self.handle.offset,
+            self.handle.length)
@@ -12,6 +12,19 @@ class DiffXDOMWriter(object):
 
     If constructing manually, one instance can be reused for multiple DiffX
     objects.
+
+    If the DiffX object was parsed with the original bytes of each section
+    kept (see :py:attr:`DiffXDOMReader.keep_raw_bytes
+    <pydiffx.dom.reader.DiffXDOMReader.keep_raw_bytes>`), any section whose
+    content and options haven't changed since, and whose parent sections'
+    options haven't changed, will be copied to the stream as-is. Those
+    sections won't be encoded again, so they'll keep their original
+    formatting, regardless of the JSON codec.
+
+    Attributes:
+        json_codec (pydiffx.json_codecs.BaseJSONCodec):
+            The codec used to encode JSON metadata, or ``None`` to use the
+            default.
     """
 
     #: The class to instantiate for writing to a stream.
@@ -31,6 +44,17 @@ class DiffXDOMWriter(object):
         },
     }
 
+    def __init__(self, json_codec=None):
+        """Initialize the writer.
+
+        Args:
+            json_codec (pydiffx.json_codecs.BaseJSONCodec, optional):
+                The codec used to encode JSON metadata. This defaults to
+                the result of
+                :py:func:`~pydiffx.json_codecs.get_default_json_codec`.
+        """
+        self.json_codec = json_codec
+
     def write_stream(self, diffx, stream):
         """Write a DiffX object to a stream.
 
@@ -46,7 +70,7 @@ class DiffXDOMWriter(object):
                 The DiffX contents could not be written. Details will be in
                 the error message.
         """
-        main_options = diffx.options.copy()
+        main_options = diffx._get_current_options().copy()
 
         version = main_options.pop('version', DiffXWriter.VERSION)
         encoding = main_options.pop('encoding', None)
@@ -54,12 +78,22 @@ class DiffXDOMWriter(object):
         writer = self.writer_cls(stream,
                                  version=version,
                                  encoding=encoding,
+                                 json_codec=self.json_codec,
+                                 buffer_size=DiffXWriter.DEFAULT_BUFFER_SIZE,
                                  **main_options)
 
+        # The main section's header is always written by the writer, but
+        # the original bytes of other sections can only be used if its
+        # options haven't changed, as they may affect how the sections are
+        # encoded.
+        use_raw = diffx._raw is not None
+
         for subsection in diffx:
-            self._write_section(subsection, writer)
+            self._write_section(subsection, writer, use_raw)
 
-    def _write_section(self, section, writer):
+        writer.flush()
+
+    def _write_section(self, section, writer, use_raw):
         """Write a section to the stream.
 
         Args:
@@ -68,13 +102,17 @@ class DiffXDOMWriter(object):
 
             writer (pydiffx.dom.writer.DiffXWriter):
                 The streaming writer to write with.
+
+            use_raw (bool):
+                Whether the original bytes for the section can be written,
+                if available.
         """
         if section.section_id in CONTENT_SECTIONS:
-            self._write_content_section(section, writer)
+            self._write_content_section(section, writer, use_raw)
         else:
-            self._write_container_section(section, writer)
+            self._write_container_section(section, writer, use_raw)
 
-    def _write_container_section(self, section, writer):
+    def _write_container_section(self, section, writer, use_raw):
         """Write a container section to the stream.
 
         Args:
@@ -83,14 +121,28 @@ class DiffXDOMWriter(object):
 
             writer (pydiffx.dom.writer.DiffXWriter):
                 The streaming writer to write with.
+
+            use_raw (bool):
+                Whether the original bytes for the section can be written,
+                if available.
         """
-        write_func = getattr(writer, 'new_%s' % section.section_name)
-        write_func(**self._get_options(section))
+        raw = section._raw if use_raw else None
+
+        if raw is None:
+            write_func = getattr(writer, 'new_%s' % section.section_name)
+            write_func(**self._get_options(section))
+
+            # The subsections may have been encoded based on options that
+            # have since changed.
+            use_raw = False
+        else:
+            writer.write_raw_section(section.section_id, raw,
+                                     encoding=section.encoding)
 
         for subsection in section:
-            self._write_section(subsection, writer)
+            self._write_section(subsection, writer, use_raw)
 
-    def _write_content_section(self, section, writer):
+    def _write_content_section(self, section, writer, use_raw):
         """Write a content section to the stream.
 
         If there's no content to write, the section will be skipped.
@@ -101,8 +153,18 @@ class DiffXDOMWriter(object):
 
             writer (pydiffx.dom.writer.DiffXWriter):
                 The streaming writer to write with.
+
+            use_raw (bool):
+                Whether the original bytes for the section can be written,
+                if available.
         """
-        content = section.content
+        raw = section._raw if use_raw else None
+
+        if raw is not None:
+            writer.write_raw_section(section.section_id, raw)
+            return
+
+        content = section._load_content()
 
         if content:
             write_func = getattr(writer, 'write_%s' % section.section_name)
@@ -122,7 +184,7 @@ class DiffXDOMWriter(object):
             dict:
             The options to pass to the writer function.
         """
-        options = section.options
+        options = section._get_current_options()
 
         try:
             remapped_options = self._remapped_options[section.section_name]
@@ -17,7 +17,8 @@ class DiffXParseError(BaseDiffXError):
             may be ``None`` for some parse errors.
 
         linenum (int):
-            The 0-based line number where the parse error occurred.
+            The 0-based line number where the parse error occurred. This may
+            be ``None`` if the line number is not known.
     """
 
     def __init__(self, msg, linenum, column=None):
@@ -30,13 +31,20 @@ class DiffXParseError(BaseDiffXError):
             linenum (int):
                 The 0-based line number where the parse error occurred.
 
+                This may be ``None`` if the line number is not known (for
+                instance, if preceding content was skipped without being
+                read).
+
             column (int, optional):
                 The 0-based column number where the parse error occurred.
         """
-        prefix = 'Error on line %d' % (linenum + 1)
+        if linenum is None:
+            prefix = 'Error'
+        else:
+            prefix = 'Error on line %d' % (linenum + 1)
 
-        if column is not None:
-            prefix = '%s, column %d' % (prefix, column + 1)
+            if column is not None:
+                prefix = '%s, column %d' % (prefix, column + 1)
 
         super(DiffXParseError, self).__init__('%s: %s' % (prefix, msg))
 
@@ -52,6 +60,10 @@ class DiffXContentError(BaseDiffXError):
     """An error with content for a section."""
 
 
+class DiffXIndexError(BaseDiffXError):
+    """An error with a stored index for a DiffX file."""
+
+
 class DiffXUnknownOptionError(BaseDiffXError):
     """An option name is unknown for a given section."""
 
@@ -0,0 +1,1136 @@
+"""An index of sections in a DiffX file, for random access."""
+
+import hashlib
+import json
+import os
+import struct
+import threading
+import zlib
+
+from pydiffx.errors import DiffXIndexError
+from pydiffx.reader import DiffXContentHandle, DiffXReader
+from pydiffx.sections import (CONTENT_SECTIONS,
+                              META_SECTIONS,
+                              PREAMBLE_SECTIONS,
+                              Section)
+
+
+#: The number of bytes read from each end of a file for its fingerprint.
+_FINGERPRINT_SAMPLE_SIZE = 4096
+
+_INT64 = struct.Struct('<q')
+_UINT32 = struct.Struct('<I')
+
+
+class DiffXIndexedFile(object):
+    """An indexed file section.
+
+    Attributes:
+        diff (pydiffx.reader.DiffXContentHandle):
+            A handle for the file's diff content. This may be ``None``.
+
+        length (int):
+            The length of the entire file section (including its header and
+            all subsections), in bytes.
+
+        meta (pydiffx.reader.DiffXContentHandle):
+            A handle for the file's metadata content. This may be ``None``.
+
+        offset (int):
+            The offset of the file section's header within the stream.
+
+        options (dict):
+            The options parsed from the file section's header.
+
+        path (object):
+            The ``path`` value from the file's metadata. This may be a
+            string, or a dictionary containing ``old`` and ``new`` keys.
+            It will be ``None`` if the metadata has no path.
+    """
+
+    __slots__ = (
+        'diff',
+        'length',
+        'meta',
+        'offset',
+        'options',
+        'path',
+    )
+
+    def __init__(self, offset, options, length=None, path=None, meta=None,
+                 diff=None):
+        """Initialize the indexed file.
+
+        Args:
+            offset (int):
+                The offset of the file section's header within the stream.
+
+            options (dict):
+                The options parsed from the file section's header.
+
+            length (int, optional):
+                The length of the entire file section, in bytes.
+
+            path (object, optional):
+                The ``path`` value from the file's metadata.
+
+            meta (pydiffx.reader.DiffXContentHandle, optional):
+                A handle for the file's metadata content.
+
+            diff (pydiffx.reader.DiffXContentHandle, optional):
+                A handle for the file's diff content.
+        """
+        self.offset = offset
+        self.options = options
+        self.length = length
+        self.path = path
+        self.meta = meta
+        self.diff = diff
+
+    @property
+    def paths(self):
+        """All paths listed in the file's metadata.
+
+        If the ``path`` metadata contains ``old`` and ``new`` keys, this will
+        contain both values (with duplicates removed).
+
+        Type:
+            list of unicode
+        """
+        path = self.path
+
+        if isinstance(path, str):
+            return [path]
+        elif isinstance(path, dict):
+            paths = []
+
+            for key in ('new', 'old'):
+                value = path.get(key)
+
+                if isinstance(value, str) and value not in paths:
+                    paths.append(value)
+
+            return paths
+        else:
+            return []
+
+    def read_meta(self):
+        """Read and return the file's metadata.
+
+        Returns:
+            dict:
+            The metadata, or ``None`` if the file has no meta section.
+
+        Raises:
+            pydiffx.errors.DiffXContentError:
+                The content could not be read from the stream.
+
+            pydiffx.errors.DiffXParseError:
+                The content could not be parsed.
+        """
+        if self.meta is None:
+            return None
+
+        return self.meta.read()
+
+    def read_diff(self):
+        """Read and return the file's diff.
+
+        Returns:
+            bytes or memoryview:
+            The diff content, or ``None`` if the file has no diff section.
+
+        Raises:
+            pydiffx.errors.DiffXContentError:
+                The content could not be read from the stream.
+
+            pydiffx.errors.DiffXParseError:
+                The content could not be parsed.
+        """
+        if self.diff is None:
+            return None
+
+        return self.diff.read()
+
+    def __repr__(self):
+        """Return a string representation of the indexed file.
+
+        Returns:
+            unicode:
+            The string representation.
+        """
+        return '<%s(offset=%r, length=%r, path=%r)>' % (
+            self.__class__.__name__,
+            self.offset,
+            self.length,
+            self.path)
+
+
+class DiffXIndexedChange(object):
+    """An indexed change section.
+
+    Attributes:
+        files (list of DiffXIndexedFile):
+            The indexed files in the change, in order.
+
+        length (int):
+            The length of the entire change section (including its header
+            and all subsections), in bytes.
+
+        meta (pydiffx.reader.DiffXContentHandle):
+            A handle for the change's metadata content. This may be ``None``.
+
+        offset (int):
+            The offset of the change section's header within the stream.
+
+        options (dict):
+            The options parsed from the change section's header.
+
+        preamble (pydiffx.reader.DiffXContentHandle):
+            A handle for the change's preamble content. This may be ``None``.
+    """
+
+    __slots__ = (
+        'files',
+        'length',
+        'meta',
+        'offset',
+        'options',
+        'preamble',
+        '_files_by_path',
+    )
+
+    def __init__(self, offset, options, length=None, preamble=None,
+                 meta=None):
+        """Initialize the indexed change.
+
+        Args:
+            offset (int):
+                The offset of the change section's header within the stream.
+
+            options (dict):
+                The options parsed from the change section's header.
+
+            length (int, optional):
+                The length of the entire change section, in bytes.
+
+            preamble (pydiffx.reader.DiffXContentHandle, optional):
+                A handle for the change's preamble content.
+
+            meta (pydiffx.reader.DiffXContentHandle, optional):
+                A handle for the change's metadata content.
+        """
+        self.offset = offset
+        self.options = options
+        self.length = length
+        self.preamble = preamble
+        self.meta = meta
+        self.files = []
+        self._files_by_path = {}
+
+    def add_file(self, indexed_file):
+        """Add an indexed file to the change.
+
+        The file will be registered under each of its paths. If more than
+        one file in the change shares a path, the first one added will be
+        returned when looking up that path.
+
+        Args:
+            indexed_file (DiffXIndexedFile):
+                The indexed file to add.
+        """
+        self.files.append(indexed_file)
+
+        for path in indexed_file.paths:
+            self._files_by_path.setdefault(path, indexed_file)
+
+    def get_file(self, path):
+        """Return the indexed file with the given path.
+
+        Args:
+            path (unicode):
+                The path of the file. This may be either the old or new path
+                of the file.
+
+        Returns:
+            DiffXIndexedFile:
+            The indexed file.
+
+        Raises:
+            KeyError:
+                No file in the change has the given path.
+        """
+        return self._files_by_path[path]
+
+    def __repr__(self):
+        """Return a string representation of the indexed change.
+
+        Returns:
+            unicode:
+            The string representation.
+        """
+        return '<%s(offset=%r, length=%r, files=%d)>' % (
+            self.__class__.__name__,
+            self.offset,
+            self.length,
+            len(self.files))
+
+
+class DiffXIndex(object):
+    """An index of the sections in a DiffX file.
+
+    An index is built by scanning only the headers of a DiffX file, using
+    each content section's length to skip past its content. Only the file
+    metadata is read, in order to record each file's path.
+
+    Once built, the content of any section can be read directly, without
+    re-parsing the file. For example:
+
+    .. code-block:: python
+
+       with DiffXIndex.from_path('changes.diffx') as index:
+           diff = index.read_diff(37, 'src/foo.c')
+
+    Reading content requires the underlying stream to be seekable (or
+    memory-mapped), and to remain open.
+
+    Indexes for files on disk can be persisted to a compact binary sidecar
+    file (by default, the DiffX file's path with ``.idx`` appended). Using
+    :py:meth:`open`, a stored DiffX file can be opened with a single small
+    read of the sidecar, without scanning the DiffX file. The sidecar will
+    be rebuilt whenever it no longer matches the DiffX file.
+
+    Attributes:
+        changes (list of DiffXIndexedChange):
+            The indexed changes, in order.
+
+        length (int):
+            The length of the DiffX content, in bytes.
+
+        meta (pydiffx.reader.DiffXContentHandle):
+            A handle for the main metadata content. This may be ``None``.
+
+        offset (int):
+            The offset of the main DiffX header within the stream.
+
+        options (dict):
+            The options parsed from the main DiffX header.
+
+        preamble (pydiffx.reader.DiffXContentHandle):
+            A handle for the main preamble content. This may be ``None``.
+
+        reader (pydiffx.reader.DiffXReader):
+            The reader used to read content.
+    """
+
+    #: The version of the sidecar file format.
+    #:
+    #: Type:
+    #:     int
+    SIDECAR_VERSION = 1
+
+    #: The extension appended to a DiffX file's path for its sidecar file.
+    #:
+    #: Type:
+    #:     unicode
+    SIDECAR_EXTENSION = '.idx'
+
+    _SIDECAR_MAGIC = b'DIFFXIDX'
+
+    # Magic, format version, source size, source mtime (in nanoseconds),
+    # source sample digest, body length, and body CRC32.
+    _SIDECAR_HEADER = struct.Struct('<8sHQq16sII')
+
+    @classmethod
+    def open(cls, path, sidecar_path=None, save=True, **kwargs):
+        """Open an index for a DiffX file on disk, using a sidecar file.
+
+        If a sidecar file exists and matches the DiffX file, the index will
+        be loaded from it. Otherwise, the DiffX file will be scanned, and
+        (if ``save`` is set) the new index will be written to the sidecar
+        file.
+
+        The DiffX file will remain open until the index is closed.
+
+        Args:
+            path (unicode):
+                The path to the DiffX file.
+
+            sidecar_path (unicode, optional):
+                The path to the sidecar file. This defaults to ``path`` with
+                :py:attr:`SIDECAR_EXTENSION` appended.
+
+            save (bool, optional):
+                Whether to write a new sidecar file if the existing one is
+                missing or stale.
+
+                If the sidecar file can't be written (for instance, if the
+                directory is read-only), the index will still be returned.
+
+            **kwargs (dict):
+                Additional keyword arguments for
+                :py:meth:`DiffXReader.from_path()
+                <pydiffx.reader.DiffXReader.from_path>`, such as ``mmap``.
+
+        Returns:
+            DiffXIndex:
+            The resulting index.
+
+        Raises:
+            OSError:
+                The DiffX file could not be opened.
+
+            pydiffx.errors.DiffXParseError:
+                The DiffX file could not be parsed.
+        """
+        if sidecar_path is None:
+            sidecar_path = path + cls.SIDECAR_EXTENSION
+
+        try:
+            return cls.load(sidecar_path, path, **kwargs)
+        except (OSError, DiffXIndexError):
+            # The sidecar is missing, unreadable, or stale. Rebuild it.
+            pass
+
+        index = cls.from_path(path, **kwargs)
+
+        if save:
+            try:
+                index.save(sidecar_path, path)
+            except OSError:
+                # The sidecar file is only a cache. The index can still be
+                # used without it.
+                pass
+            except Exception:
+                index.close()
+                raise
+
+        return index
+
+    @classmethod
+    def load(cls, sidecar_path, path, **kwargs):
+        """Load an index from a sidecar file.
+
+        The sidecar file will be checked against the DiffX file's size,
+        modification time, and a digest of a sample of its content.
+
+        Args:
+            sidecar_path (unicode):
+                The path to the sidecar file.
+
+            path (unicode):
+                The path to the DiffX file.
+
+            **kwargs (dict):
+                Additional keyword arguments for
+                :py:meth:`DiffXReader.from_path()
+                <pydiffx.reader.DiffXReader.from_path>`, such as ``mmap``.
+
+        Returns:
+            DiffXIndex:
+            The resulting index.
+
+        Raises:
+            OSError:
+                The DiffX file or sidecar file could not be read.
+
+            pydiffx.errors.DiffXIndexError:
+                The sidecar file is invalid, is for an unsupported version,
+                or no longer matches the DiffX file.
+        """
+        with open(sidecar_path, 'rb') as fp:
+            data = fp.read()
+
+        header = cls._SIDECAR_HEADER
+
+        if len(data) < header.size:
+            raise DiffXIndexError('The index file is truncated')
+
+        (magic, version, size, mtime_ns, digest, body_len,
+         body_crc) = header.unpack_from(data)
+
+        if magic != cls._SIDECAR_MAGIC:
+            raise DiffXIndexError('The file is not a DiffX index file')
+
+        if version != cls.SIDECAR_VERSION:
+            raise DiffXIndexError('Unsupported index file version %d'
+                                  % version)
+
+        body = memoryview(data)[header.size:]
+
+        if len(body) != body_len or zlib.crc32(body) != body_crc:
+            raise DiffXIndexError('The index file is corrupt')
+
+        if (size, mtime_ns, digest) != get_source_fingerprint(path):
+            raise DiffXIndexError('The index file is out of date')
+
+        reader = DiffXReader.from_path(path, **kwargs)
+
+        try:
+            index = cls(reader=reader)
+            _SidecarDecoder(body, reader).decode_index(index)
+        except ValueError as e:
+            reader.close()
+
+            raise DiffXIndexError('The index file is corrupt: %s' % e)
+        except Exception:
+            reader.close()
+            raise
+
+        return index
+
+    @classmethod
+    def from_stream(cls, fp, **kwargs):
+        """Build an index by scanning a DiffX file in a stream.
+
+        The stream will not be closed. It must remain open for content to
+        be read through the index.
+
+        Args:
+            fp (file or io.IOBase):
+                The stream to read from.
+
+            **kwargs (dict):
+                Additional keyword arguments for the
+                :py:class:`~pydiffx.reader.DiffXReader`.
+
+        Returns:
+            DiffXIndex:
+            The resulting index.
+
+        Raises:
+            pydiffx.errors.DiffXParseError:
+                The DiffX file could not be parsed.
+        """
+        return cls.from_reader(DiffXReader(fp, **kwargs))
+
+    @classmethod
+    def from_path(cls, path, **kwargs):
+        """Build an index by scanning a DiffX file on disk.
+
+        The file will remain open until the index is closed.
+
+        Args:
+            path (unicode):
+                The path to the DiffX file.
+
+            **kwargs (dict):
+                Additional keyword arguments for
+                :py:meth:`DiffXReader.from_path()
+                <pydiffx.reader.DiffXReader.from_path>`, such as ``mmap``.
+
+        Returns:
+            DiffXIndex:
+            The resulting index.
+
+        Raises:
+            OSError:
+                The file could not be opened.
+
+            pydiffx.errors.DiffXParseError:
+                The DiffX file could not be parsed.
+        """
+        reader = DiffXReader.from_path(path, **kwargs)
+
+        try:
+            return cls.from_reader(reader)
+        except Exception:
+            reader.close()
+            raise
+
+    @classmethod
+    def from_reader(cls, reader):
+        """Build an index by scanning a DiffX file with a reader.
+
+        The reader must not have been used to read any sections yet.
+
+        Args:
+            reader (pydiffx.reader.DiffXReader):
+                The reader to scan with.
+
+        Returns:
+            DiffXIndex:
+            The resulting index.
+
+        Raises:
+            pydiffx.errors.DiffXParseError:
+                The DiffX file could not be parsed.
+        """
+        index = cls(reader=reader)
+        cur_change = None
+        cur_file = None
+        cur_container = index
+
+        for section in reader.iter_sections(lazy_content=True):
+            section_id = section['section']
+            options = section['options']
+            offset = reader.section_offset
+
+            if section_id in CONTENT_SECTIONS:
+                handle = section['handle']
+
+                if section_id == Section.FILE_DIFF:
+                    cur_file.diff = handle
+                elif section_id == Section.FILE_META:
+                    metadata = handle.read()
+                    cur_file.meta = handle
+
+                    if isinstance(metadata, dict):
+                        cur_file.path = metadata.get('path')
+
+                    cur_change.add_file(cur_file)
+                elif section_id in PREAMBLE_SECTIONS:
+                    cur_container.preamble = handle
+                else:
+                    assert section_id in META_SECTIONS
+                    cur_container.meta = handle
+            elif section_id == Section.MAIN:
+                index.options = options
+                index.offset = offset
+            else:
+                # Close out the lengths of any sections ending here.
+                if cur_file is not None:
+                    cur_file.length = offset - cur_file.offset
+                    cur_file = None
+
+                if section_id == Section.CHANGE:
+                    if cur_change is not None:
+                        cur_change.length = offset - cur_change.offset
+
+                    cur_change = DiffXIndexedChange(offset=offset,
+                                                    options=options)
+                    cur_container = cur_change
+                    index.changes.append(cur_change)
+                else:
+                    assert section_id == Section.FILE
+
+                    cur_file = DiffXIndexedFile(offset=offset,
+                                                options=options)
+
+        # Close out any remaining sections at the end of the file.
+        end_offset = reader.offset
+
+        if cur_file is not None:
+            cur_file.length = end_offset - cur_file.offset
+
+        if cur_change is not None:
+            cur_change.length = end_offset - cur_change.offset
+
+        if index.offset is not None:
+            index.length = end_offset - index.offset
+
+        return index
+
+    def __init__(self, reader=None):
+        """Initialize the index.
+
+        Args:
+            reader (pydiffx.reader.DiffXReader, optional):
+                The reader used to read content.
+        """
+        self.reader = reader
+        self.options = {}
+        self.length = None
+        self.preamble = None
+        self.meta = None
+        self.changes = []
+        self.offset = None
+
+    def save(self, sidecar_path, path):
+        """Save the index to a sidecar file.
+
+        The file will be written atomically, replacing any existing file.
+
+        Args:
+            sidecar_path (unicode):
+                The path to the sidecar file.
+
+            path (unicode):
+                The path to the DiffX file this index was built from.
+
+        Raises:
+            OSError:
+                The sidecar file could not be written.
+        """
+        size, mtime_ns, digest = get_source_fingerprint(path)
+        body = _SidecarEncoder().encode_index(self)
+        header = self._SIDECAR_HEADER.pack(self._SIDECAR_MAGIC,
+                                           self.SIDECAR_VERSION,
+                                           size,
+                                           mtime_ns,
+                                           digest,
+                                           len(body),
+                                           zlib.crc32(body))
+        # The temporary file must be unique to this thread, in case the
+        # index is being saved by several threads or processes at once.
+        tmp_path = '%s.%d.%d.tmp' % (sidecar_path, os.getpid(),
+                                     threading.get_ident())
+
+        try:
+            with open(tmp_path, 'wb') as fp:
+                fp.write(header)
+                fp.write(body)
+
+            os.replace(tmp_path, sidecar_path)
+        except Exception:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+            raise
+
+    def __enter__(self):
+        """Enter a context for the index.
+
+        Returns:
+            DiffXIndex:
+            This index.
+        """
+        return self
+
+    def __exit__(self, *args):
+        """Exit a context for the index, closing it.
+
+        Args:
+            *args (tuple):
+                Exception information, if an exception was raised.
+        """
+        self.close()
+
+    def close(self):
+        """Close the index's reader.
+
+        Content can no longer be read from the index once closed.
+        """
+        if self.reader is not None:
+            self.reader.close()
+
+    def get_change(self, change_num):
+        """Return an indexed change.
+
+        Args:
+            change_num (int):
+                The 0-based index of the change.
+
+        Returns:
+            DiffXIndexedChange:
+            The indexed change.
+
+        Raises:
+            IndexError:
+                The change does not exist.
+        """
+        return self.changes[change_num]
+
+    def get_file(self, change_num, path):
+        """Return an indexed file in a change.
+
+        Args:
+            change_num (int):
+                The 0-based index of the change.
+
+            path (unicode):
+                The path of the file. This may be either the old or new path
+                of the file.
+
+        Returns:
+            DiffXIndexedFile:
+            The indexed file.
+
+        Raises:
+            IndexError:
+                The change does not exist.
+
+            KeyError:
+                No file in the change has the given path.
+        """
+        return self.changes[change_num].get_file(path)
+
+    def read_diff(self, change_num, path):
+        """Read the diff for a file in a change.
+
+        Args:
+            change_num (int):
+                The 0-based index of the change.
+
+            path (unicode):
+                The path of the file. This may be either the old or new path
+                of the file.
+
+        Returns:
+            bytes or memoryview:
+            The diff content, or ``None`` if the file has no diff section.
+
+        Raises:
+            IndexError:
+                The change does not exist.
+
+            KeyError:
+                No file in the change has the given path.
+
+            pydiffx.errors.DiffXContentError:
+                The content could not be read from the stream.
+
+            pydiffx.errors.DiffXParseError:
+                The content could not be parsed.
+        """
+        return self.get_file(change_num, path).read_diff()
+
+    def __len__(self):
+        """Return the number of changes in the index.
+
+        Returns:
+            int:
+            The number of changes.
+        """
+        return len(self.changes)
+
+    def __iter__(self):
+        """Iterate through the indexed changes.
+
+        Yields:
+            DiffXIndexedChange:
+            Each indexed change.
+        """
+        return iter(self.changes)
+
+
+def get_source_fingerprint(path):
+    """Return a fingerprint used to check if a DiffX file has changed.
+
+    The fingerprint consists of the file's size, its modification time, and
+    a digest of the beginning and end of its content. Only a small amount of
+    the file is read.
+
+    Args:
+        path (unicode):
+            The path to the DiffX file.
+
+    Returns:
+        tuple:
+        A 3-tuple of:
+
+        1. The size of the file (:py:class:`int`).
+        2. The modification time, in nanoseconds (:py:class:`int`).
+        3. The sample digest (:py:class:`bytes`).
+
+    Raises:
+        OSError:
+            The file could not be read.
+    """
+    sample_size = _FINGERPRINT_SAMPLE_SIZE
+
+    with open(path, 'rb') as fp:
+        st = os.fstat(fp.fileno())
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(fp.read(sample_size))
+
+        if st.st_size > sample_size:
+            fp.seek(max(sample_size, st.st_size - sample_size))
+            digest.update(fp.read(sample_size))
+
+    return st.st_size, st.st_mtime_ns, digest.digest()
+
+
+class _SidecarEncoder(object):
+    """Encodes an index into the body of a sidecar file.
+
+    Sections are written in file order. Each container lists its options,
+    its optional content handles, and then the count of its children.
+    """
+
+    def __init__(self):
+        """Initialize the encoder."""
+        self._parts = []
+
+    def encode_index(self, index):
+        """Encode an index.
+
+        Args:
+            index (DiffXIndex):
+                The index to encode.
+
+        Returns:
+            bytes:
+            The encoded body.
+        """
+        self._write_container(index)
+        self._write_handle(index.preamble)
+        self._write_handle(index.meta)
+        self._write_uint(len(index.changes))
+
+        for change in index.changes:
+            self._write_container(change)
+            self._write_handle(change.preamble)
+            self._write_handle(change.meta)
+            self._write_uint(len(change.files))
+
+            for indexed_file in change.files:
+                self._write_container(indexed_file)
+                self._write_str(json.dumps(indexed_file.path))
+                self._write_handle(indexed_file.meta)
+                self._write_handle(indexed_file.diff)
+
+        return b''.join(self._parts)
+
+    def _write_container(self, container):
+        """Write the offset, length, and options of a container.
+
+        The offset and length will be ``None`` for the index of an empty
+        file, and are written as ``-1``.
+
+        Args:
+            container (object):
+                The index, indexed change, or indexed file.
+        """
+        for value in (container.offset, container.length):
+            if value is None:
+                value = -1
+
+            self._parts.append(_INT64.pack(value))
+
+        self._write_options(container.options)
+
+    def _write_handle(self, handle):
+        """Write an optional content handle.
+
+        Args:
+            handle (pydiffx.reader.DiffXContentHandle):
+                The handle to write. This may be ``None``.
+        """
+        if handle is None:
+            self._parts.append(b'\x00')
+        else:
+            if handle.line is None:
+                line = -1
+            else:
+                line = handle.line
+
+            self._parts.append(b'\x01')
+            self._parts.append(_INT64.pack(handle.offset))
+            self._parts.append(_INT64.pack(line))
+            self._write_str(handle.encoding or '')
+            self._write_options(handle.options)
+
+    def _write_options(self, options):
+        """Write a dictionary of section options.
+
+        Args:
+            options (dict):
+                The options to write.
+        """
+        self._write_uint(len(options))
+
+        for key, value in options.items():
+            self._write_str(key)
+
+            if isinstance(value, int):
+                self._parts.append(b'i')
+                self._parts.append(_INT64.pack(value))
+            else:
+                self._parts.append(b's')
+                self._write_str(value)
+
+    def _write_str(self, value):
+        """Write a length-prefixed UTF-8 string.
+
+        Args:
+            value (unicode):
+                The string to write.
+        """
+        value = value.encode('utf-8')
+        self._write_uint(len(value))
+        self._parts.append(value)
+
+    def _write_uint(self, value):
+        """Write an unsigned 32-bit integer.
+
+        Args:
+            value (int):
+                The integer to write.
+        """
+        self._parts.append(_UINT32.pack(value))
+
+
+class _SidecarDecoder(object):
+    """Decodes the body of a sidecar file into an index."""
+
+    def __init__(self, data, reader):
+        """Initialize the decoder.
+
+        Args:
+            data (memoryview):
+                The encoded body.
+
+            reader (pydiffx.reader.DiffXReader):
+                The reader for content handles to use.
+        """
+        self._data = data
+        self._pos = 0
+        self._reader = reader
+
+    def decode_index(self, index):
+        """Decode the body into an index.
+
+        Args:
+            index (DiffXIndex):
+                The index to populate.
+
+        Raises:
+            ValueError:
+                The body contained unexpected data.
+        """
+        index.offset, index.length, index.options = self._read_container()
+        index.preamble = self._read_handle(Section.MAIN_PREAMBLE)
+        index.meta = self._read_handle(Section.MAIN_META)
+
+        for i in range(self._read_uint()):
+            offset, length, options = self._read_container()
+            change = DiffXIndexedChange(
+                offset=offset,
+                length=length,
+                options=options,
+                preamble=self._read_handle(Section.CHANGE_PREAMBLE),
+                meta=self._read_handle(Section.CHANGE_META))
+            index.changes.append(change)
+
+            for j in range(self._read_uint()):
+                offset, length, options = self._read_container()
+                change.add_file(DiffXIndexedFile(
+                    offset=offset,
+                    length=length,
+                    options=options,
+                    path=json.loads(self._read_str()),
+                    meta=self._read_handle(Section.FILE_META),
+                    diff=self._read_handle(Section.FILE_DIFF)))
+
+        if self._pos != len(self._data):
+            raise ValueError('Unexpected trailing data')
+
+    def _read_container(self):
+        """Read the offset, length, and options of a container.
+
+        Returns:
+            tuple:
+            A 3-tuple of the offset, length, and options. The offset and
+            length will be ``None`` if they weren't known.
+        """
+        offset = self._read_int()
+        length = self._read_int()
+
+        if offset == -1:
+            offset = None
+
+        if length == -1:
+            length = None
+
+        return offset, length, self._read_options()
+
+    def _read_handle(self, section_id):
+        """Read an optional content handle.
+
+        Args:
+            section_id (unicode):
+                The ID of the section the handle is for.
+
+        Returns:
+            pydiffx.reader.DiffXContentHandle:
+            The handle, or ``None`` if one was not written.
+        """
+        present = self._read_bytes(1)
+
+        if present == b'\x00':
+            return None
+        elif present != b'\x01':
+            raise ValueError('Unexpected content handle marker')
+
+        offset = self._read_int()
+        line = self._read_int()
+        encoding = self._read_str() or None
+        options = self._read_options()
+
+        if line == -1:
+            line = None
+
+        return DiffXContentHandle(reader=self._reader,
+                                  section_id=section_id,
+                                  offset=offset,
+                                  options=options,
+                                  encoding=encoding,
+                                  line=line)
+
+    def _read_options(self):
+        """Read a dictionary of section options.
+
+        Returns:
+            dict:
+            The options.
+        """
+        options = {}
+
+        for i in range(self._read_uint()):
+            key = self._read_str()
+            value_type = self._read_bytes(1)
+
+            if value_type == b'i':
+                options[key] = self._read_int()
+            elif value_type == b's':
+                options[key] = self._read_str()
+            else:
+                raise ValueError('Unexpected option value type')
+
+        return options
+
+    def _read_str(self):
+        """Read a length-prefixed UTF-8 string.
+
+        Returns:
+            unicode:
+            The string.
+        """
+        return self._read_bytes(self._read_uint()).decode('utf-8')
+
+    def _read_int(self):
+        """Read a signed 64-bit integer.
+
+        Returns:
+            int:
+            The integer.
+        """
+        return _INT64.unpack(self._read_bytes(_INT64.size))[0]
+
+    def _read_uint(self):
+        """Read an unsigned 32-bit integer.
+
+        Returns:
+            int:
+            The integer.
+        """
+        return _UINT32.unpack(self._read_bytes(_UINT32.size))[0]
+
+    def _read_bytes(self, length):
+        """Read a number of bytes.
+
+        Args:
+            length (int):
+                The number of bytes to read.
+
+        Returns:
+            bytes:
+            The bytes.
+
+        Raises:
+            ValueError:
+                There were not enough bytes remaining.
+        """
+        pos = self._pos
+        end_pos = pos + length
+
+        if end_pos > len(self._data):
+            raise ValueError('Unexpected end of data')
+
+        self._pos = end_pos
+
+        return self._data[pos:end_pos].tobytes()
+
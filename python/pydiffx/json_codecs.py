@@ -0,0 +1,295 @@
+"""Codecs for encoding and decoding JSON metadata.
+
+Metadata sections in DiffX files are stored as JSON. By default, they're
+read and written using Python's :py:mod:`json` module. A different codec can
+be passed to the readers and writers (through their ``json_codec``
+arguments), or set as the default through :py:func:`set_default_json_codec`.
+
+Custom codecs can subclass :py:class:`BaseJSONCodec`.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class BaseJSONCodec(object):
+    """Base class for a JSON codec.
+
+    Subclasses must implement :py:meth:`loads` and :py:meth:`dumps`.
+
+    Attributes:
+        compact (bool):
+            Whether metadata is serialized without indentation or extra
+            whitespace.
+    """
+
+    #: The name of the codec.
+    #:
+    #: Type:
+    #:     unicode
+    name = None
+
+    def __init__(self, compact=False):
+        """Initialize the codec.
+
+        Args:
+            compact (bool, optional):
+                Whether to serialize metadata without indentation or extra
+                whitespace.
+
+                By default, metadata is serialized with 4-space indentation
+                and sorted keys, as recommended by the DiffX specification.
+                The compact form is still valid DiffX, and is smaller and
+                faster to generate, but is harder for humans to read.
+        """
+        self.compact = compact
+
+    def loads(self, data):
+        """Decode JSON content.
+
+        Args:
+            data (bytes or unicode):
+                The JSON content to decode.
+
+        Returns:
+            object:
+            The decoded value.
+
+        Raises:
+            ValueError:
+                The JSON content could not be decoded.
+        """
+        raise NotImplementedError
+
+    def dumps(self, obj):
+        """Encode a value to JSON.
+
+        Keys must be sorted, and any non-ASCII characters must be escaped,
+        so that the result can be encoded in the encoding of any section.
+
+        Args:
+            obj (object):
+                The value to encode.
+
+        Returns:
+            unicode:
+            The encoded JSON content.
+
+        Raises:
+            TypeError:
+                The value could not be encoded.
+        """
+        raise NotImplementedError
+
+    def __repr__(self):
+        """Return a string representation of the codec.
+
+        Returns:
+            unicode:
+            The string representation.
+        """
+        return '<%s(compact=%r)>' % (self.__class__.__name__, self.compact)
+
+
+class StdlibJSONCodec(BaseJSONCodec):
+    """A JSON codec using Python's :py:mod:`json` module.
+
+    This is the default codec, and is always available.
+    """
+
+    name = 'stdlib'
+
+    def loads(self, data):
+        """Decode JSON content.
+
+        Args:
+            data (bytes or unicode):
+                The JSON content to decode.
+
+        Returns:
+            object:
+            The decoded value.
+
+        Raises:
+            ValueError:
+                The JSON content could not be decoded.
+        """
+        return json.loads(data)
+
+    def dumps(self, obj):
+        """Encode a value to JSON.
+
+        Args:
+            obj (object):
+                The value to encode.
+
+        Returns:
+            unicode:
+            The encoded JSON content.
+
+        Raises:
+            TypeError:
+                The value could not be encoded.
+        """
+        if self.compact:
+            return json.dumps(obj,
+                              separators=(',', ':'),
+                              sort_keys=True)
+        else:
+            return json.dumps(obj,
+                              indent=4,
+                              separators=(',', ': '),
+                              sort_keys=True)
+
+
+class OrjsonJSONCodec(StdlibJSONCodec):
+    """A JSON codec using the third-party orjson_ module.
+
+    This decodes all metadata using orjson. When serializing in compact
+    form, orjson is used as well, falling back to :py:mod:`json` for any
+    values orjson won't encode, or that contain non-ASCII characters (which
+    orjson won't escape).
+
+    orjson doesn't support 4-space indentation, so metadata that isn't
+    compact is always serialized using :py:mod:`json`.
+
+    orjson is stricter than :py:mod:`json` in what it will decode. For
+    instance, it rejects ``NaN`` and integers larger than 64 bits.
+
+    .. _orjson: https://pypi.org/project/orjson/
+    """
+
+    name = 'orjson'
+
+    @classmethod
+    def is_available(cls):
+        """Return whether orjson is installed.
+
+        Returns:
+            bool:
+            ``True`` if orjson can be used.
+        """
+        return orjson is not None
+
+    def __init__(self, *args, **kwargs):
+        """Initialize the codec.
+
+        Args:
+            *args (tuple):
+                Positional arguments for the parent constructor.
+
+            **kwargs (dict):
+                Keyword arguments for the parent constructor.
+
+        Raises:
+            ImportError:
+                orjson is not installed.
+        """
+        if orjson is None:
+            raise ImportError('orjson must be installed to use %s'
+                              % self.__class__.__name__)
+
+        super(OrjsonJSONCodec, self).__init__(*args, **kwargs)
+
+    def loads(self, data):
+        """Decode JSON content.
+
+        Args:
+            data (bytes or unicode):
+                The JSON content to decode.
+
+        Returns:
+            object:
+            The decoded value.
+
+        Raises:
+            ValueError:
+                The JSON content could not be decoded.
+        """
+        return orjson.loads(data)
+
+    def dumps(self, obj):
+        """Encode a value to JSON.
+
+        Args:
+            obj (object):
+                The value to encode.
+
+        Returns:
+            unicode:
+            The encoded JSON content.
+
+        Raises:
+            TypeError:
+                The value could not be encoded.
+        """
+        if self.compact:
+            try:
+                data = orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+            except TypeError:
+                # orjson rejects some values that json accepts, such as
+                # non-string keys and very large integers.
+                data = None
+
+            if data is not None and data.isascii():
+                return data.decode('ascii')
+
+        return super(OrjsonJSONCodec, self).dumps(obj)
+
+
+_default_json_codec = StdlibJSONCodec()
+
+
+def get_default_json_codec():
+    """Return the default JSON codec.
+
+    This is used by readers and writers that aren't given a codec.
+
+    Returns:
+        BaseJSONCodec:
+        The default JSON codec.
+    """
+    return _default_json_codec
+
+
+def set_default_json_codec(codec):
+    """Set the default JSON codec.
+
+    This affects readers and writers created after this call.
+
+    Args:
+        codec (BaseJSONCodec):
+            The new default codec. If ``None``, the default will be reset to
+            a :py:class:`StdlibJSONCodec`.
+    """
+    global _default_json_codec
+
+    if codec is None:
+        codec = StdlibJSONCodec()
+
+    _default_json_codec = codec
+
+
+def get_fast_json_codec(compact=False):
+    """Return the fastest JSON codec available.
+
+    This will use :py:class:`OrjsonJSONCodec` if orjson is installed, and
+    :py:class:`StdlibJSONCodec` otherwise.
+
+    Args:
+        compact (bool, optional):
+            Whether to serialize metadata without indentation or extra
+            whitespace.
+
+    Returns:
+        BaseJSONCodec:
+        The new JSON codec.
+    """
+    if OrjsonJSONCodec.is_available():
+        return OrjsonJSONCodec(compact=compact)
+    else:
+        return StdlibJSONCodec(compact=compact)
@@ -0,0 +1,375 @@
+"""Parallel parsing of large DiffX files.
+
+Large DiffX files (such as those containing thousands of changes) can be
+parsed across multiple processes using :py:func:`parse_parallel`.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from pydiffx.dom.objects import DiffX
+from pydiffx.errors import DiffXParseError
+from pydiffx.reader import DiffXReader
+from pydiffx.sections import Section
+
+
+#: The number of batches of changes to create for each worker.
+#:
+#: Several batches per worker helps balance the load when changes vary in
+#: size.
+#:
+#: Type:
+#:     int
+BATCHES_PER_WORKER = 4
+
+
+def parse_parallel(path, workers=None, generate_stats=False, diffx_cls=DiffX,
+                   executor=None):
+    """Parse a DiffX file on disk into a DOM, using multiple processes.
+
+    The file will first be scanned for the change sections, reading only
+    the headers and skipping all content. The changes will then be split
+    into batches of byte ranges, and each batch will be parsed in a separate
+    process (decoding all metadata and content, and optionally generating
+    statistics). The results will be assembled into a
+    :py:class:`~pydiffx.dom.objects.DiffX` in the original order.
+
+    The result is equivalent to that of
+    :py:meth:`DiffX.from_stream() <pydiffx.dom.objects.DiffX.from_stream>`.
+
+    If the file fails to parse, it will be parsed again in the current
+    process, so that the error raised will contain accurate line numbers.
+
+    Args:
+        path (unicode):
+            The path to the DiffX file.
+
+        workers (int, optional):
+            The number of worker processes to use. This defaults to the
+            number of CPUs.
+
+            If this is 1, or the file contains a single change, the file
+            will be parsed in the current process.
+
+        generate_stats (bool, optional):
+            Whether to generate statistics for the DiffX, changes, and files
+            (as done by :py:meth:`DiffX.generate_stats()
+            <pydiffx.dom.objects.DiffX.generate_stats>`). Statistics for
+            each change are generated in the worker processes.
+
+        diffx_cls (type, optional):
+            The :py:class:`~pydiffx.dom.objects.DiffX` class or subclass to
+            create. This must be importable by the worker processes.
+
+        executor (concurrent.futures.Executor, optional):
+            An existing executor to parse changes in. If provided,
+            ``workers`` is only used to determine the number of batches.
+
+    Returns:
+        pydiffx.dom.objects.DiffX:
+        The resulting DiffX instance.
+
+    Raises:
+        pydiffx.errors.DiffXParseError:
+            The DiffX file could not be parsed. Details will be in the error
+            message.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    try:
+        main_header, changes_offset, change_ranges = _scan_changes(path)
+    except DiffXParseError:
+        return _parse_serial(path, diffx_cls, generate_stats)
+
+    with open(path, 'rb') as fp:
+        diffx = diffx_cls.from_bytes(fp.read(changes_offset))
+
+    batches = _get_batches(change_ranges,
+                           num_batches=workers * BATCHES_PER_WORKER)
+    batch_args = [
+        (path, main_header, start, end, diffx_cls, generate_stats)
+        for start, end in batches
+    ]
+
+    if executor is not None:
+        results = _run_batches(executor, batch_args)
+    elif workers > 1 and len(batches) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = _run_batches(executor, batch_args)
+    else:
+        results = [
+            _parse_changes(*args)
+            for args in batch_args
+        ]
+
+    if None in results:
+        # One of the batches failed to parse. Parse the whole file to report
+        # the error with accurate line numbers.
+        return _parse_serial(path, diffx_cls, generate_stats)
+
+    for change_records in results:
+        for change_record in change_records:
+            _restore_container(diffx.add_change(), change_record)
+
+    if generate_stats:
+        diffx._update_stats_from_changes()
+
+    return diffx
+
+
+def _scan_changes(path):
+    """Scan a DiffX file for the byte ranges of each change.
+
+    Only headers are read. All content is skipped.
+
+    Args:
+        path (unicode):
+            The path to the DiffX file.
+
+    Returns:
+        tuple:
+        A 3-tuple of:
+
+        1. The main ``#diffx:`` header line (:py:class:`bytes`).
+        2. The offset of the first change, or the file size if there are
+           no changes (:py:class:`int`).
+        3. A list of ``(start, end)`` offsets for each change
+           (:py:class:`list` of :py:class:`tuple`).
+
+    Raises:
+        pydiffx.errors.DiffXParseError:
+            A section header could not be parsed.
+    """
+    file_size = os.path.getsize(path)
+    change_offsets = []
+    main_header_range = None
+
+    with DiffXReader.from_path(path) as reader:
+        for section in reader.iter_sections(lazy_content=True):
+            section_id = section['section']
+
+            if section_id == Section.MAIN:
+                main_header_range = (reader.section_offset, reader.offset)
+            elif section_id == Section.CHANGE:
+                change_offsets.append(reader.section_offset)
+
+    if main_header_range is None:
+        # This is an empty file. Let the normal parser handle it.
+        return b'', file_size, []
+
+    with open(path, 'rb') as fp:
+        fp.seek(main_header_range[0])
+        main_header = fp.read(main_header_range[1] - main_header_range[0])
+
+    change_ranges = list(zip(change_offsets,
+                             change_offsets[1:] + [file_size]))
+
+    if change_offsets:
+        changes_offset = change_offsets[0]
+    else:
+        changes_offset = file_size
+
+    return main_header, changes_offset, change_ranges
+
+
+def _get_batches(change_ranges, num_batches):
+    """Group consecutive changes into batches of similar size.
+
+    Args:
+        change_ranges (list of tuple):
+            The ``(start, end)`` offsets for each change.
+
+        num_batches (int):
+            The ideal number of batches.
+
+    Returns:
+        list of tuple:
+        The ``(start, end)`` offsets for each batch.
+    """
+    if not change_ranges:
+        return []
+
+    first_offset = change_ranges[0][0]
+    target_size = max(1, (change_ranges[-1][1] - first_offset) // num_batches)
+    batches = []
+    batch_start = first_offset
+
+    for start, end in change_ranges:
+        if end - batch_start >= target_size:
+            batches.append((batch_start, end))
+            batch_start = end
+
+    if batch_start < change_ranges[-1][1]:
+        batches.append((batch_start, change_ranges[-1][1]))
+
+    return batches
+
+
+def _run_batches(executor, batch_args):
+    """Parse batches of changes in an executor.
+
+    Args:
+        executor (concurrent.futures.Executor):
+            The executor to parse the batches in.
+
+        batch_args (list of tuple):
+            The arguments for :py:func:`_parse_changes` for each batch.
+
+    Returns:
+        list:
+        The results of :py:func:`_parse_changes` for each batch, in order.
+    """
+    futures = [
+        executor.submit(_parse_changes, *args)
+        for args in batch_args
+    ]
+
+    return [
+        future.result()
+        for future in futures
+    ]
+
+
+def _parse_changes(path, main_header, start, end, diffx_cls, generate_stats):
+    """Parse a range of changes from a DiffX file.
+
+    This is run in the worker processes. The main ``#diffx:`` header is
+    placed before the changes, so that encodings are inherited correctly.
+
+    Args:
+        path (unicode):
+            The path to the DiffX file.
+
+        main_header (bytes):
+            The main ``#diffx:`` header line.
+
+        start (int):
+            The offset of the first change to parse.
+
+        end (int):
+            The offset following the last change to parse.
+
+        diffx_cls (type):
+            The :py:class:`~pydiffx.dom.objects.DiffX` class or subclass to
+            parse with.
+
+        generate_stats (bool):
+            Whether to generate statistics for each change.
+
+    Returns:
+        list of dict:
+        A record of each change, for :py:func:`_restore_container`. This
+        will be ``None`` if the changes failed to parse.
+    """
+    with open(path, 'rb') as fp:
+        fp.seek(start)
+        data = fp.read(end - start)
+
+    try:
+        diffx = diffx_cls.from_bytes(main_header + data)
+    except DiffXParseError:
+        # Line numbers in this error are relative to the batch, and the
+        # error may not survive being sent back to the parent process. The
+        # parent will report the error instead.
+        return None
+
+    change_records = []
+
+    for change_section in diffx.changes:
+        if generate_stats:
+            change_section.generate_stats()
+
+        change_records.append(_serialize_container(change_section))
+
+    return change_records
+
+
+def _parse_serial(path, diffx_cls, generate_stats):
+    """Parse a DiffX file in the current process.
+
+    Args:
+        path (unicode):
+            The path to the DiffX file.
+
+        diffx_cls (type):
+            The :py:class:`~pydiffx.dom.objects.DiffX` class or subclass to
+            create.
+
+        generate_stats (bool):
+            Whether to generate statistics.
+
+    Returns:
+        pydiffx.dom.objects.DiffX:
+        The resulting DiffX instance.
+
+    Raises:
+        pydiffx.errors.DiffXParseError:
+            The DiffX file could not be parsed.
+    """
+    diffx = diffx_cls.from_path(path)
+
+    if generate_stats:
+        diffx.generate_stats()
+
+    return diffx
+
+
+def _serialize_container(container_section):
+    """Return a picklable record of a change or file section.
+
+    Args:
+        container_section (pydiffx.dom.objects.BaseDiffXContainerSection):
+            The change or file section to serialize.
+
+    Returns:
+        dict:
+        The record of the section.
+    """
+    record = {
+        'options': container_section.options.copy(),
+    }
+
+    for name in ('preamble', 'meta', 'diff'):
+        content_section = getattr(container_section, '%s_section' % name,
+                                  None)
+
+        if content_section is not None:
+            record[name] = (content_section.content,
+                            content_section.options.copy())
+
+    files = getattr(container_section, 'files', None)
+
+    if files is not None:
+        record['files'] = [
+            _serialize_container(file_section)
+            for file_section in files
+        ]
+
+    return record
+
+
+def _restore_container(container_section, record):
+    """Restore a change or file section from a record.
+
+    Args:
+        container_section (pydiffx.dom.objects.BaseDiffXContainerSection):
+            The newly-added change or file section to restore.
+
+        record (dict):
+            The record from :py:func:`_serialize_container`.
+    """
+    container_section.options = record['options']
+
+    for name in ('preamble', 'meta', 'diff'):
+        if name in record:
+            content, options = record[name]
+            content_section = getattr(container_section, '%s_section' % name)
+
+            if content is not None:
+                content_section.content = content
+
+            content_section.options = options
+
+    for file_record in record.get('files', []):
+        _restore_container(container_section.add_file(), file_record)
@@ -0,0 +1,238 @@
+"""A sans-IO push parser for DiffX files."""
+
+from pydiffx.reader import BaseDiffXReader
+from pydiffx.sections import CONTENT_SECTIONS
+
+
+class DiffXParser(BaseDiffXReader):
+    """A sans-IO push parser for DiffX files.
+
+    This parser doesn't read from any source itself. Instead, the caller
+    feeds it data as it arrives, in chunks of any size, and the parser
+    returns each section once enough data has arrived to parse it. This
+    allows any transport to drive the parser incrementally, such as sockets,
+    chunked HTTP bodies, message queues, or decompressors.
+
+    Sections are parsed and validated exactly as they are by
+    :py:class:`~pydiffx.reader.DiffXReader`, and the same information is
+    returned for each section. See
+    :py:meth:`DiffXReader.iter_sections
+    <pydiffx.reader.DiffXReader.iter_sections>` for details.
+
+    Only a section's header and content are buffered at any time. Content
+    for files that were filtered out is discarded as it arrives.
+
+    Example:
+        .. code-block:: python
+
+           parser = DiffXParser()
+
+           for chunk in chunks:
+               for section in parser.feed(chunk):
+                   ...
+
+           for section in parser.close():
+               ...
+    """
+
+    def __init__(self, file_filter=None, lazy_metadata=False,
+                 json_codec=None, section_records=False):
+        """Initialize the parser.
+
+        Args:
+            file_filter (callable, optional):
+                A function used to choose which files to return. This takes
+                the file's metadata dictionary as its only argument, and
+                returns whether the file should be returned.
+
+                The diffs of files that don't match will be discarded without
+                being buffered or decoded.
+
+            lazy_metadata (bool, optional):
+                Whether to defer decoding the JSON in metadata sections until
+                the metadata is first accessed.
+
+            json_codec (pydiffx.json_codecs.BaseJSONCodec, optional):
+                The codec used to decode JSON metadata. This defaults to
+                the result of
+                :py:func:`~pydiffx.json_codecs.get_default_json_codec`.
+
+            section_records (bool, optional):
+                Whether to return each section as a
+                :py:class:`~pydiffx.reader.DiffXSectionInfo` rather than a
+                dictionary.
+        """
+        super(DiffXParser, self).__init__(json_codec=json_codec)
+
+        self._begin_sections(file_filter=file_filter,
+                             lazy_metadata=lazy_metadata,
+                             section_records=section_records)
+
+        self._buf = bytearray()
+        self._buf_pos = 0
+        self._closed = False
+
+        # The content section waiting on content, its encoding, and the
+        # amount of content still needed for it.
+        self._content_section = None
+        self._content_encoding = None
+        self._content_remaining = 0
+
+    def feed(self, data):
+        """Feed data to the parser.
+
+        Args:
+            data (bytes):
+                The next chunk of data from the DiffX file. This may be of
+                any size.
+
+        Returns:
+            list of dict or pydiffx.reader.DiffXSectionInfo:
+            Information on each section that could be parsed from the data
+            fed so far, in order. This may be empty if more data is needed.
+
+        Raises:
+            ValueError:
+                The parser has already been closed.
+
+            pydiffx.errors.DiffXParseError:
+                The file or a section was unable to be parsed. Information
+                will be provided in the message and the instance's attributes.
+        """
+        if self._closed:
+            raise ValueError('Data cannot be fed to a closed parser')
+
+        self._buf += data
+
+        return self._parse(eof=False)
+
+    def close(self):
+        """Close the parser, signaling the end of the file.
+
+        Any remaining buffered data will be parsed.
+
+        Returns:
+            list of dict:
+            Information on each remaining section, in order.
+
+        Raises:
+            pydiffx.errors.DiffXParseError:
+                The file or a section was unable to be parsed. Information
+                will be provided in the message and the instance's attributes.
+        """
+        if self._closed:
+            return []
+
+        self._closed = True
+
+        return self._parse(eof=True)
+
+    def _parse(self, eof):
+        """Parse as many sections as possible from the buffered data.
+
+        Args:
+            eof (bool):
+                Whether the end of the file has been reached.
+
+        Returns:
+            list of dict:
+            Information on each section parsed, in order.
+
+        Raises:
+            pydiffx.errors.DiffXParseError:
+                The file or a section was unable to be parsed.
+        """
+        buf = self._buf
+        sections = []
+
+        while True:
+            section = self._content_section
+
+            if section is None:
+                # We're looking for the next header.
+                i = buf.find(b'\n', self._buf_pos)
+
+                if i == -1:
+                    # We'll need more data. As with DiffXReader, any
+                    # incomplete line at the end of the file is ignored.
+                    break
+
+                header = bytes(buf[self._buf_pos:i + 1])
+                self._buf_pos = i + 1
+
+                if not header.strip():
+                    # Skip any blank lines before a header.
+                    continue
+
+                section = self._parse_header(header)
+                encoding = self._start_section(section)
+
+                if (self._get_section_field(section, 'section') not in
+                    CONTENT_SECTIONS):
+                    sections += self._finish_section(section)
+                    continue
+
+                self._content_section = section
+                self._content_encoding = encoding
+                self._content_remaining = \
+                    self._get_section_field(section, 'options')['length']
+
+            # We're waiting on the content for a content section.
+            section_id, level, linenum, options = \
+                self._get_section_fields(section)
+
+            if self._skipping_file:
+                # This belongs to a file that was filtered out. Discard the
+                # content as it arrives.
+                skip_len = min(self._content_remaining,
+                               len(buf) - self._buf_pos)
+                self._buf_pos += skip_len
+                self._content_remaining -= skip_len
+
+                if self._content_remaining > 0:
+                    if not eof:
+                        break
+
+                    length = options['length']
+                    self._check_skipped_content(
+                        length=length,
+                        skipped=length - self._content_remaining,
+                        linenum=linenum)
+
+                # Line numbers can't be tracked from here on.
+                self._linenum = None
+            else:
+                start = self._buf_pos
+                end = start + self._content_remaining
+
+                if end > len(buf) and not eof:
+                    break
+
+                data = bytes(buf[start:end])
+                self._buf_pos = min(end, len(buf))
+
+                content, num_lines = self._decode_content(
+                    section_id=section_id,
+                    data=data,
+                    options=options,
+                    encoding=self._content_encoding,
+                    linenum=linenum)
+
+                if self._linenum is not None:
+                    self._linenum += num_lines
+
+                self._set_section_field(section,
+                                        self._CONTENT_KEYS[section_id],
+                                        content)
+
+            self._content_section = None
+            self._content_encoding = None
+            self._content_remaining = 0
+
+            sections += self._finish_section(section)
+
+        # Drop everything that's been parsed.
+        del buf[:self._buf_pos]
+        self._buf_pos = 0
+
+        return sections
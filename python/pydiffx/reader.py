@@ -1,39 +1,54 @@
 """A streaming reader for DiffX files."""
 
-import io
-import json
+import mmap as _mmap
+import operator
 import os
 import re
+import sys
+from collections.abc import MutableMapping
+from types import MappingProxyType
 
-from pydiffx.errors import DiffXParseError
-from pydiffx.options import SpecVersion
+from pydiffx.errors import DiffXContentError, DiffXParseError
+from pydiffx.json_codecs import get_default_json_codec
+from pydiffx.options import LineEndings, SpecVersion
 from pydiffx.sections import (CONTENT_SECTIONS,
                               META_SECTIONS,
                               PREAMBLE_SECTIONS,
                               Section,
                               VALID_SECTION_STATES)
 from pydiffx.utils.text import (NEWLINE_FORMATS,
+                                count_lines,
+                                dedent_lines,
                                 get_newline_for_type,
                                 guess_line_endings,
-                                split_lines,
                                 strip_bom)
 
 
-class DiffXReader(object):
-    """A streaming reader for DiffX files.
-
-    This is a low-level interface for reading a DiffX file from an existing
-    stream, such as an opened file handle or a web server response.
+class BaseDiffXReader(object):
+    """Base class for DiffX readers.
 
-    Consumers can iterate through each section of the DiffX file, reading
-    sections one-by-one and processing them. This can be used to process the
-    metadata on-the-fly without retaining the entirety of the file in memory,
-    or to convert it into another data structure.
+    This contains the parsing and validation logic shared by all readers,
+    regardless of how they read from their source. This covers parsing and
+    validating section headers, tracking the valid order of sections and the
+    encodings inherited by each section, filtering files, and processing and
+    decoding content.
 
-    See :py:meth:`iter_sections` for details on the information returned
-    during iteration.
+    Subclasses are responsible for reading headers and content from their
+    source and passing them here for processing.
     """
 
+    _CONTENT_KEYS = {
+        Section.MAIN_PREAMBLE: 'text',
+        Section.MAIN_META: 'metadata',
+        Section.CHANGE_PREAMBLE: 'text',
+        Section.CHANGE_META: 'metadata',
+        Section.FILE_META: 'metadata',
+        Section.FILE_DIFF: 'diff',
+    }
+
+    # The fields returned by _get_section_fields(), in order.
+    _SECTION_FIELD_NAMES = ('section', 'level', 'line', 'options')
+
     _HEADER_OPTION_KEY_RE = re.compile(br'[A-Za-z][A-Za-z0-9_-]*')
     _HEADER_OPTION_VALUE_RE = re.compile(br'[A-Za-z0-9_.-]+')
     _HEADER_RE = re.compile(
@@ -42,238 +57,169 @@ class DiffXReader(object):
         br'(?: (?P<options>[^=\s,]+=[^\s,]+(?:, [^=\s,]+=[^\s,]+)*))?$'
     )
 
-    def __init__(self, fp):
+    # This matches only headers whose option keys and values consist
+    # entirely of valid characters. These are a subset of what's accepted
+    # by the checks in _parse_header_options(), and can be parsed without
+    # validating each option.
+    _FAST_HEADER_RE = re.compile(
+        br'^#(?P<section_id>\.{0,3}'
+        br'(?:diffx|preamble|meta|change|file|diff)):'
+        br'(?: (?P<options>'
+        br'[A-Za-z][A-Za-z0-9_-]*=[A-Za-z0-9_.-]+'
+        br'(?:, [A-Za-z][A-Za-z0-9_-]*=[A-Za-z0-9_.-]+)*'
+        br'))?$'
+    )
+
+    # A mapping of every section ID that can be matched by the header
+    # regexes to its decoded ID, level, and type.
+    _HEADER_SECTION_IDS = {
+        ('.' * _level + _type).encode('ascii'): (
+            sys.intern('.' * _level + _type),
+            _level,
+            sys.intern(_type),
+        )
+        for _level in range(4)
+        for _type in ('diffx', 'preamble', 'meta', 'change', 'file', 'diff')
+    }
+
+    # Parsed header options that aren't numbers, keyed off by the raw
+    # "key=value" bytes. Most files only use a handful of these, such as
+    # "format=json" or "encoding=utf-8".
+    _header_option_cache = {}
+
+    # The maximum number of entries in _header_option_cache.
+    _HEADER_OPTION_CACHE_MAX_SIZE = 256
+
+    # Immutable options shared between section records, keyed off by the
+    # raw options in the header. Only options without numeric values (such
+    # as those for change and file sections) are stored here, since lengths
+    # rarely repeat.
+    _shared_options_cache = {}
+
+    # The maximum number of entries in _shared_options_cache.
+    _SHARED_OPTIONS_CACHE_MAX_SIZE = 256
+
+    #: Validation modes that can be passed to the reader.
+    #:
+    #: Type:
+    #:     tuple of unicode
+    VALIDATION_MODES = ('strict', 'fast')
+
+    def __init__(self, json_codec=None, validation='strict'):
         """Initialize the reader.
 
         Args:
-            fp (file or io.IOBase):
-                The file pointer/stream to read from. This must be opened in
-                binary (bytes) mode.
-        """
-        self._fp = fp
-        self._linenum = 0
-        self._file_newlines = None
-
-    def __iter__(self):
-        """Iterate through all sections of a DiffX file.
-
-        This is a convenience wrapper around :py:meth:`iter_sections`. See
-        that method for details.
+            json_codec (pydiffx.json_codecs.BaseJSONCodec, optional):
+                The codec used to decode JSON metadata. This defaults to
+                the result of
+                :py:func:`~pydiffx.json_codecs.get_default_json_codec`.
 
-        Yields:
-            dict:
-            Information on the section.
+            validation (unicode, optional):
+                The validation mode, either ``strict`` or ``fast``. See
+                :py:class:`DiffXReader` for details.
 
         Raises:
-            pydiffx.errors.DiffXParseError:
-                The file or a section was unable to be parsed. Information
-                will be provided in the message and the instance's attributes.
+            ValueError:
+                The validation mode was not valid.
         """
-        return self.iter_sections()
-
-    def iter_sections(self):
-        """Iterate through all sections of a DiffX file.
-
-        Each section and subsection will be parsed individually, returning the
-        following data on each new section:
-
-        ``level`` (:py:class:`int`):
-            The 0-based section level (corresponding to the number of ``.``
-            level indicator characters in the section ID).
-
-        ``line`` (:py:class:`int`):
-            The 0-based line number where the section starts.
-
-        ``options`` (:py:class:`dict`):
-            A dictionary of options found for the section.
-
-        ``section`` (:py:class:`unicode`):
-            The ID of the section. This corresponds to one of:
-
-            * :py:attr:`~pydiffx.sections.Section.MAIN`
-            * :py:attr:`~pydiffx.sections.Section.MAIN_PREAMBLE`
-            * :py:attr:`~pydiffx.sections.Section.MAIN_META`
-            * :py:attr:`~pydiffx.sections.Section.CHANGE`
-            * :py:attr:`~pydiffx.sections.Section.CHANGE_PREAMBLE`
-            * :py:attr:`~pydiffx.sections.Section.CHANGE_META`
-            * :py:attr:`~pydiffx.sections.Section.FILE`
-            * :py:attr:`~pydiffx.sections.Section.FILE_META`
-            * :py:attr:`~pydiffx.sections.Section.FILE_DIFF`
-
-        ``type`` (:py:class:`unicode`):
-            The type of section (the ID in the file following the ``.``
-            level indicator characters).
-
-        Preamble sections will also contain:
-
-        ``text`` (:py:class:`unicode`):
-            The decoded text content of the preamble.
-
-        Metadata sections will also contain:
-
-        ``metadata`` (:py:class:`dict`):
-            A dictionary containing all metadata for the section.
+        if validation not in self.VALIDATION_MODES:
+            raise ValueError('validation must be one of %s, not %r'
+                             % (', '.join(self.VALIDATION_MODES),
+                                validation))
 
-        Diff sections will also contain:
+        if json_codec is None:
+            json_codec = get_default_json_codec()
 
-        ``diff`` (:py:class:`bytes` or :py:class:`unicode`):
-            The diff content. If an encoding is specified, this will be
-            decoded to a Unicode string. Otherwise, it will be a byte string.
-            Callers must check for this.
+        self.json_codec = json_codec
+        self.validation = validation
+        self._strict = (validation == 'strict')
+        self._file_newlines = None
+        self._begin_sections()
 
-        Note:
-            If any given section fails to parse, an error will be raised and
-            parsing will stop.
+        if self._strict:
+            self._linenum = 0
+        else:
+            # Line numbers are only used for error reporting, and aren't
+            # tracked when validating quickly.
+            self._linenum = None
 
-        Yields:
-            dict:
-            Information on the section.
+    def _begin_sections(self, lazy_content=False, file_filter=None,
+                        lazy_metadata=False, section_records=False):
+        """Begin tracking state for iterating through sections.
 
-        Raises:
-            pydiffx.errors.DiffXParseError:
-                The file or a section was unable to be parsed. Information
-                will be provided in the message and the instance's attributes.
+        Args:
+            lazy_content (bool or set of unicode, optional):
+                Whether to provide handles for content sections, rather than
+                reading their content up-front. See
+                :py:meth:`DiffXReader.iter_sections` for details.
+
+            file_filter (callable, optional):
+                A function used to choose which files to return. See
+                :py:meth:`DiffXReader.iter_sections` for details.
+
+            lazy_metadata (bool, optional):
+                Whether to defer decoding metadata until it's accessed. See
+                :py:meth:`DiffXReader.iter_sections` for details.
+
+            section_records (bool, optional):
+                Whether to return sections as :py:class:`DiffXSectionInfo`
+                records. See :py:meth:`DiffXReader.iter_sections` for
+                details.
         """
-        # We'll be keeping track of a few pieces of state.
-        #
         # This is a list of sections considered valid at each iteration.
         # We start by looking for the main "#diffx:" section. Every section
         # we process will rebuild this list, using a list of valid sections
         # defined in VALID_SECTION_STATES, keyed off by the current section
         # ID.
-        valid_sections = {Section.MAIN}
+        self._valid_sections = {Section.MAIN}
 
         # This is a stack of encodings. Every time we go up a container
         # section, or go to a container section at the same level, we'll pop
         # the last value off the stack. We'll then add the new encoding
         # (either defined on the section or inherited from a parent section)
         # onto the stack.
-        encodings = [None]
+        self._encodings = [None]
 
         # The last container section level from a previous iteration.
-        prev_container_level = 0
-
-        while True:
-            section = self._read_header(valid_sections=valid_sections)
-
-            if section is None:
-                # We've read the last section. We're done parsing.
-                break
-
-            level = section['level']
-            linenum = section['line']
-            options = section['options']
-            section_id = section['section']
-
-            if section_id in CONTENT_SECTIONS:
-                # This is a content section.
-                encoding = options.get('encoding', encodings[-1])
+        self._prev_container_level = 0
 
-                try:
-                    length = options['length']
-                except KeyError:
-                    raise DiffXParseError(
-                        'Expected section "%s" to have a length option'
-                        % section_id,
-                        linenum=linenum)
-
-                if section_id in PREAMBLE_SECTIONS:
-                    # This is a preamble section.
-                    #
-                    # Read the content and decode it using the current
-                    # encoding (defined either on this section or in a parent).
-                    section['text'] = self._read_content(
-                        length=length,
-                        encoding=encoding,
-                        indent=options.get('indent'),
-                        line_endings=options.get('line_endings'))
-                elif section_id in META_SECTIONS:
-                    # This is a metadata section.
-                    #
-                    # Validate the format as JSON (either explicitly provided
-                    # as format=json, or left off entirely).
-                    metadata_format = options.get('format', 'json')
-
-                    if metadata_format != 'json':
-                        raise DiffXParseError(
-                            'Unexpected metadata format "%(format)s". If the '
-                            '"format" option is provided, it must be "json".'
-                            % {
-                                'format': metadata_format,
-                            },
-                            linenum=linenum)
-
-                    # Read the content and decode it using the current encoding
-                    # (defined either on this section or in a parent).
-                    content = self._read_content(
-                        length=length,
-                        encoding=encoding,
-                        line_endings=options.get('line_endings'))
-
-                    try:
-                        section['metadata'] = json.loads(content)
-                    except ValueError as e:
-                        raise DiffXParseError(
-                            'JSON metadata could not be parsed: %s' % e,
-                            linenum=linenum)
-                else:
-                    assert section_id == Section.FILE_DIFF
-
-                    # This is a diff section.
-                    #
-                    # Read the content. If an explicit encoding is provided,
-                    # decode it to a Unicode string. Otherwise, it will remain
-                    # a byte string.
-                    #
-                    # Encodings for diffs aren't inherited from parent
-                    # sections.
-                    section['diff'] = self._read_content(
-                        length=length,
-                        encoding=options.get('encoding'),
-                        line_endings=options.get('line_endings'),
-                        preserve_trailing_newline=True,
-                        keep_bytes=True)
-            else:
-                # This is a container section.
-                if section_id == Section.MAIN:
-                    # This is the main DiffX section, which we'll encounter
-                    # only once.
-                    #
-                    # Validate the DiffX version.
-                    diffx_version = options.get('version')
-
-                    if diffx_version not in SpecVersion.VALID_VALUES:
-                        raise DiffXParseError(
-                            'The DiffX version in this file (%s) is not '
-                            'supported by this version of the diffx module'
-                            % diffx_version,
-                            linenum=section['line'])
-                else:
-                    # This is either the change or file section.
-                    assert section_id in (Section.CHANGE, Section.FILE)
-
-                    if level <= prev_container_level:
-                        # We're at the same section level (change -> change,
-                        # or file -> file), or we went back up a level
-                        # (file -> change). Pop off the last encoding from
-                        # the stack before we push a new encoding onto it.
-                        encodings.pop()
-
-                # Push a newly-specified encoding (if in the options) or the
-                # parent section's encoding on the stack.
-                encodings.append(options.get('encoding', encodings[-1]))
-
-                prev_container_level = level
-
-            # Set the new list of valid exceptions allowed at this stage of
-            # parsing.
-            valid_sections = VALID_SECTION_STATES[section_id]
-
-            # Pass that section up to the caller for processing.
-            yield section
+        if lazy_content is True:
+            lazy_sections = CONTENT_SECTIONS
+        elif lazy_content:
+            lazy_sections = set(lazy_content)
+        else:
+            lazy_sections = set()
+
+        # When filtering files, a file section is held back until its
+        # metadata has been checked, and the remaining sections of files that
+        # don't match are skipped.
+        if file_filter is not None:
+            lazy_sections = lazy_sections - {Section.FILE_META}
+
+        self._lazy_sections = lazy_sections
+        self._lazy_metadata = lazy_metadata
+        self._section_records = section_records
+        self._file_filter = file_filter
+
+        # Fields on sections are accessed through these, rather than by key,
+        # so that records don't go through the slower mapping interface.
+        # These return or take the same arguments for dictionaries and
+        # records.
+        if section_records:
+            self._get_section_field = getattr
+            self._get_section_fields = operator.attrgetter(
+                *self._SECTION_FIELD_NAMES)
+            self._set_section_field = setattr
+        else:
+            self._get_section_field = operator.getitem
+            self._get_section_fields = operator.itemgetter(
+                *self._SECTION_FIELD_NAMES)
+            self._set_section_field = operator.setitem
+        self._pending_file_section = None
+        self._skipping_file = False
 
-    def _read_header(self, valid_sections={}):
-        """Read a header at the current offset within the stream.
+    def _parse_header(self, header):
+        """Parse a header read from the source.
 
         The header will be validated against a list of valid sections for the
         current stage of parsing.
@@ -285,34 +231,20 @@ class DiffXReader(object):
         If the header is valid, information on the section will be returned.
 
         Args:
-            valid_sections (set of unicode):
-                The sections considered valid at this phase of parsing.
+            header (bytes):
+                The header line, including the trailing newline.
 
         Returns:
-            dict:
-            Information on the section for further processing. This will be
-            ``None`` if we've reached the end of the file.
+            dict or DiffXSectionInfo:
+            Information on the section for further processing.
 
         Raises:
             pydiffx.errors.DiffXParseError:
-                The section header could not be found, was invalid for this
-                stage of parsing, or contained invalid formatting.
+                The header was invalid for this stage of parsing, or contained
+                invalid formatting.
         """
         linenum = self._linenum
 
-        # It's possible that we'll be at the end of the file, with some blank
-        # lines, or hand-editing (or bad diff generation) has led to some
-        # blank lines before a header. We'll iterate through any blank lines
-        # until we reach content or an End of File.
-        while True:
-            header, eof = self._read_until(b'\n')
-
-            if eof:
-                return None
-
-            if header.strip():
-                break
-
         if self._file_newlines is None:
             # Given that we read up until a '\n', one of these are guaranteed
             # to match.
@@ -326,17 +258,25 @@ class DiffXReader(object):
         assert header.endswith(self._file_newlines)
         header = header[:-len(self._file_newlines)]
 
-        m = self._HEADER_RE.match(header)
+        # Most headers can be parsed quickly, without validating each
+        # option. Anything else goes through the strict path, which will
+        # raise any appropriate errors.
+        m = self._FAST_HEADER_RE.match(header)
+        fast_path = (m is not None)
 
-        if not m:
-            raise DiffXParseError(
-                'Unexpected or improperly formatted header: %r' % header,
-                linenum=linenum)
+        if not fast_path:
+            m = self._HEADER_RE.match(header)
+
+            if not m:
+                raise DiffXParseError(
+                    'Unexpected or improperly formatted header: %r' % header,
+                    linenum=linenum)
 
         # Validate the level and section ID.
-        section_id = m.group('section_id').decode('ascii')
+        section_id, level, section_type = \
+            self._HEADER_SECTION_IDS[m.group('section_id')]
 
-        if section_id not in valid_sections:
+        if section_id not in self._valid_sections:
             raise DiffXParseError(
                 'Unknown or unexpected section ID "%(section_id)s". '
                 'Expected one of: %(valid_sections)s'
@@ -344,50 +284,118 @@ class DiffXReader(object):
                     'section_id': section_id,
                     'valid_sections': ', '.join(
                         '"%s"' % _valid_section
-                        for _valid_section in sorted(valid_sections)
+                        for _valid_section in sorted(self._valid_sections)
                     ),
                 },
                 linenum=linenum)
 
-        section_type = m.group('section_type')
-        level = len(m.group('level'))
-
         # Parse the options out of the header.
         options_str = m.group('options')
+        section_records = self._section_records
+
+        if section_records:
+            options = self._shared_options_cache.get(options_str)
+        else:
+            options = None
+
+        if options is None:
+            if not options_str:
+                options = {}
+            elif fast_path:
+                options = self._parse_header_options_fast(options_str)
+            else:
+                options = self._parse_header_options(header=header,
+                                                     options_str=options_str,
+                                                     linenum=linenum)
+
+            if section_records:
+                # Options that weren't fully validated can't be cached, or
+                # they'd be trusted by strict readers later.
+                options = self._share_options(
+                    options_str,
+                    options,
+                    can_cache=(fast_path or self._strict))
+
+        if linenum is not None:
+            self._linenum += 1
+
+        if section_records:
+            return DiffXSectionInfo(section=section_id,
+                                    level=level,
+                                    section_type=section_type,
+                                    line=linenum,
+                                    options=options)
+
+        return {
+            'level': level,
+            'line': linenum,
+            'options': options,
+            'section': section_id,
+            'type': section_type,
+        }
+
+    def _parse_header_options(self, header, options_str, linenum):
+        """Parse and validate the options in a header.
+
+        As this is a reference implementation, this will be strict with the
+        format. There should be exactly one space between the "#<id>:" and
+        the options, one space between each comma-separated pair, and each
+        key and value are expected to match a specific set of characters.
+
+        Args:
+            header (bytes):
+                The header line, without the trailing newline.
+
+            options_str (bytes):
+                The options portion of the header.
+
+            linenum (int):
+                The 0-based line number of the header, for error reporting.
+                This may be ``None`` if unknown.
+
+        Returns:
+            dict:
+            The parsed options.
+
+        Raises:
+            pydiffx.errors.DiffXParseError:
+                An option contained invalid characters.
+        """
         options = {}
+        strict = self._strict
 
         if options_str:
-            # Options should be present.
-            #
-            # As this is a reference implementation, this will be strict with
-            # the format. There should be exactly one space between the
-            # "#<id>:" and the options, one space between each comma-separated
-            # pair, and each key and value are expected to match a specific set
-            # of characters.
             for option_pair in options_str.split(b', '):
                 option_key, option_value = option_pair.split(b'=', 1)
 
-                if not self._HEADER_OPTION_KEY_RE.match(option_key):
-                    raise DiffXParseError(
-                        'Header option key "%s" contains invalid characters'
-                        % option_key.decode('ascii'),
-                        linenum=linenum,
-                        column=header.index(option_pair))
+                # When validating quickly, the characters are trusted, so
+                # long as they can be decoded.
+                if (strict or
+                    not option_key.isascii() or
+                    not option_value.isascii()):
+                    if not self._HEADER_OPTION_KEY_RE.match(option_key):
+                        raise DiffXParseError(
+                            'Header option key "%s" contains invalid '
+                            'characters'
+                            % option_key.decode('ascii'),
+                            linenum=linenum,
+                            column=header.index(option_pair))
 
-                if not self._HEADER_OPTION_VALUE_RE.match(option_value):
-                    raise DiffXParseError(
-                        'Header option value "%(value)s" for key "%(key)s" '
-                        'contains invalid characters'
-                        % {
-                            'key': option_key.decode('ascii'),
-                            'value': option_value.decode('ascii'),
-                        },
-                        linenum=linenum,
-                        column=header.index(option_pair) + len(option_key) + 1)
+                    if not self._HEADER_OPTION_VALUE_RE.match(option_value):
+                        raise DiffXParseError(
+                            'Header option value "%(value)s" for key '
+                            '"%(key)s" contains invalid characters'
+                            % {
+                                'key': option_key.decode('ascii'),
+                                'value': option_value.decode('ascii'),
+                            },
+                            linenum=linenum,
+                            column=(header.index(option_pair) +
+                                    len(option_key) + 1))
 
                 # These should safely decode, since we've validated the
                 # characters above.
-                option_key = option_key.decode('ascii')
+                option_key = sys.intern(option_key.decode('ascii'))
                 option_value = option_value.decode('ascii')
 
                 # Convert the value to an integer, if it's a number.
@@ -398,169 +406,2012 @@ class DiffXReader(object):
 
                 options[option_key] = option_value
 
-        self._linenum += 1
-
-        return {
-            'level': level,
-            'line': linenum,
-            'options': options,
-            'section': section_id,
-            'type': section_type.decode('ascii'),
-        }
-
-    def _read_content(self,
-                      length,
-                      encoding=None,
-                      indent=None,
-                      line_endings=None,
-                      preserve_trailing_newline=False,
-                      keep_bytes=False):
-        """Read content for a section, with the given length.
+        return options
 
-        The content will be read, any specified indentation stripped, and
-        the resulting bytes decoded to a Unicode string (if an encoding is
-        specified).
+    def _parse_header_options_fast(self, options_str):
+        """Parse the options in a header that's known to be valid.
 
-        The content will be validated to ensure that it ended in a newline
-        (helping ensure that the length covered the entirety of the section's
-        content).
+        This must only be called for options matched by
+        :py:attr:`_FAST_HEADER_RE`. The result will be the same as that of
+        :py:meth:`_parse_header_options`.
 
         Args:
-            length (int):
-                The length of the content to read.
+            options_str (bytes):
+                The options portion of the header.
 
-            encoding (unicode, optional):
-                The encoding used to decode the content to a Unicode string.
+        Returns:
+            dict:
+            The parsed options.
+        """
+        cache = self._header_option_cache
+        options = {}
 
-                If ``None``, the result will be a byte string.
+        for option_pair in options_str.split(b', '):
+            try:
+                option_key, option_value = cache[option_pair]
+            except KeyError:
+                option_key, option_value = option_pair.split(b'=', 1)
+                option_key = sys.intern(option_key.decode('ascii'))
 
-            indent (int, optional):
-                The amount of indentation to strip from the beginning of each
-                byte string.
+                if option_value.isdigit():
+                    option_value = int(option_value)
+                else:
+                    if b'-' in option_value or b'_' in option_value:
+                        # This may still be something int() accepts, such
+                        # as "-1" or "1_000".
+                        try:
+                            option_value = int(option_value)
+                        except ValueError:
+                            pass
 
-            line_endings (unicode, optional):
-                The specified line ending format (``dos`` or ``unix``). If
-                provided, this will be used to split lines. If not provided,
-                the line endings will be inferred.
+                    if isinstance(option_value, bytes):
+                        option_value = option_value.decode('ascii')
 
-            keep_bytes (bool, optional):
-                Whether to keep the result as bytes, even if an encoding is
-                provided.
+                        if (len(cache) <
+                            self._HEADER_OPTION_CACHE_MAX_SIZE):
+                            cache[option_pair] = (option_key, option_value)
 
-        Returns:
-            bytes or unicode:
-            The processed string. The type is dependent on the ``encoding``
-            value.
+            options[option_key] = option_value
 
-        Raises:
-            pydiffx.errors.DiffXParseError:
-                The content did not end in the newline, or an option did not
-                validate.
-        """
-        fp = self._fp
-        content = fp.read(length)
+        return options
 
-        # First, determine the line endings that we're going to be working
-        # with.
-        if line_endings:
-            # An explicit line ending type was specified. Validate it and
-            # get the newline characters, encoding it for the byte string.
-            try:
-                newline = get_newline_for_type(line_endings,
-                                               encoding=encoding)
-            except ValueError as e:
-                raise DiffXParseError(str(e),
-                                      linenum=self._linenum)
-        else:
-            # An explicit line ending type was not specified. Try to determine
-            # the appropriate line ending based on the first line of content.
-            line_endings, newline = guess_line_endings(content,
-                                                       encoding=encoding)
+    def _share_options(self, options_str, options, can_cache=True):
+        """Return an immutable version of parsed options for a record.
 
-        lines = split_lines(data=content,
-                            newline=newline,
-                            keep_ends=True)
+        If the options contain no numeric values, and passed strict
+        validation, the result will be cached and shared by any later
+        records with the same options.
 
-        if indent:
-            # It's important that we don't assume each line is actually
-            # indented correctly. There could be nothing but a newline,
-            # or due to some error the indentation on some line may be
-            # wrong. Be careful to strip only the spaces, up to the specified
-            # indentation level.
-            indent_re = re.compile(br'^ {1,%d}' % indent)
-            content = b''.join(
-                indent_re.sub(b'', _line)
-                for _line in lines
-            )
+        Args:
+            options_str (bytes):
+                The options portion of the header. This may be ``None`` if
+                there were no options.
 
-        if encoding and not keep_bytes:
-            # We know what this content was encoded with. We can now decode
-            # it.
-            content = content.decode(encoding)
-            newline = newline.decode(encoding)
+            options (dict):
+                The parsed options.
 
-        # Validate that the content ends in a newline. This is to ensure that
-        # the file was written according to spec.
-        if not content.endswith(newline):
-            raise DiffXParseError(
-                'Expected a newline after content',
-                linenum=self._linenum)
+            can_cache (bool, optional):
+                Whether the options passed strict validation, and can be
+                cached.
 
-        self._linenum += len(lines)
+        Returns:
+            types.MappingProxyType:
+            The immutable options.
+        """
+        shared_options = MappingProxyType(options)
+        cache = self._shared_options_cache
 
-        return content
+        # Content sections always have a numeric length, so they can be
+        # ruled out quickly.
+        if (can_cache and
+            'length' not in options and
+            len(cache) < self._SHARED_OPTIONS_CACHE_MAX_SIZE and
+            all(type(value) is str for value in options.values())):
+            cache[options_str] = shared_options
 
-    def _read_until(self, c, chunk_size=96):
-        """Read from the stream until a character is found.
+        return shared_options
 
-        Data will be read from the stream in chunks. All data up to the
-        matching character will be returned. Any data that's read past the
-        character will be preserved for the next read.
+    def _start_section(self, section):
+        """Validate a parsed section and track its encoding.
 
-        If the end of the file is reached, all data read until the end of the
-        file will be returned, and a flag will be set to inform the reader.
+        Content sections will be checked for a length and a valid metadata
+        format, and the encoding that applies to them will be returned.
+        Container sections will be checked for a valid DiffX version, and
+        their encodings will be tracked for the sections within them.
 
         Args:
-            c (byte):
-                The character to read until. This character will be included
-                in the result.
-
-            chunk_size (int, optional):
-                The size of each chunk to read.
+            section (dict):
+                The section information from :py:meth:`_parse_header`.
 
         Returns:
-            tuple:
-            A 2-tuple containing:
+            unicode:
+            The encoding for the content of a content section. This will be
+            ``None`` for container sections, or if there's no encoding.
 
-            1. The resulting byte string.
-            2. A boolean indicating if the end of the file was reached.
+        Raises:
+            pydiffx.errors.DiffXParseError:
+                The section failed to validate.
         """
-        s = io.BytesIO()
-        fp = self._fp
-        eof = False
-
-        while True:
-            chunk = fp.read(chunk_size)
+        section_id, level, linenum, options = \
+            self._get_section_fields(section)
+        encodings = self._encodings
+
+        if section_id in CONTENT_SECTIONS:
+            # This is a content section.
+            if section_id == Section.FILE_DIFF:
+                # Encodings for diffs aren't inherited from parent sections.
+                encoding = options.get('encoding')
+            else:
+                encoding = options.get('encoding', encodings[-1])
 
-            if not chunk:
-                # The end of the file was reached. We'll bail out of the loop
-                # and return everything we've read so far.
-                eof = True
-                break
+            if 'length' not in options:
+                raise DiffXParseError(
+                    'Expected section "%s" to have a length option'
+                    % section_id,
+                    linenum=linenum)
+
+            if section_id in META_SECTIONS:
+                # Validate the format as JSON (either explicitly provided as
+                # format=json, or left off entirely).
+                metadata_format = options.get('format', 'json')
+
+                if metadata_format != 'json':
+                    raise DiffXParseError(
+                        'Unexpected metadata format "%(format)s". If the '
+                        '"format" option is provided, it must be "json".'
+                        % {
+                            'format': metadata_format,
+                        },
+                        linenum=linenum)
+
+            return encoding
+
+        # This is a container section.
+        if section_id == Section.MAIN:
+            # This is the main DiffX section, which we'll encounter only
+            # once.
+            #
+            # Validate the DiffX version.
+            diffx_version = options.get('version')
+
+            if diffx_version not in SpecVersion.VALID_VALUES:
+                raise DiffXParseError(
+                    'The DiffX version in this file (%s) is not supported '
+                    'by this version of the diffx module'
+                    % diffx_version,
+                    linenum=linenum)
+        else:
+            # This is either the change or file section.
+            assert section_id in (Section.CHANGE, Section.FILE)
+
+            if level <= self._prev_container_level:
+                # We're at the same section level (change -> change, or
+                # file -> file), or we went back up a level (file -> change).
+                # Pop off the encodings for the sections we've left before
+                # we push a new encoding onto the stack.
+                del encodings[level + 1:]
+
+        # Push a newly-specified encoding (if in the options) or the parent
+        # section's encoding on the stack.
+        encodings.append(options.get('encoding', encodings[-1]))
+
+        self._prev_container_level = level
+
+        return None
+
+    def _finish_section(self, section):
+        """Finish processing a section, returning what's ready for the caller.
+
+        This will advance the list of valid sections for the next header.
+
+        If files are being filtered, file sections will be held back until
+        their metadata has been checked, and sections for files that don't
+        match will be dropped.
+
+        Args:
+            section (dict):
+                The section information, with any content loaded.
+
+        Returns:
+            list of dict:
+            The sections to pass up to the caller, in order.
+        """
+        section_id = self._get_section_field(section, 'section')
+
+        # Set the new list of valid sections allowed at this stage of
+        # parsing.
+        self._valid_sections = VALID_SECTION_STATES[section_id]
+
+        file_filter = self._file_filter
+
+        if file_filter is None:
+            return [section]
+
+        if section_id == Section.FILE:
+            # Hold this back until we know whether the file matches.
+            self._pending_file_section = section
+            self._skipping_file = False
+
+            return []
+        elif section_id == Section.FILE_META:
+            file_section = self._pending_file_section
+            self._pending_file_section = None
+            self._skipping_file = not file_filter(
+                self._get_section_field(section, 'metadata'))
+
+            if not self._skipping_file:
+                return [file_section, section]
+        elif section_id == Section.CHANGE:
+            self._skipping_file = False
+
+        if self._skipping_file:
+            return []
+
+        return [section]
+
+    def _check_skipped_content(self, length, skipped, linenum):
+        """Check that all of a section's skipped content was present.
+
+        Args:
+            length (int):
+                The length of the content.
+
+            skipped (int):
+                The amount of content that was found, whether read or
+                skipped.
+
+            linenum (int):
+                The 0-based line number of the section's header. This may be
+                ``None`` if unknown.
+
+        Raises:
+            pydiffx.errors.DiffXParseError:
+                The file ended before the end of the content.
+        """
+        if skipped < length:
+            raise DiffXParseError(
+                'Unexpected end of file. Expected %(length)d bytes of '
+                'content, but found %(found)d'
+                % {
+                    'length': length,
+                    'found': skipped,
+                },
+                linenum=linenum)
+
+    def _decode_content(self, section_id, data, options, encoding, linenum):
+        """Process and decode the raw content for a content section.
+
+        Args:
+            section_id (unicode):
+                The ID of the content section.
+
+            data (bytes or memoryview):
+                The raw content of the section.
+
+            options (dict):
+                The options parsed from the section's header.
+
+            encoding (unicode):
+                The encoding for the section, either set in its options or
+                (for sections other than diffs) inherited from a parent
+                section.
+
+            linenum (int):
+                The 0-based line number of the section's header. This may be
+                ``None`` if unknown.
+
+        Returns:
+            tuple:
+            A 2-tuple of:
+
+            1. The content of the section. This will be the text of a
+               preamble section, the metadata dictionary of a meta section,
+               or the bytes of a diff section.
+            2. The number of lines in the content (:py:class:`int`). This
+               may be ``None`` if ``linenum`` is ``None``.
+
+        Raises:
+            pydiffx.errors.DiffXParseError:
+                The content could not be parsed.
+        """
+        if section_id == Section.FILE_DIFF:
+            # Diff content is kept as bytes, even if an encoding is set.
+            kwargs = {
+                'encoding': encoding,
+                'keep_bytes': True,
+                'line_endings': options.get('line_endings'),
+            }
+        elif section_id in PREAMBLE_SECTIONS:
+            kwargs = {
+                'encoding': encoding,
+                'indent': options.get('indent'),
+                'line_endings': options.get('line_endings'),
+            }
+        else:
+            assert section_id in META_SECTIONS
+
+            kwargs = {
+                'encoding': encoding,
+                'keep_bytes': True,
+                'line_endings': options.get('line_endings'),
+            }
+
+        if linenum is None:
+            content_linenum = None
+        else:
+            content_linenum = linenum + 1
+
+        content, num_lines = self._process_content(data,
+                                                   linenum=content_linenum,
+                                                   **kwargs)
+
+        if section_id in META_SECTIONS:
+            # The JSON is decoded from bytes either now or, if metadata is
+            # being loaded lazily, when it's first accessed.
+            content = DiffXLazyMetadata(raw=content,
+                                        encoding=encoding,
+                                        line=linenum,
+                                        json_codec=self.json_codec)
+
+            if not self._lazy_metadata:
+                content = content.load()
+
+        return content, num_lines
+
+    def _process_content(self,
+                         content,
+                         linenum,
+                         encoding=None,
+                         indent=None,
+                         line_endings=None,
+                         keep_bytes=False):
+        """Process raw content read for a section.
+
+        Any specified indentation will be stripped, and the resulting bytes
+        decoded to a Unicode string (if an encoding is specified).
+
+        The content will be validated to ensure that it ended in a newline
+        (helping ensure that the length covered the entirety of the section's
+        content).
+
+        Args:
+            content (bytes or memoryview):
+                The raw content to process.
+
+            linenum (int):
+                The 0-based line number where the content starts, for error
+                reporting. This may be ``None`` if unknown.
+
+            encoding (unicode, optional):
+                The encoding used to decode the content to a Unicode string.
+
+                If ``None``, the result will be a byte string.
+
+            indent (int, optional):
+                The amount of indentation to strip from the beginning of each
+                byte string.
+
+            line_endings (unicode, optional):
+                The specified line ending format (``dos`` or ``unix``). If
+                provided, this will be used to split lines. If not provided,
+                the line endings will be inferred.
+
+            keep_bytes (bool, optional):
+                Whether to keep the result as bytes, even if an encoding is
+                provided.
+
+        Returns:
+            tuple:
+            A 2-tuple of:
+
+            1. The processed string (:py:class:`bytes`,
+               :py:class:`memoryview`, or :py:class:`unicode`).
+            2. The number of lines in the content (:py:class:`int`). This
+               may be ``None`` if ``linenum`` is ``None``, as the lines
+               won't need to be counted.
+
+        Raises:
+            pydiffx.errors.DiffXParseError:
+                The content did not end in the newline, or an option did not
+                validate.
+        """
+        # First, determine the line endings that we're going to be working
+        # with.
+        if line_endings:
+            # An explicit line ending type was specified. Validate it and
+            # get the newline characters, encoding it for the byte string.
+            try:
+                newline = get_newline_for_type(line_endings,
+                                               encoding=encoding)
+            except ValueError as e:
+                raise DiffXParseError(str(e),
+                                      linenum=linenum)
+        else:
+            # An explicit line ending type was not specified. Try to determine
+            # the appropriate line ending based on the first line of content.
+            line_endings, newline = guess_line_endings(content,
+                                                       encoding=encoding)
+
+        if linenum is None:
+            # Line numbers aren't being tracked, so there's no need to count
+            # the lines.
+            num_lines = None
+        else:
+            num_lines = count_lines(content, newline)
+
+        if indent and not isinstance(content, memoryview):
+            # It's important that we don't assume each line is actually
+            # indented correctly. There could be nothing but a newline, or
+            # due to some error the indentation on some line may be wrong.
+            # Only the spaces, up to the specified indentation level, will
+            # be stripped.
+            content = dedent_lines(content, indent, newline)
 
-            i = chunk.find(c)
+        if encoding and not keep_bytes:
+            # We know what this content was encoded with. We can now decode
+            # it.
+            content = content.decode(encoding)
+            newline = newline.decode(encoding)
+
+        # Validate that the content ends in a newline. This is to ensure that
+        # the file was written according to spec.
+        if isinstance(content, memoryview):
+            ends_with_newline = (content[-len(newline):] == newline)
+        else:
+            ends_with_newline = content.endswith(newline)
+
+        if not ends_with_newline:
+            raise DiffXParseError(
+                'Expected a newline after content',
+                linenum=linenum)
+
+        return content, num_lines
+
+
+class DiffXReader(BaseDiffXReader):
+    """A streaming reader for DiffX files.
+
+    This is a low-level interface for reading a DiffX file from an existing
+    stream, such as an opened file handle or a web server response.
+
+    Consumers can iterate through each section of the DiffX file, reading
+    sections one-by-one and processing them. This can be used to process the
+    metadata on-the-fly without retaining the entirety of the file in memory,
+    or to convert it into another data structure.
+
+    See :py:meth:`iter_sections` for details on the information returned
+    during iteration.
+
+    Data is read from the stream in blocks into an internal read-ahead
+    buffer, and both headers and content are served from that buffer. The
+    stream never needs to be seekable, so pipes, sockets, and HTTP response
+    bodies can be read directly. As a result, the stream's own position may
+    be past the end of the last section returned.
+
+    Files on disk can also be read through a memory mapping (see
+    :py:meth:`from_path`), in which case diff content is returned as
+    :py:class:`memoryview` slices of the mapping, without being copied.
+
+    By default, files are validated strictly, as befits a reference
+    implementation. Files that are trusted (for instance, those generated
+    by :py:class:`~pydiffx.writer.DiffXWriter` and already validated) can
+    be read with ``validation='fast'``, which skips work that only exists
+    to diagnose problems:
+
+    * Line numbers aren't tracked, so the ``line`` of every section will be
+      ``None``, and errors won't include line numbers.
+    * The characters in header options aren't validated.
 
-            if i == -1:
-                # We didn't find the character. Store the entire chunk.
-                s.write(chunk)
+    The order of sections, their lengths, their options, and the newlines
+    after their content are still validated.
+    """
+
+    #: The default size of each block read from the stream.
+    #:
+    #: Type:
+    #:     int
+    DEFAULT_BLOCK_SIZE = 64 * 1024
+
+    @classmethod
+    def from_path(cls, path, mmap=False, **kwargs):
+        """Return a reader for a DiffX file on disk.
+
+        The reader owns the opened file, and should be closed by calling
+        :py:meth:`close` (or by using it as a context manager).
+
+        Args:
+            path (unicode):
+                The path to the DiffX file.
+
+            mmap (bool, optional):
+                Whether to read the file through a memory mapping.
+
+                If set, diff content will be returned as
+                :py:class:`memoryview` slices of the mapping, rather than
+                copied into new byte strings. Those views remain valid after
+                the reader is closed, and the mapping will be released once
+                the last of them is released.
+
+            **kwargs (dict):
+                Additional keyword arguments to pass to the constructor.
+
+        Returns:
+            DiffXReader:
+            The new reader.
+
+        Raises:
+            OSError:
+                The file could not be opened or mapped.
+        """
+        fp = open(path, 'rb')
+
+        try:
+            if mmap and os.fstat(fp.fileno()).st_size > 0:
+                # Empty files can't be memory-mapped. They'll be read
+                # normally instead.
+                source = _mmap.mmap(fp.fileno(), 0,
+                                    access=_mmap.ACCESS_READ)
+                fp.close()
             else:
-                # We found the character. Store everything up to and including
-                # it, and then go back in the stream for the next read.
-                s.write(chunk[:i + 1])
-                fp.seek(i + 1 - len(chunk), os.SEEK_CUR)
-                break
+                source = fp
+
+            reader = cls(source, **kwargs)
+        except Exception:
+            fp.close()
+            raise
+
+        reader._owns_fp = True
+
+        return reader
+
+    def __init__(self, fp, block_size=DEFAULT_BLOCK_SIZE, json_codec=None,
+                 validation='strict'):
+        """Initialize the reader.
+
+        Args:
+            fp (file or io.IOBase or mmap.mmap):
+                The file pointer/stream to read from. This must be opened in
+                binary (bytes) mode. It does not need to be seekable.
+
+                If this is a :py:class:`mmap.mmap`, content will be read
+                directly from the mapping, and diff content will be returned
+                as :py:class:`memoryview` slices of it.
+
+            block_size (int, optional):
+                The size of each block read from the stream into the
+                read-ahead buffer.
+
+            json_codec (pydiffx.json_codecs.BaseJSONCodec, optional):
+                The codec used to decode JSON metadata. This defaults to
+                the result of
+                :py:func:`~pydiffx.json_codecs.get_default_json_codec`.
+
+            validation (unicode, optional):
+                The validation mode. This may be ``strict`` (the default) or
+                ``fast``, for trusted files. See above for details.
+
+        Raises:
+            ValueError:
+                The block size or validation mode was not valid.
+        """
+        if block_size < 1:
+            raise ValueError('block_size must be a positive integer')
+
+        super(DiffXReader, self).__init__(json_codec=json_codec,
+                                          validation=validation)
+
+        self._fp = fp
+        self._block_size = block_size
+
+        # The read-ahead buffer, and the position of the next unread byte
+        # within it.
+        self._buf = b''
+        self._buf_pos = 0
+        self._eof = False
+        self._view = None
+        self._owns_fp = False
+        self._pending_handle = None
+        self._pending_consumed = 0
+        self._section_offset = None
+
+        # The size of a seekable stream, computed the first time content is
+        # skipped by seeking.
+        self._stream_size = None
+
+        # The offset within the stream of the start of the buffer.
+        try:
+            self._buf_offset = fp.tell()
+        except (AttributeError, OSError):
+            self._buf_offset = 0
+
+        try:
+            self._seekable = fp.seekable()
+        except AttributeError:
+            self._seekable = False
+
+        if isinstance(fp, _mmap.mmap):
+            # The entire file is already addressable. Use the mapping as the
+            # buffer, and never read from it as a stream.
+            self._buf = fp
+            self._buf_offset = 0
+            self._view = memoryview(fp)
+            self._eof = True
+
+    @property
+    def offset(self):
+        """The offset within the stream of the next unread byte.
+
+        This accounts for data held in the read-ahead buffer, so it may
+        differ from the stream's own position.
+
+        Type:
+            int
+        """
+        return self._tell()
+
+    @property
+    def section_offset(self):
+        """The offset within the stream of the last section's header.
+
+        This will be ``None`` if no section has been read yet.
+
+        Type:
+            int
+        """
+        return self._section_offset
+
+    def __enter__(self):
+        """Enter a context for the reader.
+
+        Returns:
+            DiffXReader:
+            This reader.
+        """
+        return self
+
+    def __exit__(self, *args):
+        """Exit a context for the reader, closing it.
+
+        Args:
+            *args (tuple):
+                Exception information, if an exception was raised.
+        """
+        self.close()
+
+    def close(self):
+        """Close the reader.
+
+        If the reader was created through :py:meth:`from_path`, the file or
+        memory mapping it opened will be closed. Streams provided by the
+        caller are left open.
+        """
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+
+        if self._owns_fp:
+            self._owns_fp = False
+
+            try:
+                self._fp.close()
+            except BufferError:
+                # The caller still holds views into the memory mapping. It
+                # will be unmapped once they've all been released.
+                pass
+
+        self._buf = b''
+        self._buf_pos = 0
+        self._eof = True
+
+    def __iter__(self):
+        """Iterate through all sections of a DiffX file.
+
+        This is a convenience wrapper around :py:meth:`iter_sections`. See
+        that method for details.
+
+        Yields:
+            dict:
+            Information on the section.
+
+        Raises:
+            pydiffx.errors.DiffXParseError:
+                The file or a section was unable to be parsed. Information
+                will be provided in the message and the instance's attributes.
+        """
+        return self.iter_sections()
+
+    def iter_sections(self, lazy_content=False, file_filter=None,
+                      lazy_metadata=False, section_records=False):
+        """Iterate through all sections of a DiffX file.
+
+        Each section and subsection will be parsed individually, returning the
+        following data on each new section:
+
+        ``level`` (:py:class:`int`):
+            The 0-based section level (corresponding to the number of ``.``
+            level indicator characters in the section ID).
+
+        ``line`` (:py:class:`int`):
+            The 0-based line number where the section starts.
+
+            This will be ``None`` for any sections following content that
+            was skipped without being read (see ``lazy_content`` and
+            ``file_filter`` below), and for all sections when reading with
+            ``validation='fast'``.
+
+        ``options`` (:py:class:`dict`):
+            A dictionary of options found for the section.
+
+        ``section`` (:py:class:`unicode`):
+            The ID of the section. This corresponds to one of:
+
+            * :py:attr:`~pydiffx.sections.Section.MAIN`
+            * :py:attr:`~pydiffx.sections.Section.MAIN_PREAMBLE`
+            * :py:attr:`~pydiffx.sections.Section.MAIN_META`
+            * :py:attr:`~pydiffx.sections.Section.CHANGE`
+            * :py:attr:`~pydiffx.sections.Section.CHANGE_PREAMBLE`
+            * :py:attr:`~pydiffx.sections.Section.CHANGE_META`
+            * :py:attr:`~pydiffx.sections.Section.FILE`
+            * :py:attr:`~pydiffx.sections.Section.FILE_META`
+            * :py:attr:`~pydiffx.sections.Section.FILE_DIFF`
+
+        ``type`` (:py:class:`unicode`):
+            The type of section (the ID in the file following the ``.``
+            level indicator characters).
+
+        Preamble sections will also contain:
+
+        ``text`` (:py:class:`unicode`):
+            The decoded text content of the preamble.
+
+        Metadata sections will also contain:
+
+        ``metadata`` (:py:class:`dict` or :py:class:`DiffXLazyMetadata`):
+            A dictionary containing all metadata for the section.
+
+            If ``lazy_metadata`` is set, this will be a
+            :py:class:`DiffXLazyMetadata`, which holds the encoded JSON and
+            decodes it the first time it's accessed.
+
+        Diff sections will also contain:
+
+        ``diff`` (:py:class:`bytes` or :py:class:`memoryview`):
+            The diff content, as a byte string. This is not decoded, even if
+            an encoding is specified.
+
+            If the reader is backed by a memory mapping (see
+            :py:meth:`from_path`), this will be a :py:class:`memoryview` of
+            the content in the mapping.
+
+        If ``lazy_content`` is set, content sections it applies to will
+        instead contain:
+
+        ``handle`` (:py:class:`DiffXContentHandle`):
+            A handle for reading the content on demand. This will hold the
+            offset, length, encoding, and line endings of the content, and
+            the content itself (in the form listed above) can be read by
+            calling :py:meth:`DiffXContentHandle.read`. Diff content can
+            also be read in bounded chunks by iterating through
+            :py:meth:`DiffXContentHandle.iter_chunks`.
+
+            If the content hasn't been read by the time the next section is
+            requested, it will be skipped by advancing past it in the buffer
+            or seeking past it in the stream, without being read or decoded.
+
+        If ``file_filter`` is set, it will be called with the metadata
+        dictionary of each file, and only files it returns a truthy value
+        for will be returned. The file section will be held back until its
+        metadata has been read and checked, and the file's metadata will
+        always be read up-front, even if ``lazy_content`` applies to it.
+        For any files that don't match, none of its sections will be
+        returned, and its diff will be skipped without being read or
+        decoded.
+
+        If ``section_records`` is set, each section will be returned as a
+        :py:class:`DiffXSectionInfo` rather than a dictionary. This holds
+        the same information, but is cheaper to create when reading very
+        large numbers of sections. Its options are immutable, and may be
+        shared between sections.
+
+        Note:
+            If any given section fails to parse, an error will be raised and
+            parsing will stop.
+
+        Args:
+            lazy_content (bool or set of unicode, optional):
+                Whether to provide handles for content sections, rather than
+                reading their content up-front.
+
+                This may be ``True`` to apply to all content sections, or a
+                set of section IDs (such as
+                :py:attr:`Section.FILE_DIFF
+                <pydiffx.sections.Section.FILE_DIFF>`) to apply to only
+                those sections.
+
+            file_filter (callable, optional):
+                A function used to choose which files to return. This takes
+                the file's metadata dictionary as its only argument, and
+                returns whether the file should be returned.
+
+            lazy_metadata (bool, optional):
+                Whether to defer decoding the JSON in metadata sections until
+                the metadata is first accessed.
+
+                Any errors in the JSON will then be raised on that first
+                access.
+
+            section_records (bool, optional):
+                Whether to return each section as a
+                :py:class:`DiffXSectionInfo` rather than a dictionary.
+
+        Yields:
+            dict or DiffXSectionInfo:
+            Information on the section.
+
+        Raises:
+            pydiffx.errors.DiffXParseError:
+                The file or a section was unable to be parsed. Information
+                will be provided in the message and the instance's attributes.
+        """
+        self._begin_sections(lazy_content=lazy_content,
+                             file_filter=file_filter,
+                             lazy_metadata=lazy_metadata,
+                             section_records=section_records)
+
+        while True:
+            if self._pending_handle is not None:
+                # The caller didn't read (all of) the content for the last
+                # section. Skip past the rest of it. We won't know how many
+                # lines it contained, so line numbers can't be tracked from
+                # here on.
+                handle = self._pending_handle
+                self._skip_content(length=handle.length,
+                                   consumed=self._pending_consumed,
+                                   linenum=handle.line)
+                self._pending_handle = None
+                self._linenum = None
+
+            section = self._read_header()
+
+            if section is None:
+                # We've read the last section. We're done parsing.
+                break
+
+            encoding = self._start_section(section)
+            section_id, level, linenum, options = \
+                self._get_section_fields(section)
+
+            if section_id in CONTENT_SECTIONS:
+                if self._skipping_file:
+                    # This belongs to a file that was filtered out. Skip
+                    # past it without reading it. As with unread handles,
+                    # line numbers can't be tracked from here on.
+                    self._skip_content(length=options['length'],
+                                       linenum=linenum)
+                    self._linenum = None
+                elif section_id in self._lazy_sections:
+                    # The caller will decide whether to read this content.
+                    # If they don't, it will be skipped before the next
+                    # header is read.
+                    handle = DiffXContentHandle(reader=self,
+                                                section_id=section_id,
+                                                offset=self._tell(),
+                                                options=options,
+                                                encoding=encoding,
+                                                line=linenum)
+                    self._set_section_field(section, 'handle', handle)
+                    self._pending_handle = handle
+                    self._pending_consumed = 0
+                else:
+                    self._set_section_field(
+                        section,
+                        self._CONTENT_KEYS[section_id],
+                        self._load_content(section_id=section_id,
+                                           options=options,
+                                           encoding=encoding,
+                                           linenum=linenum))
+
+            # Pass the section (along with any held back before it) up to
+            # the caller for processing.
+            for ready_section in self._finish_section(section):
+                yield ready_section
+
+    def _read_header(self):
+        """Read a header at the current offset within the stream.
+
+        Any blank lines before the header will be skipped. The header will
+        then be parsed and validated by :py:meth:`_parse_header`.
+
+        Returns:
+            dict:
+            Information on the section for further processing. This will be
+            ``None`` if we've reached the end of the file.
+
+        Raises:
+            pydiffx.errors.DiffXParseError:
+                The section header could not be found, was invalid for this
+                stage of parsing, or contained invalid formatting.
+        """
+        # It's possible that we'll be at the end of the file, with some blank
+        # lines, or hand-editing (or bad diff generation) has led to some
+        # blank lines before a header. We'll iterate through any blank lines
+        # until we reach content or an End of File.
+        while True:
+            self._section_offset = self._tell()
+            header, eof = self._read_until(b'\n')
+
+            if eof:
+                return None
+
+            if header.strip():
+                break
+
+        return self._parse_header(header)
+
+    def _load_content(self, section_id, options, encoding, linenum,
+                      data=None):
+        """Load and decode the content for a content section.
+
+        Args:
+            section_id (unicode):
+                The ID of the content section.
+
+            options (dict):
+                The options parsed from the section's header.
+
+            encoding (unicode):
+                The encoding for the section, either set in its options or
+                (for sections other than diffs) inherited from a parent
+                section.
+
+            linenum (int):
+                The 0-based line number of the section's header. This may be
+                ``None`` if unknown.
+
+            data (bytes or memoryview, optional):
+                The raw content of the section. If not provided, the content
+                will be read from the current position in the stream.
+
+        Returns:
+            object:
+            The content of the section. This will be the text of a preamble
+            section, the metadata dictionary of a meta section, or the bytes
+            of a diff section.
+
+        Raises:
+            pydiffx.errors.DiffXParseError:
+                The content could not be parsed.
+        """
+        if data is not None:
+            return self._decode_content(section_id=section_id,
+                                        data=data,
+                                        options=options,
+                                        encoding=encoding,
+                                        linenum=linenum)[0]
+
+        length = options['length']
+
+        if section_id == Section.FILE_DIFF and self._view is not None:
+            data = self._read_view(length)
+        else:
+            data = self._read_bytes(length)
+
+        content, num_lines = self._decode_content(section_id=section_id,
+                                                  data=data,
+                                                  options=options,
+                                                  encoding=encoding,
+                                                  linenum=linenum)
+
+        if self._linenum is not None:
+            self._linenum += num_lines
+
+        return content
+
+    def _read_handle(self, handle):
+        """Read and decode the content for a content handle.
+
+        If the handle is for the content at the current position in the
+        stream, it will be read from the stream. Otherwise, it will be read
+        from the memory mapping, or from the stream after seeking to it.
+
+        Args:
+            handle (DiffXContentHandle):
+                The handle to read.
+
+        Returns:
+            object:
+            The content of the section.
+
+        Raises:
+            pydiffx.errors.DiffXContentError:
+                The content is no longer available in a stream that can't
+                seek.
+
+            pydiffx.errors.DiffXParseError:
+                The content could not be parsed.
+        """
+        if handle is self._pending_handle and not self._pending_consumed:
+            self._pending_handle = None
+            data = None
+        else:
+            data = self._read_bytes_at(
+                offset=handle.offset,
+                length=handle.length,
+                allow_view=(handle.section_id == Section.FILE_DIFF))
+
+        return self._load_content(section_id=handle.section_id,
+                                  options=handle.options,
+                                  encoding=handle.encoding,
+                                  linenum=handle.line,
+                                  data=data)
+
+    def _iter_handle_chunks(self, handle, chunk_size):
+        """Iterate through the content for a diff handle in chunks.
+
+        Chunks are read from the stream while the handle is for the content
+        at the current position in the stream. Otherwise, they're read from
+        the memory mapping, or from the stream after seeking to them.
+
+        Line endings are tracked across chunks, so that the content can be
+        validated and its lines counted once the last chunk has been read,
+        without holding on to the content.
+
+        Args:
+            handle (DiffXContentHandle):
+                The handle to read.
+
+            chunk_size (int):
+                The maximum size of each chunk.
+
+        Yields:
+            bytes or memoryview:
+            Each chunk of content.
+
+        Raises:
+            pydiffx.errors.DiffXContentError:
+                The content is no longer available in a stream that can't
+                seek.
+
+            pydiffx.errors.DiffXParseError:
+                The content could not be parsed. This will be raised after
+                the last chunk.
+        """
+        encoding = handle.encoding
+        length = handle.length
+
+        if handle.line is None:
+            linenum = None
+        else:
+            linenum = handle.line + 1
+
+        line_endings = handle.line_endings
+
+        if line_endings:
+            try:
+                newline = get_newline_for_type(line_endings,
+                                               encoding=encoding)
+            except ValueError as e:
+                raise DiffXParseError(str(e),
+                                      linenum=linenum)
+        else:
+            # We'll guess the line endings from the first line, once we've
+            # found it.
+            newline = None
+
+        unix_newline = get_newline_for_type(LineEndings.UNIX,
+                                            encoding=encoding)
+
+        # The last bytes of content read, so that newlines spanning two
+        # chunks can be found, and the end of the content can be validated.
+        tail_len = len(get_newline_for_type(LineEndings.DOS,
+                                            encoding=encoding))
+        tail = b''
+
+        num_newlines = 0
+        pos = 0
+
+        while pos < length:
+            size = min(chunk_size, length - pos)
+
+            if (handle is self._pending_handle and
+                self._pending_consumed == pos):
+                if self._view is not None:
+                    chunk = self._read_view(size)
+                else:
+                    chunk = self._read_bytes(size)
+
+                self._pending_consumed += len(chunk)
+            else:
+                chunk = self._read_bytes_at(offset=handle.offset + pos,
+                                            length=size,
+                                            allow_view=True)
+
+            if not chunk:
+                # We've reached the end of the file.
+                break
+
+            pos += len(chunk)
+
+            if isinstance(chunk, memoryview):
+                window = tail + chunk.tobytes()
+            else:
+                window = tail + chunk
+
+            if newline is None and window.find(unix_newline) != -1:
+                # This is the first line. There are enough bytes from the
+                # previous chunk to tell whether it's a DOS line ending.
+                newline = guess_line_endings(window, encoding=encoding)[1]
+
+            if newline is not None and linenum is not None:
+                # Count only the newlines that end within this chunk.
+                num_newlines += window.count(
+                    newline,
+                    max(0, len(tail) - len(newline) + 1))
+
+            tail = window[-tail_len:]
+
+            yield chunk
+
+        if newline is None:
+            newline = unix_newline
+
+        if not tail.endswith(newline):
+            raise DiffXParseError(
+                'Expected a newline after content',
+                linenum=linenum)
+
+        if handle is self._pending_handle and self._pending_consumed == pos:
+            # The content was read in full from the stream, so we know where
+            # the next section begins.
+            self._pending_handle = None
+
+            if self._linenum is not None:
+                self._linenum += num_newlines
+
+    def _tell(self):
+        """Return the offset in the stream of the next unread byte.
+
+        Returns:
+            int:
+            The offset in the stream.
+        """
+        return self._buf_offset + self._buf_pos
+
+    def _read_until(self, c):
+        """Read from the stream until a character is found.
+
+        Data will be served from the read-ahead buffer, which will be
+        refilled from the stream as needed. All data up to the matching
+        character will be returned. Any data that's read past the character
+        will remain in the buffer for the next read.
+
+        If the end of the file is reached, all data read until the end of the
+        file will be returned, and a flag will be set to inform the reader.
+
+        Args:
+            c (byte):
+                The character to read until. This character will be included
+                in the result.
+
+        Returns:
+            tuple:
+            A 2-tuple containing:
+
+            1. The resulting byte string.
+            2. A boolean indicating if the end of the file was reached.
+        """
+        buf_pos = self._buf_pos
+        search_pos = buf_pos
+
+        while True:
+            buf = self._buf
+            i = buf.find(c, search_pos)
+
+            if i != -1:
+                # We found the character. Return everything up to and
+                # including it, leaving the rest in the buffer.
+                self._buf_pos = i + 1
+
+                return buf[buf_pos:i + 1], False
+
+            # We didn't find the character. There's no need to search the
+            # data we've already looked at again.
+            search_pos = len(buf)
+
+            if not self._fill_buffer():
+                # The end of the file was reached. Return everything we've
+                # read so far.
+                self._buf_pos = len(buf)
+
+                return buf[buf_pos:], True
+
+            # The buffer was compacted while filling it.
+            search_pos -= buf_pos
+            buf_pos = 0
+
+    def _read_bytes(self, length):
+        """Read a number of bytes from the stream.
+
+        Any data in the read-ahead buffer will be used first. If more data
+        is needed, it will be read directly from the stream.
+
+        Args:
+            length (int):
+                The number of bytes to read.
+
+        Returns:
+            bytes:
+            The resulting byte string. This will only be shorter than
+            ``length`` if the end of the file was reached.
+        """
+        buf = self._buf
+        buf_pos = self._buf_pos
+        end_pos = buf_pos + length
+
+        if end_pos <= len(buf):
+            # The data is already in the buffer.
+            self._buf_pos = end_pos
+
+            return buf[buf_pos:end_pos]
+
+        # We'll need more than what's in the buffer. Take what's there, and
+        # read the remainder directly from the stream.
+        chunks = [buf[buf_pos:]]
+        remaining = end_pos - len(buf)
+        self._buf = b''
+        self._buf_pos = 0
+        self._buf_offset += len(buf)
+
+        fp = self._fp
+
+        while remaining > 0 and not self._eof:
+            chunk = fp.read(remaining)
+
+            if chunk:
+                chunks.append(chunk)
+                remaining -= len(chunk)
+                self._buf_offset += len(chunk)
+            else:
+                self._eof = True
+
+        return b''.join(chunks)
+
+    def _skip_content(self, length, linenum, consumed=0):
+        """Skip past the rest of a section's content.
+
+        Args:
+            length (int):
+                The length of the content.
+
+            linenum (int):
+                The 0-based line number of the section's header. This may be
+                ``None`` if unknown.
+
+            consumed (int, optional):
+                The amount of content that has already been read.
+
+        Raises:
+            pydiffx.errors.DiffXParseError:
+                The file ended before the end of the content.
+        """
+        skipped = self._skip_bytes(length - consumed)
+        self._check_skipped_content(length=length,
+                                    skipped=consumed + skipped,
+                                    linenum=linenum)
+
+    def _skip_bytes(self, length):
+        """Skip past a number of bytes in the stream.
+
+        If the bytes are in the read-ahead buffer or memory mapping, this
+        will just advance past them. Otherwise, the stream will be seeked
+        past them, or (if it can't seek) read in blocks and discarded.
+
+        Args:
+            length (int):
+                The number of bytes to skip.
+
+        Returns:
+            int:
+            The number of bytes skipped. This will only be less than
+            ``length`` if the end of the file was reached.
+        """
+        buf = self._buf
+        buf_pos = self._buf_pos
+        end_pos = buf_pos + length
+
+        if end_pos <= len(buf) or self._view is not None:
+            self._buf_pos = min(end_pos, len(buf))
+
+            return self._buf_pos - buf_pos
+
+        remaining = end_pos - len(buf)
+        self._buf = b''
+        self._buf_pos = 0
+        self._buf_offset += len(buf)
+
+        if self._seekable:
+            fp = self._fp
+
+            if self._stream_size is None:
+                self._stream_size = fp.seek(0, os.SEEK_END)
+                fp.seek(self._buf_offset)
+
+            # Seeking past the end of the file won't fail, so make sure we
+            # stop there.
+            seek_len = max(0, min(remaining,
+                                  self._stream_size - self._buf_offset))
+            fp.seek(seek_len, os.SEEK_CUR)
+            self._buf_offset += seek_len
+            remaining -= seek_len
+
+            if remaining > 0:
+                self._eof = True
+        else:
+            fp = self._fp
+
+            while remaining > 0 and not self._eof:
+                chunk = fp.read(min(remaining, self._block_size))
+
+                if chunk:
+                    remaining -= len(chunk)
+                    self._buf_offset += len(chunk)
+                else:
+                    self._eof = True
+
+        return length - remaining
+
+    def _read_bytes_at(self, offset, length, allow_view=False):
+        """Read a number of bytes at an offset in the stream.
+
+        This won't affect the current position of the reader.
+
+        Args:
+            offset (int):
+                The offset in the stream to read from.
+
+            length (int):
+                The number of bytes to read.
+
+            allow_view (bool, optional):
+                Whether a :py:class:`memoryview` may be returned, if the
+                reader is backed by a memory mapping.
+
+        Returns:
+            bytes or memoryview:
+            The resulting data.
+
+        Raises:
+            pydiffx.errors.DiffXContentError:
+                The data is no longer available in a stream that can't seek.
+        """
+        if self._view is not None:
+            data = self._view[offset:offset + length]
+
+            if not allow_view:
+                data = data.tobytes()
+
+            return data
+
+        buf_offset = self._buf_offset
+        buf = self._buf
+
+        if buf_offset <= offset and offset + length <= buf_offset + len(buf):
+            # The data is still in the read-ahead buffer.
+            i = offset - buf_offset
+
+            return buf[i:i + length]
+
+        if not self._seekable:
+            raise DiffXContentError(
+                'The content at offset %d is no longer available, as the '
+                'stream does not support seeking'
+                % offset)
+
+        fp = self._fp
+        old_pos = fp.tell()
+        chunks = []
+
+        try:
+            fp.seek(offset)
+
+            while length > 0:
+                chunk = fp.read(length)
+
+                if not chunk:
+                    break
+
+                chunks.append(chunk)
+                length -= len(chunk)
+        finally:
+            fp.seek(old_pos)
+
+        return b''.join(chunks)
+
+    def _read_view(self, length):
+        """Return a view of a number of bytes from the memory mapping.
+
+        This must only be called if the reader is backed by a memory mapping.
+        No data will be copied.
+
+        Args:
+            length (int):
+                The number of bytes to read.
+
+        Returns:
+            memoryview:
+            A view of the bytes in the mapping. This will only be shorter
+            than ``length`` if the end of the file was reached.
+        """
+        buf_pos = self._buf_pos
+        end_pos = min(buf_pos + length, len(self._view))
+        self._buf_pos = end_pos
+
+        return self._view[buf_pos:end_pos]
+
+    def _fill_buffer(self):
+        """Read the next block from the stream into the read-ahead buffer.
+
+        Any data that has already been consumed will be discarded from the
+        buffer.
+
+        Returns:
+            bool:
+            ``True`` if more data was read into the buffer. ``False`` if the
+            end of the file was reached.
+        """
+        if self._eof:
+            return False
+
+        chunk = self._fp.read(self._block_size)
+
+        if not chunk:
+            self._eof = True
+
+            return False
+
+        self._buf = self._buf[self._buf_pos:] + chunk
+        self._buf_offset += self._buf_pos
+        self._buf_pos = 0
+
+        return True
+
+
+class DiffXContentHandle(object):
+    """A handle for reading the content of a section on demand.
+
+    Handles are provided by :py:meth:`DiffXReader.iter_sections` when
+    reading content lazily. They contain the information needed to locate
+    and decode the content, and can read it through the reader that
+    created them.
+
+    Content can always be read while the handle's section is the most
+    recent one returned by the reader. After that, it can only be read if
+    the reader is backed by a seekable stream or memory mapping.
+
+    Diff content can also be read in bounded chunks through
+    :py:meth:`iter_chunks`, so that very large diffs never need to be held
+    in memory.
+
+    Attributes:
+        encoding (unicode):
+            The encoding for the content, either set in the section's
+            options or inherited from a parent section. For diff sections,
+            this is only set if provided in the section's options.
+
+        line (int):
+            The 0-based line number of the section's header. This may be
+            ``None`` if unknown.
+
+        offset (int):
+            The offset of the content within the stream.
+
+        options (dict):
+            The options parsed from the section's header.
+
+        section_id (unicode):
+            The ID of the section.
+    """
+
+    #: The default maximum size of each chunk from :py:meth:`iter_chunks`.
+    #:
+    #: Type:
+    #:     int
+    DEFAULT_CHUNK_SIZE = 64 * 1024
+
+    __slots__ = (
+        'encoding',
+        'line',
+        'offset',
+        'options',
+        'section_id',
+        '_reader',
+    )
+
+    def __init__(self, reader, section_id, offset, options, encoding,
+                 line):
+        """Initialize the handle.
+
+        Args:
+            reader (DiffXReader):
+                The reader that created this handle.
+
+            section_id (unicode):
+                The ID of the section.
+
+            offset (int):
+                The offset of the content within the stream.
+
+            options (dict):
+                The options parsed from the section's header.
+
+            encoding (unicode):
+                The encoding for the content.
+
+            line (int):
+                The 0-based line number of the section's header.
+        """
+        self.section_id = section_id
+        self.offset = offset
+        self.options = options
+        self.encoding = encoding
+        self.line = line
+        self._reader = reader
+
+    @property
+    def length(self):
+        """The length of the content, in bytes.
+
+        Type:
+            int
+        """
+        return self.options['length']
+
+    @property
+    def line_endings(self):
+        """The line endings specified for the content, if any.
+
+        Type:
+            unicode
+        """
+        return self.options.get('line_endings')
+
+    def read(self):
+        """Read and return the content.
+
+        Returns:
+            object:
+            The content of the section. This will be the decoded text of a
+            preamble section, the metadata dictionary of a meta section, or
+            the bytes of a diff section (see
+            :py:meth:`DiffXReader.iter_sections`).
+
+        Raises:
+            pydiffx.errors.DiffXContentError:
+                The content is no longer available in a stream that can't
+                seek.
+
+            pydiffx.errors.DiffXParseError:
+                The content could not be parsed.
+        """
+        return self._reader._read_handle(self)
+
+    def iter_chunks(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Iterate through the content of a diff section in chunks.
+
+        The content is read in chunks of up to ``chunk_size`` bytes, and
+        only one chunk is held in memory at a time. As with :py:meth:`read`,
+        the content is not decoded.
+
+        The content will be validated once the last chunk has been read,
+        ensuring it ends with a newline. If the content was read in full
+        from the current position in the stream, the reader will continue
+        to track line numbers for the sections that follow.
+
+        If iteration stops early, the rest of the content will be skipped
+        when the next section is read.
+
+        Args:
+            chunk_size (int, optional):
+                The maximum size of each chunk, in bytes.
+
+        Yields:
+            bytes or memoryview:
+            Each chunk of content. If the reader is backed by a memory
+            mapping, these will be :py:class:`memoryview` slices of the
+            mapping.
+
+        Raises:
+            ValueError:
+                ``chunk_size`` was not a positive integer.
+
+            pydiffx.errors.DiffXContentError:
+                This is not a handle for a diff section, or the content is
+                no longer available in a stream that can't seek.
+
+            pydiffx.errors.DiffXParseError:
+                The content could not be parsed. This will be raised after
+                the last chunk.
+        """
+        if self.section_id != Section.FILE_DIFF:
+            raise DiffXContentError(
+                'Only diff content can be read in chunks, not "%s"'
+                % self.section_id)
+
+        if chunk_size < 1:
+            raise ValueError('chunk_size must be a positive integer')
+
+        return self._reader._iter_handle_chunks(self, chunk_size)
+
+    def __repr__(self):
+        """Return a string representation of the handle.
+
+        Returns:
+            unicode:
+            The string representation.
+        """
+        return '<%s(section_id=%r, offset=%r, length=%r)>' % (
+            self.__class__.__name__,
+            self.section_id,
+            self.offset,
+            self.length)
+
+
+class DiffXLazyMetadata(MutableMapping):
+    """Metadata that's decoded from JSON the first time it's accessed.
+
+    This is provided by :py:meth:`DiffXReader.iter_sections` when reading
+    with ``lazy_metadata=True``. It holds the encoded JSON content of a
+    metadata section, and behaves as a dictionary. The JSON is decoded on
+    first access, and the result is cached.
+
+    Attributes:
+        encoding (unicode):
+            The encoding of the JSON content. If ``None``, the encoding will
+            be detected by the JSON codec.
+
+        json_codec (pydiffx.json_codecs.BaseJSONCodec):
+            The codec used to decode the JSON content.
+
+        line (int):
+            The 0-based line number of the section's header. This may be
+            ``None`` if unknown.
+
+        raw (bytes):
+            The encoded JSON content.
+    """
+
+    __slots__ = (
+        'encoding',
+        'json_codec',
+        'line',
+        'raw',
+        '_data',
+        '_loaded',
+    )
+
+    def __init__(self, raw, encoding=None, line=None, json_codec=None):
+        """Initialize the metadata.
+
+        Args:
+            raw (bytes):
+                The encoded JSON content.
+
+            encoding (unicode, optional):
+                The encoding of the JSON content.
+
+            line (int, optional):
+                The 0-based line number of the section's header.
+
+            json_codec (pydiffx.json_codecs.BaseJSONCodec, optional):
+                The codec used to decode the JSON content. This defaults to
+                the result of
+                :py:func:`~pydiffx.json_codecs.get_default_json_codec`.
+        """
+        if json_codec is None:
+            json_codec = get_default_json_codec()
+
+        self.raw = raw
+        self.encoding = encoding
+        self.json_codec = json_codec
+        self.line = line
+        self._data = None
+
+        # This is tracked separately from the data, since the JSON content
+        # may decode to None.
+        self._loaded = False
+
+    @property
+    def loaded(self):
+        """Whether the JSON content has been decoded.
+
+        Type:
+            bool
+        """
+        return self._loaded
+
+    def load(self):
+        """Decode and return the metadata.
+
+        The JSON content is decoded only once. Later calls return the same
+        dictionary.
+
+        Returns:
+            dict:
+            The metadata.
+
+        Raises:
+            pydiffx.errors.DiffXParseError:
+                The JSON content could not be parsed.
+        """
+        if not self._loaded:
+            content = self.raw
+
+            if self.encoding:
+                content = content.decode(self.encoding)
+
+            try:
+                self._data = self.json_codec.loads(content)
+            except ValueError as e:
+                raise DiffXParseError(
+                    'JSON metadata could not be parsed: %s' % e,
+                    linenum=self.line)
+
+            self._loaded = True
+
+        return self._data
+
+    def __getitem__(self, key):
+        """Return a value from the metadata.
+
+        Args:
+            key (unicode):
+                The key to look up.
+
+        Returns:
+            object:
+            The value for the key.
+
+        Raises:
+            KeyError:
+                The key was not found.
+        """
+        return self.load()[key]
+
+    def __setitem__(self, key, value):
+        """Set a value in the metadata.
+
+        Args:
+            key (unicode):
+                The key to set.
+
+            value (object):
+                The value to set.
+        """
+        self.load()[key] = value
+
+    def __delitem__(self, key):
+        """Delete a value from the metadata.
+
+        Args:
+            key (unicode):
+                The key to delete.
+
+        Raises:
+            KeyError:
+                The key was not found.
+        """
+        del self.load()[key]
+
+    def __iter__(self):
+        """Iterate through the keys in the metadata.
+
+        Yields:
+            unicode:
+            Each key in the metadata.
+        """
+        return iter(self.load())
+
+    def __len__(self):
+        """Return the number of keys in the metadata.
+
+        Returns:
+            int:
+            The number of keys.
+        """
+        return len(self.load())
+
+    def __eq__(self, other):
+        """Return whether the metadata is equal to another mapping.
+
+        Args:
+            other (object):
+                The object to compare to.
+
+        Returns:
+            bool:
+            ``True`` if the metadata is equal to the other mapping.
+        """
+        if isinstance(other, DiffXLazyMetadata):
+            other = other.load()
+
+        return self.load() == other
+
+    def __repr__(self):
+        """Return a string representation of the metadata.
+
+        Returns:
+            unicode:
+            The string representation.
+        """
+        if not self._loaded:
+            return '<%s(raw=%r)>' % (self.__class__.__name__, self.raw)
+
+        return '<%s(%r)>' % (self.__class__.__name__, self._data)
+
+
+class DiffXSectionInfo(MutableMapping):
+    """A compact record of information on a section.
+
+    This is provided by the readers in place of a dictionary when reading
+    with ``section_records=True``. It contains the same information, stored
+    in slots rather than a per-section dictionary, and can be accessed
+    either as attributes or as a dictionary.
+
+    The options of records are immutable. Records with the same options
+    (aside from those with numeric values, like ``length``) will share the
+    same options object.
+
+    Attributes:
+        level (int):
+            The 0-based section level.
+
+        line (int):
+            The 0-based line number where the section starts. This may be
+            ``None`` if unknown.
+
+        options (types.MappingProxyType):
+            The options parsed from the section's header.
+
+        section (unicode):
+            The ID of the section.
+
+        type (unicode):
+            The type of section.
+
+        diff (bytes or memoryview):
+            The diff content, for diff sections. This is only set if the
+            content was read up-front.
+
+        handle (DiffXContentHandle):
+            A handle for reading the content on demand, for content sections
+            read lazily.
+
+        metadata (dict or DiffXLazyMetadata):
+            The metadata, for metadata sections. This is only set if the
+            content was read up-front.
+
+        text (unicode):
+            The decoded text, for preamble sections. This is only set if the
+            content was read up-front.
+    """
+
+    #: The names of all fields that can be set on a record, in order.
+    #:
+    #: Type:
+    #:     tuple of unicode
+    FIELDS = (
+        'level',
+        'line',
+        'options',
+        'section',
+        'type',
+        'diff',
+        'handle',
+        'metadata',
+        'text',
+    )
+
+    __slots__ = FIELDS
+
+    def __init__(self, section, level, section_type, line, options):
+        """Initialize the record.
+
+        Args:
+            section (unicode):
+                The ID of the section.
+
+            level (int):
+                The 0-based section level.
+
+            section_type (unicode):
+                The type of section.
+
+            line (int):
+                The 0-based line number where the section starts.
+
+            options (types.MappingProxyType):
+                The options parsed from the section's header.
+        """
+        self.section = section
+        self.level = level
+        self.type = section_type
+        self.line = line
+        self.options = options
+
+    def __getitem__(self, key):
+        """Return the value of a field.
+
+        Args:
+            key (unicode):
+                The name of the field.
+
+        Returns:
+            object:
+            The value of the field.
+
+        Raises:
+            KeyError:
+                The field is not valid or is not set.
+        """
+        if key in _SECTION_INFO_FIELDS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                pass
+
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        """Set the value of a field.
+
+        Args:
+            key (unicode):
+                The name of the field.
+
+            value (object):
+                The value to set.
+
+        Raises:
+            KeyError:
+                The field is not valid.
+        """
+        if key not in _SECTION_INFO_FIELDS:
+            raise KeyError(key)
+
+        setattr(self, key, value)
+
+    def __delitem__(self, key):
+        """Unset a field.
+
+        Args:
+            key (unicode):
+                The name of the field.
+
+        Raises:
+            KeyError:
+                The field is not valid or is not set.
+        """
+        if key in _SECTION_INFO_FIELDS:
+            try:
+                delattr(self, key)
+                return
+            except AttributeError:
+                pass
+
+        raise KeyError(key)
+
+    def __iter__(self):
+        """Iterate through the names of all fields that are set.
+
+        Yields:
+            unicode:
+            Each field name.
+        """
+        for key in self.FIELDS:
+            if hasattr(self, key):
+                yield key
+
+    def __len__(self):
+        """Return the number of fields that are set.
+
+        Returns:
+            int:
+            The number of fields.
+        """
+        return sum(
+            1
+            for key in self.FIELDS
+            if hasattr(self, key)
+        )
+
+    def __repr__(self):
+        """Return a string representation of the record.
+
+        Returns:
+            unicode:
+            The string representation.
+        """
+        return '<%s(%r)>' % (self.__class__.__name__, dict(self.items()))
 
-        result = s.getvalue()
-        s.close()
 
-        return result, eof
+_SECTION_INFO_FIELDS = frozenset(DiffXSectionInfo.FIELDS)
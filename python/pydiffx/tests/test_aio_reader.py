@@ -0,0 +1,224 @@
+"""Unit tests for pydiffx.aio.reader."""
+
+import asyncio
+import io
+
+from pydiffx.aio.reader import AsyncDiffXReader
+from pydiffx.errors import DiffXParseError
+from pydiffx.reader import DiffXReader, DiffXSectionInfo
+from pydiffx.sections import Section
+from pydiffx.tests.testcases import TestCase
+
+
+class AsyncDiffXReaderTests(TestCase):
+    """Unit tests for pydiffx.aio.reader.AsyncDiffXReader."""
+
+    DIFFX_DATA = (
+        b'#diffx: encoding=utf-8, version=1.0\n'
+        b'#.preamble: indent=2, length=35\n'
+        b'  Summary of the main preamble.\n'
+        b'  \n'
+        b'#.meta: format=json, length=23\n'
+        b'{\n'
+        b'    "key": "value"\n'
+        b'}\n'
+        b'#.change:\n'
+        b'#..preamble: indent=4, length=23\n'
+        b'    Summary of change.\n'
+        b'#..file:\n'
+        b'#...meta: format=json, length=27\n'
+        b'{\n'
+        b'    "path": "file.txt"\n'
+        b'}\n'
+        b'#...diff: length=58\n'
+        b'--- file.txt\n'
+        b'+++ file.txt\n'
+        b'@@ -1 +1 @@\n'
+        b'-old line\n'
+        b'+new line\n'
+        b'\n'
+        b'#.change: encoding=utf-16\n'
+        b'#..file:\n'
+        b'#...meta: format=json, length=56\n'
+        + '{\n    "path": "file2.txt"\n}\n'.encode('utf-16-le') +
+        b'#...diff: length=13\n'
+        b'Binary file\n'
+        b'\n'
+    )
+
+    def test_iter_sections(self):
+        """Testing AsyncDiffXReader.iter_sections"""
+        self.assertEqual(self._read_sections(self.DIFFX_DATA),
+                         list(DiffXReader(io.BytesIO(self.DIFFX_DATA))))
+
+    def test_iter_sections_with_section_records(self):
+        """Testing AsyncDiffXReader.iter_sections with section_records=True
+        """
+        sections = self._read_sections(self.DIFFX_DATA, section_records=True)
+
+        self.assertIsInstance(sections[0], DiffXSectionInfo)
+        self.assertEqual(sections,
+                         list(DiffXReader(io.BytesIO(self.DIFFX_DATA))))
+
+    def test_iter_sections_with_long_lines(self):
+        """Testing AsyncDiffXReader.iter_sections with headers longer than
+        the stream's limit
+        """
+        self.assertEqual(self._read_sections(self.DIFFX_DATA, limit=8),
+                         list(DiffXReader(io.BytesIO(self.DIFFX_DATA))))
+
+    def test_iter_sections_with_file_filter(self):
+        """Testing AsyncDiffXReader.iter_sections with file_filter"""
+        def _file_filter(metadata):
+            return metadata['path'] == 'file2.txt'
+
+        sections = self._read_sections(self.DIFFX_DATA,
+                                       file_filter=_file_filter)
+
+        self.assertEqual(
+            [
+                (_section['section'], _section['line'])
+                for _section in sections
+            ],
+            [
+                (Section.MAIN, 0),
+                (Section.MAIN_PREAMBLE, 1),
+                (Section.MAIN_META, 4),
+                (Section.CHANGE, 8),
+                (Section.CHANGE_PREAMBLE, 9),
+                (Section.CHANGE, None),
+                (Section.FILE, None),
+                (Section.FILE_META, None),
+                (Section.FILE_DIFF, None),
+            ])
+        self.assertEqual(sections[7]['metadata'], {'path': 'file2.txt'})
+        self.assertEqual(sections[8]['diff'], b'Binary file\n\n')
+
+    def test_iter_sections_with_parse_error(self):
+        """Testing AsyncDiffXReader.iter_sections with an invalid section
+        order
+        """
+        message = (
+            'Error on line 2: Unknown or unexpected section ID ".file". '
+            'Expected one of: ".change", ".meta", ".preamble"'
+        )
+
+        with self.assertRaisesMessage(DiffXParseError, message):
+            self._read_sections(
+                b'#diffx: version=1.0\n'
+                b'\n'
+                b'#.file:\n')
+
+    def test_iter_sections_with_content_missing_newline(self):
+        """Testing AsyncDiffXReader.iter_sections with content missing a
+        trailing newline at the end of the stream
+        """
+        message = 'Error on line 3: Expected a newline after content'
+
+        with self.assertRaisesMessage(DiffXParseError, message):
+            self._read_sections(
+                b'#diffx: version=1.0\n'
+                b'#.preamble: length=10\n'
+                b'No newline')
+
+    def test_iter_sections_with_file_filter_and_truncated_content(self):
+        """Testing AsyncDiffXReader.iter_sections with file_filter and
+        filtered content past the end of the stream
+        """
+        message = (
+            'Error on line 6: Unexpected end of file. Expected 100000 bytes '
+            'of content, but found 13'
+        )
+
+        # The length is larger than a single skipped chunk.
+        with self.assertRaisesMessage(DiffXParseError, message):
+            self._read_sections(
+                b'#diffx: encoding=utf-8, version=1.0\n'
+                b'#.change:\n'
+                b'#..file:\n'
+                b'#...meta: format=json, length=3\n'
+                b'{}\n'
+                b'#...diff: length=100000\n'
+                b'--- file.txt\n',
+                file_filter=lambda metadata: False)
+
+    def test_async_for(self):
+        """Testing AsyncDiffXReader with async for"""
+        async def _read():
+            stream = self._create_stream(self.DIFFX_DATA)
+
+            return [
+                section['section']
+                async for section in AsyncDiffXReader(stream)
+            ]
+
+        self.assertEqual(
+            asyncio.run(_read()),
+            [
+                Section.MAIN,
+                Section.MAIN_PREAMBLE,
+                Section.MAIN_META,
+                Section.CHANGE,
+                Section.CHANGE_PREAMBLE,
+                Section.FILE,
+                Section.FILE_META,
+                Section.FILE_DIFF,
+                Section.CHANGE,
+                Section.FILE,
+                Section.FILE_META,
+                Section.FILE_DIFF,
+            ])
+
+    def _read_sections(self, data, limit=None, **kwargs):
+        """Read all sections from data using an AsyncDiffXReader.
+
+        Args:
+            data (bytes):
+                The DiffX data to read.
+
+            limit (int, optional):
+                The buffer limit for the stream.
+
+            **kwargs (dict):
+                Keyword arguments to pass to
+                :py:meth:`AsyncDiffXReader.iter_sections`.
+
+        Returns:
+            list of dict:
+            The sections read from the data.
+        """
+        async def _read():
+            reader = AsyncDiffXReader(self._create_stream(data, limit=limit))
+
+            return [
+                section
+                async for section in reader.iter_sections(**kwargs)
+            ]
+
+        return asyncio.run(_read())
+
+    def _create_stream(self, data, limit=None):
+        """Return a stream reader containing the provided data.
+
+        This must be called within a running event loop.
+
+        Args:
+            data (bytes):
+                The data to feed to the stream.
+
+            limit (int, optional):
+                The buffer limit for the stream.
+
+        Returns:
+            asyncio.StreamReader:
+            The stream reader.
+        """
+        if limit is None:
+            stream = asyncio.StreamReader()
+        else:
+            stream = asyncio.StreamReader(limit=limit)
+
+        stream.feed_data(data)
+        stream.feed_eof()
+
+        return stream
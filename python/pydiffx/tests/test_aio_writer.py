@@ -0,0 +1,188 @@
+"""Unit tests for pydiffx.aio.writer."""
+
+import asyncio
+import io
+import os
+import pathlib
+import tempfile
+
+from pydiffx.aio.writer import AsyncDiffXWriter
+from pydiffx.errors import DiffXContentError, DiffXSectionOrderError
+from pydiffx.tests.testcases import TestCase
+from pydiffx.writer import DiffXWriter
+
+
+class RecordingStreamWriter(object):
+    """A stream writer that records writes and drains.
+
+    Each drain records the amount of data written so far.
+    """
+
+    def __init__(self):
+        """Initialize the stream writer."""
+        self.buffer = io.BytesIO()
+        self.drains = []
+
+    def write(self, data):
+        """Write data to the stream.
+
+        Args:
+            data (bytes):
+                The data to write.
+        """
+        self.buffer.write(data)
+
+    async def drain(self):
+        """Drain the stream, recording the amount of data written."""
+        self.drains.append(self.buffer.tell())
+
+
+class AsyncDiffXWriterTests(TestCase):
+    """Unit tests for pydiffx.aio.writer.AsyncDiffXWriter."""
+
+    def test_write(self):
+        """Testing AsyncDiffXWriter writes the same data as DiffXWriter"""
+        async def _write():
+            writer = AsyncDiffXWriter(stream, encoding='utf-16')
+            await writer.write_preamble('Summary of the main preamble.\n')
+            await writer.write_meta({'key': 'value'})
+            await writer.new_change(encoding='utf-8')
+            await writer.write_preamble('Summary of change.\n',
+                                        line_endings='unix')
+            await writer.new_file()
+            await writer.write_meta({'path': 'file.txt'})
+            await writer.write_diff(b'--- file.txt\n'
+                                    b'+++ file.txt\n'
+                                    b'@@ -1 +1 @@\n'
+                                    b'-old line\n'
+                                    b'+new line\n',
+                                    diff_type='text')
+
+        stream = RecordingStreamWriter()
+        asyncio.run(_write())
+
+        expected = io.BytesIO()
+        writer = DiffXWriter(expected, encoding='utf-16')
+        writer.write_preamble('Summary of the main preamble.\n')
+        writer.write_meta({'key': 'value'})
+        writer.new_change(encoding='utf-8')
+        writer.write_preamble('Summary of change.\n',
+                              line_endings='unix')
+        writer.new_file()
+        writer.write_meta({'path': 'file.txt'})
+        writer.write_diff(b'--- file.txt\n'
+                          b'+++ file.txt\n'
+                          b'@@ -1 +1 @@\n'
+                          b'-old line\n'
+                          b'+new line\n',
+                          diff_type='text')
+
+        self.assertEqual(stream.buffer.getvalue(), expected.getvalue())
+
+        # The stream should have been drained after every section.
+        self.assertEqual(len(stream.drains), 7)
+        self.assertEqual(stream.drains[-1], len(expected.getvalue()))
+        self.assertEqual(stream.drains, sorted(set(stream.drains)))
+
+    def test_with_section_order_error(self):
+        """Testing AsyncDiffXWriter with sections written in the wrong
+        order
+        """
+        async def _write():
+            writer = AsyncDiffXWriter(RecordingStreamWriter())
+            await writer.write_diff(b'...\n')
+
+        message = (
+            'write_diff() cannot be called at this stage (after '
+            'initialization). Expected one of: new_change(), write_meta(), '
+            'write_preamble()'
+        )
+
+        with self.assertRaisesMessage(DiffXSectionOrderError, message):
+            asyncio.run(_write())
+
+    def test_write_diff_with_bytes_like(self):
+        """Testing AsyncDiffXWriter.write_diff with bytearray and memoryview
+        content
+        """
+        async def _write():
+            writer = AsyncDiffXWriter(stream)
+            await writer.new_change()
+            await writer.new_file()
+            await writer.write_meta({'path': 'file.txt'})
+            await writer.write_diff(bytearray(b'Binary file\n'))
+            await writer.new_file()
+            await writer.write_meta({'path': 'file2.txt'})
+            await writer.write_diff(memoryview(b'Binary file\n'))
+
+        stream = RecordingStreamWriter()
+        asyncio.run(_write())
+
+        self.assertEqual(stream.buffer.getvalue().count(b'Binary file\n'), 2)
+
+    def test_write_diff_with_streamed_content(self):
+        """Testing AsyncDiffXWriter.write_diff with content that would
+        need to be read from a file, path, or iterable
+        """
+        fd, path = tempfile.mkstemp()
+        self.addCleanup(os.unlink, path)
+
+        with os.fdopen(fd, 'wb') as fp:
+            fp.write(b'Binary file\n')
+
+        async def _write(content):
+            writer = AsyncDiffXWriter(stream)
+            await writer.new_change()
+            await writer.new_file()
+            await writer.write_meta({'path': 'file.txt'})
+            await writer.write_diff(content)
+
+        with open(path, 'rb') as fp:
+            for content in (pathlib.Path(path), fp, [b'Binary file\n']):
+                stream = RecordingStreamWriter()
+                message = 'diff must be a byte string, not %s' % type(content)
+
+                with self.assertRaisesMessage(DiffXContentError, message):
+                    asyncio.run(_write(content))
+
+                # Nothing should have been read from the file.
+                self.assertEqual(fp.tell(), 0)
+
+    def test_with_stream_writer(self):
+        """Testing AsyncDiffXWriter with an asyncio.StreamWriter"""
+        async def _serve(reader, writer):
+            diffx_writer = AsyncDiffXWriter(writer)
+            await diffx_writer.new_change()
+            await diffx_writer.new_file()
+            await diffx_writer.write_meta({'path': 'file.txt'})
+            await diffx_writer.write_diff(b'Binary file\n\n')
+
+            writer.close()
+
+        async def _run():
+            server = await asyncio.start_server(_serve, '127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+
+            try:
+                reader, writer = await asyncio.open_connection('127.0.0.1',
+                                                               port)
+                data = await reader.read()
+                writer.close()
+            finally:
+                server.close()
+                await server.wait_closed()
+
+            return data
+
+        self.assertEqual(
+            asyncio.run(_run()),
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.change:\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=27\n'
+            b'{\n'
+            b'    "path": "file.txt"\n'
+            b'}\n'
+            b'#...diff: length=13, line_endings=unix\n'
+            b'Binary file\n'
+            b'\n')
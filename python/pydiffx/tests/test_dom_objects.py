@@ -1,5 +1,11 @@
 """Unit tests for pydiffx.dom.objects."""
 
+import gc
+import json
+import os
+import tempfile
+import warnings
+
 import kgb
 
 from pydiffx.dom.objects import (DiffX,
@@ -9,7 +15,9 @@ from pydiffx.dom.objects import (DiffX,
                                  DiffXMetaSection,
                                  DiffXPreambleSection,
                                  logger as dom_objects_logger)
-from pydiffx.errors import (DiffXOptionValueChoiceError,
+from pydiffx.dom.reader import DiffXLazyContent
+from pydiffx.errors import (DiffXContentError,
+                            DiffXOptionValueChoiceError,
                             DiffXOptionValueError,
                             DiffXUnknownOptionError,
                             MalformedHunkError)
@@ -17,6 +25,7 @@ from pydiffx.options import (DiffType,
                              LineEndings,
                              MetaFormat,
                              PreambleMimeType)
+from pydiffx.reader import DiffXContentHandle, DiffXLazyMetadata
 from pydiffx.tests.testcases import TestCase
 
 
@@ -81,8 +90,54 @@ class BaseSectionTestCase(TestCase):
 class DiffXTests(kgb.SpyAgency, BaseSectionTestCase):
     """Unit tests for pydiffx.dom.objects.DiffX."""
 
+    LAZY_DIFFX_DATA = (
+        b'#diffx: encoding=utf-8, version=1.0\n'
+        b'#.preamble: indent=4, length=14, line_endings=unix\n'
+        b'    Preamble.\n'
+        b'#.change:\n'
+        b'#..file:\n'
+        b'#...meta: format=json, length=24\n'
+        b'{\n'
+        b'    "path": "file1"\n'
+        b'}\n'
+        b'#...diff: length=60, line_endings=unix\n'
+        b'--- /file1\n'
+        b'+++ /file1\n'
+        b'@@ -498,7 +498,7 @@\n'
+        b' ... diff content\n'
+    )
+
+    # This isn't in the form the writer would generate, in order to test
+    # that the original bytes are preserved.
+    RAW_DIFFX_DATA = (
+        b'#diffx: encoding=utf-8, version=1.0\n'
+        b'#.change:\n'
+        b'#..meta: format=json, length=26\n'
+        b'{"zz": 1, "id": "abc123"}\n'
+        b'#..file:\n'
+        b'#...meta: length=18, format=json\n'
+        b'{"path": "file1"}\n'
+        b'#...diff: length=22\n'
+        b'--- /file1\n'
+        b'+++ /file1\n'
+    )
+
     section_cls = DiffX
 
+    def test_sections_with_custom_attributes(self):
+        """Testing DiffX sections don't accept custom attributes"""
+        diffx = DiffX()
+        change = diffx.add_change()
+        diff_file = change.add_file(meta={'path': 'file1'},
+                                    diff=b'...\n')
+
+        for section in (diffx, diffx.meta_section, diffx.preamble_section,
+                        change, diff_file, diff_file.diff_section):
+            self.assertFalse(hasattr(section, '__dict__'))
+
+            with self.assertRaises(AttributeError):
+                section.custom_attr = 123
+
     def test_to_bytes_with_simple_diff(self):
         """Testing DiffX.to_bytes with a simple diff"""
         diffx_file = DiffX()
@@ -712,6 +767,46 @@ class DiffXTests(kgb.SpyAgency, BaseSectionTestCase):
             b'+new line\n')
         self.assertEqual(file.diff_section.options, {})
 
+    def test_from_bytes_with_shared_options(self):
+        """Testing DiffX.from_bytes shares options between sections"""
+        diffx = DiffX.from_bytes(
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.change:\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=3\n'
+            b'{}\n'
+            b'#...diff: length=2, line_endings=unix\n'
+            b'a\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=3\n'
+            b'{}\n'
+            b'#...diff: length=3, line_endings=unix\n'
+            b'bc\n')
+
+        files = diffx.changes[0].files
+
+        self.assertIs(files[0].diff_section._options,
+                      files[1].diff_section._options)
+        self.assertEqual(files[0].diff_section.options,
+                         {'line_endings': 'unix'})
+
+        files[0].diff_line_endings = 'dos'
+
+        self.assertEqual(files[0].diff_line_endings, 'dos')
+        self.assertEqual(files[1].diff_line_endings, 'unix')
+
+    def test_from_bytes_with_unknown_container_option(self):
+        """Testing DiffX.from_bytes with an unknown option on a container
+        section
+        """
+        message = '"foo" is not a valid option or content section'
+
+        with self.assertRaisesMessage(DiffXUnknownOptionError, message):
+            DiffX.from_bytes(
+                b'#diffx: encoding=utf-8, version=1.0\n'
+                b'#.change:\n'
+                b'#..file: foo=bar\n')
+
     def test_from_bytes_to_bytes_preserves_content(self):
         """Testing DiffX.from_bytes followed by to_bytes results in
         byte-for-byte reproduction
@@ -800,6 +895,349 @@ class DiffXTests(kgb.SpyAgency, BaseSectionTestCase):
         diffx = DiffX.from_bytes(diff_content)
         self.assertMultiLineBytesEqual(diffx.to_bytes(), diff_content)
 
+    def test_from_bytes_with_lazy_metadata(self):
+        """Testing DiffX.from_bytes with lazy_metadata=True"""
+        diff_content = (
+            b'#diffx: version=1.0\n'
+            b'#.meta: encoding=utf-32, format=json, length=96\n'
+            b'\xff\xfe\x00\x00{\x00\x00\x00\n\x00\x00\x00'
+            b' \x00\x00\x00 \x00\x00\x00 \x00\x00\x00 \x00\x00\x00"'
+            b'\x00\x00\x00k\x00\x00\x00e\x00\x00\x00y\x00\x00\x00"'
+            b'\x00\x00\x00:\x00\x00\x00 \x00\x00\x00"\x00\x00\x00v'
+            b'\x00\x00\x00a\x00\x00\x00l\x00\x00\x00u\x00\x00\x00e'
+            b'\x00\x00\x00"\x00\x00\x00\n\x00\x00\x00}\x00\x00\x00'
+            b'\n\x00\x00\x00'
+            b'#.change:\n'
+            b'#..file:\n'
+            b'#...meta: encoding=latin1, format=json, length=24\n'
+            b'{\n'
+            b'    "path": "file1"\n'
+            b'}\n'
+            b'#...diff: length=60, line_endings=unix\n'
+            b'--- /file1\n'
+            b'+++ /file1\n'
+            b'@@ -498,7 +498,7 @@\n'
+            b' ... diff content\n'
+        )
+
+        self.spy_on(json.loads)
+
+        diffx = DiffX.from_bytes(diff_content, lazy_metadata=True)
+        file = diffx.changes[0].files[0]
+
+        self.assertSpyNotCalled(json.loads)
+        self.assertIsInstance(file.meta_section._content, DiffXLazyMetadata)
+
+        self.assertEqual(file.meta, {'path': 'file1'})
+        self.assertIs(file.meta, file.meta)
+        self.assertSpyCallCount(json.loads, 1)
+
+        self.assertEqual(diffx, DiffX.from_bytes(diff_content))
+        self.assertMultiLineBytesEqual(diffx.to_bytes(), diff_content)
+
+    def test_from_bytes_with_keep_raw_bytes(self):
+        """Testing DiffX.from_bytes with keep_raw_bytes=True copies
+        unmodified sections
+        """
+        diffx = DiffX.from_bytes(self.RAW_DIFFX_DATA, keep_raw_bytes=True)
+
+        self.assertEqual(diffx, DiffX.from_bytes(self.RAW_DIFFX_DATA))
+        self.assertMultiLineBytesEqual(diffx.to_bytes(),
+                                       self.RAW_DIFFX_DATA)
+
+    def test_from_bytes_with_keep_raw_bytes_and_modified_meta(self):
+        """Testing DiffX.from_bytes with keep_raw_bytes=True and modified
+        metadata
+        """
+        diffx = DiffX.from_bytes(self.RAW_DIFFX_DATA, keep_raw_bytes=True)
+        diffx.changes[0].files[0].meta['op'] = 'modify'
+
+        self.assertMultiLineBytesEqual(
+            diffx.to_bytes(),
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.change:\n'
+            b'#..meta: format=json, length=26\n'
+            b'{"zz": 1, "id": "abc123"}\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=44\n'
+            b'{\n'
+            b'    "op": "modify",\n'
+            b'    "path": "file1"\n'
+            b'}\n'
+            b'#...diff: length=22\n'
+            b'--- /file1\n'
+            b'+++ /file1\n')
+
+    def test_from_bytes_with_keep_raw_bytes_and_modified_options(self):
+        """Testing DiffX.from_bytes with keep_raw_bytes=True and modified
+        container options
+        """
+        diffx = DiffX.from_bytes(self.RAW_DIFFX_DATA, keep_raw_bytes=True)
+        diffx.changes[0].encoding = 'latin1'
+
+        # The change's subsections must be encoded again, as they depend
+        # on its options.
+        self.assertMultiLineBytesEqual(
+            diffx.to_bytes(),
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.change: encoding=latin1\n'
+            b'#..meta: format=json, length=36\n'
+            b'{\n'
+            b'    "id": "abc123",\n'
+            b'    "zz": 1\n'
+            b'}\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=24\n'
+            b'{\n'
+            b'    "path": "file1"\n'
+            b'}\n'
+            b'#...diff: length=22, line_endings=unix\n'
+            b'--- /file1\n'
+            b'+++ /file1\n')
+
+    def test_from_path_with_lazy_and_keep_raw_bytes(self):
+        """Testing DiffX.from_path with lazy=True and keep_raw_bytes=True"""
+        path = self._write_temp_file(self.LAZY_DIFFX_DATA)
+        message = 'keep_raw_bytes cannot be used along with lazy_content'
+
+        with warnings.catch_warnings(record=True) as caught_warnings:
+            warnings.simplefilter('always', ResourceWarning)
+
+            with self.assertRaisesMessage(ValueError, message):
+                DiffX.from_path(path, lazy=True, keep_raw_bytes=True)
+
+            # The file must have been closed, rather than left for garbage
+            # collection.
+            gc.collect()
+
+        self.assertEqual(
+            [
+                _warning
+                for _warning in caught_warnings
+                if issubclass(_warning.category, ResourceWarning)
+            ],
+            [])
+
+    def test_from_path(self):
+        """Testing DiffX.from_path"""
+        path = self._write_temp_file(self.LAZY_DIFFX_DATA)
+        diffx = DiffX.from_path(path)
+
+        diff_section = diffx.changes[0].files[0].diff_section
+
+        self.assertNotIsInstance(diff_section._content, DiffXLazyContent)
+        self.assertEqual(diffx, DiffX.from_bytes(self.LAZY_DIFFX_DATA))
+
+    def test_from_path_with_lazy(self):
+        """Testing DiffX.from_path with lazy=True"""
+        path = self._write_temp_file(self.LAZY_DIFFX_DATA)
+
+        self.spy_on(DiffXContentHandle.read, owner=DiffXContentHandle)
+
+        with DiffX.from_path(path, lazy=True) as diffx:
+            self.assertSpyNotCalled(DiffXContentHandle.read)
+
+            file = diffx.changes[0].files[0]
+
+            self.assertIsInstance(diffx.preamble_section._content,
+                                  DiffXLazyContent)
+            self.assertIsInstance(file.meta_section._content,
+                                  DiffXLazyContent)
+            self.assertIsInstance(file.diff_section._content,
+                                  DiffXLazyContent)
+            self.assertEqual(file.diff_section.options,
+                             {'line_endings': 'unix'})
+
+            self.assertEqual(
+                file.diff,
+                b'--- /file1\n'
+                b'+++ /file1\n'
+                b'@@ -498,7 +498,7 @@\n'
+                b' ... diff content\n')
+            self.assertSpyCallCount(DiffXContentHandle.read, 1)
+
+            # Diffs are cached, and metadata is kept once loaded.
+            self.assertEqual(file.diff, file.diff)
+            self.assertIs(file.meta, file.meta)
+            self.assertSpyCallCount(DiffXContentHandle.read, 2)
+            self.assertIsInstance(file.meta_section._content, dict)
+
+            file.meta['path'] = 'file2'
+            self.assertEqual(file.meta, {'path': 'file2'})
+
+            self.assertEqual(
+                diffx.to_bytes(),
+                self.LAZY_DIFFX_DATA.replace(b'"file1"', b'"file2"'))
+
+        # Content that was loaded is still available once closed, but
+        # nothing else can be loaded.
+        self.assertEqual(file.meta, {'path': 'file2'})
+
+        message = (
+            'Content for section "...diff" cannot be loaded, as the DiffX '
+            'file has been closed'
+        )
+
+        with self.assertRaisesMessage(DiffXContentError, message):
+            file.diff
+
+    def test_from_path_with_lazy_and_content_cache_size(self):
+        """Testing DiffX.from_path with lazy=True and content_cache_size"""
+        path = self._write_temp_file(self.LAZY_DIFFX_DATA)
+
+        self.spy_on(DiffXContentHandle.read, owner=DiffXContentHandle)
+
+        with DiffX.from_path(path, lazy=True,
+                             content_cache_size=70) as diffx:
+            preamble = diffx.preamble
+            diff = diffx.changes[0].files[0].diff
+
+            self.assertEqual(preamble, 'Preamble.\n')
+            self.assertSpyCallCount(DiffXContentHandle.read, 2)
+
+            # The diff fits within the cache, but not alongside the
+            # preamble, which was evicted.
+            self.assertEqual(diffx.changes[0].files[0].diff, diff)
+            self.assertSpyCallCount(DiffXContentHandle.read, 2)
+
+            self.assertEqual(diffx.preamble, preamble)
+            self.assertSpyCallCount(DiffXContentHandle.read, 3)
+
+    def test_from_path_with_lazy_and_lazy_metadata(self):
+        """Testing DiffX.from_path with lazy=True and lazy_metadata=True"""
+        path = self._write_temp_file(self.LAZY_DIFFX_DATA)
+
+        self.spy_on(json.loads)
+
+        with DiffX.from_path(path, lazy=True, lazy_metadata=True) as diffx:
+            self.assertEqual(diffx, DiffX.from_bytes(self.LAZY_DIFFX_DATA))
+
+    def test_find_files(self):
+        """Testing DiffX.find_files"""
+        diffx = DiffX()
+        change1 = diffx.add_change()
+        change2 = diffx.add_change()
+
+        file3 = change2.add_file(meta={'path': '/src/main.py'})
+        file1 = change1.add_file(meta={'path': '/src/main.py'})
+        file2 = change1.add_file(meta={'path': '/README'})
+
+        self.assertEqual(diffx.find_files('/src/main.py'), [file1, file3])
+        self.assertEqual(diffx.find_files('/README'), [file2])
+        self.assertEqual(diffx.find_files('/src'), [])
+
+    def test_find_files_with_old_and_new_paths(self):
+        """Testing DiffX.find_files with old and new paths"""
+        diffx = DiffX()
+        change = diffx.add_change()
+
+        file1 = change.add_file(meta={
+            'path': {
+                'old': '/src/utils.py',
+                'new': '/src/encoding.py',
+            },
+        })
+        file2 = change.add_file(meta={
+            'path': {
+                'old': '/src/encoding.py',
+                'new': '/src/encoding.py',
+            },
+        })
+        change.add_file(meta={})
+
+        self.assertEqual(diffx.find_files('/src/utils.py'), [file1])
+        self.assertEqual(diffx.find_files('/src/encoding.py'),
+                         [file1, file2])
+
+    def test_find_files_with_meta_changes(self):
+        """Testing DiffX.find_files after changing metadata"""
+        diffx = DiffX()
+        change = diffx.add_change()
+        file1 = change.add_file(meta={'path': '/file1'})
+        file2 = change.add_file()
+
+        self.assertEqual(diffx.find_files('/file1'), [file1])
+        self.assertEqual(diffx.find_files('/file2'), [])
+
+        # Modify the metadata in-place.
+        file1.meta['path'] = {
+            'old': '/file1',
+            'new': '/file3',
+        }
+
+        # Replace the metadata.
+        file2.meta = {'path': '/file2'}
+
+        self.assertEqual(diffx.find_files('/file1'), [file1])
+        self.assertEqual(diffx.find_files('/file2'), [file2])
+        self.assertEqual(diffx.find_files('/file3'), [file1])
+
+        file1.meta_section.content['path'] = '/file2'
+
+        self.assertEqual(diffx.find_files('/file1'), [])
+        self.assertEqual(diffx.find_files('/file2'), [file1, file2])
+        self.assertEqual(diffx.find_files('/file3'), [])
+
+    def test_find_files_with_held_metadata(self):
+        """Testing DiffX.find_files with metadata modified after a query"""
+        diffx = DiffX()
+        change = diffx.add_change()
+        file1 = change.add_file(meta={'path': '/file1'})
+        file2 = change.add_file()
+
+        meta1 = file1.meta
+        meta2 = {'path': '/file2'}
+        file2.meta = meta2
+
+        self.assertEqual(diffx.find_files('/file1'), [file1])
+        self.assertEqual(diffx.find_files('/file2'), [file2])
+
+        # Modify the metadata that was held across the queries.
+        meta1['path'] = '/file3'
+        meta2['path'] = '/file3'
+
+        self.assertEqual(diffx.find_files('/file1'), [])
+        self.assertEqual(diffx.find_files('/file2'), [])
+        self.assertEqual(diffx.find_files('/file3'), [file1, file2])
+
+        del meta1['path']
+
+        self.assertEqual(diffx.files_matching('/file*'), [file2])
+
+    def test_find_files_with_from_path_and_lazy(self):
+        """Testing DiffX.find_files with DiffX.from_path(lazy=True)"""
+        path = self._write_temp_file(self.LAZY_DIFFX_DATA)
+
+        with DiffX.from_path(path, lazy=True) as diffx:
+            file = diffx.changes[0].files[0]
+            self.assertIsInstance(file.meta_section._content,
+                                  DiffXLazyContent)
+
+            self.assertEqual(diffx.find_files('/file1'), [])
+            self.assertEqual(diffx.find_files('file1'), [file])
+
+    def test_files_matching(self):
+        """Testing DiffX.files_matching"""
+        diffx = DiffX()
+        change1 = diffx.add_change()
+        change2 = diffx.add_change()
+
+        file1 = change1.add_file(meta={'path': '/src/main.py'})
+        change1.add_file(meta={'path': '/README'})
+        file3 = change2.add_file(meta={
+            'path': {
+                'old': '/src/utils.py',
+                'new': '/lib/utils.py',
+            },
+        })
+        file4 = change2.add_file(meta={'path': '/src/tests/test_main.py'})
+
+        self.assertEqual(diffx.files_matching('/src/*.py'),
+                         [file1, file3, file4])
+        self.assertEqual(diffx.files_matching('/lib/*'), [file3])
+        self.assertEqual(diffx.files_matching('*.PY'), [])
+        self.assertEqual(diffx.files_matching('/src/[mu]*'), [file1, file3])
+
     def test_meta(self):
         """Testing DiffX.meta"""
         self.run_content_test({'key': 'value'},
@@ -1147,6 +1585,27 @@ class DiffXTests(kgb.SpyAgency, BaseSectionTestCase):
 
         self.assertNotEqual(diffx1, diffx2)
 
+    def _write_temp_file(self, data):
+        """Write data to a temporary file.
+
+        The file will be removed when the test finishes.
+
+        Args:
+            data (bytes):
+                The data to write.
+
+        Returns:
+            unicode:
+            The path to the file.
+        """
+        fd, path = tempfile.mkstemp(suffix='.diffx')
+        self.addCleanup(os.unlink, path)
+
+        with os.fdopen(fd, 'wb') as fp:
+            fp.write(data)
+
+        return path
+
     def _check_result(self, diffx_file, expected_result,
                       line_endings=LineEndings.UNIX):
         """Check the byte content of a DiffX file.
@@ -2017,6 +2476,119 @@ class DiffXMetaSectionTests(BaseSectionTestCase):
         with self.assertRaisesMessage(DiffXUnknownOptionError, message):
             DiffXMetaSection(invalid_option=1)
 
+    def test_init_with_default_options(self):
+        """Testing DiffXMetaSection.__init__ with default options"""
+        section1 = DiffXMetaSection()
+        section2 = DiffXMetaSection()
+
+        self.assertEqual(section1.format, MetaFormat.JSON)
+        self.assertEqual(section1.options, {
+            'format': MetaFormat.JSON,
+        })
+        self.assertIsNot(section1.options, DiffXMetaSection.default_options)
+
+        section1.encoding = 'utf-8'
+        section1.content['key'] = 'value'
+
+        self.assertEqual(section1.options, {
+            'encoding': 'utf-8',
+            'format': MetaFormat.JSON,
+        })
+        self.assertEqual(section2.options, {
+            'format': MetaFormat.JSON,
+        })
+        self.assertEqual(DiffXMetaSection.default_options, {
+            'format': MetaFormat.JSON,
+        })
+        self.assertEqual(section1.content, {'key': 'value'})
+        self.assertEqual(section2.content, {})
+        self.assertEqual(DiffXMetaSection.default_value, {})
+
+    def test_options_with_shared_options(self):
+        """Testing DiffXMetaSection.options with options shared between
+        sections
+        """
+        section1 = DiffXMetaSection(encoding='utf-8')
+        section2 = DiffXMetaSection(encoding='utf-8')
+
+        self.assertIs(section1._options, section2._options)
+
+        with self.assertRaisesMessage(TypeError,
+                                      'Shared options cannot be modified'):
+            section1._options['encoding'] = 'utf-16'
+
+        # Setting options through properties keeps them shared.
+        section1.format = MetaFormat.JSON
+        section2.format = MetaFormat.JSON
+
+        self.assertIs(section1._options, section2._options)
+
+        # Accessing the options gives the section its own copy.
+        options = section1.options
+        options['encoding'] = 'utf-16'
+
+        self.assertIs(section1.options, options)
+        self.assertIsNot(section1._options, section2._options)
+        self.assertEqual(section1.encoding, 'utf-16')
+        self.assertEqual(section2.encoding, 'utf-8')
+
+        # Changes through properties are seen through the section's copy.
+        section1.encoding = 'utf-32'
+        self.assertEqual(options, {
+            'encoding': 'utf-32',
+            'format': MetaFormat.JSON,
+        })
+
+        # Assigning options shares them again.
+        section1.options = {
+            'encoding': 'utf-8',
+            'format': MetaFormat.JSON,
+        }
+
+        self.assertIs(section1._options, section2._options)
+
+    def test_options_with_dict_operations(self):
+        """Testing DiffXMetaSection.options is a dictionary"""
+        section = DiffXMetaSection(encoding='utf-8',
+                                   format=MetaFormat.JSON)
+
+        self.assertIs(type(section.options), dict)
+        self.assertEqual(
+            json.loads(json.dumps(section.options)),
+            {
+                'encoding': 'utf-8',
+                'format': 'json',
+            })
+
+        section.options.update({
+            'custom': True,
+        })
+        del section.options['encoding']
+
+        self.assertEqual(section.options, {
+            'custom': True,
+            'format': 'json',
+        })
+        self.assertIsNone(section.encoding)
+
+        section.options.clear()
+
+        self.assertEqual(section.options, {})
+        self.assertIsNone(section.format)
+
+    def test_options_with_values_of_different_types(self):
+        """Testing DiffXMetaSection.options with equal values of different
+        types
+        """
+        section1 = DiffXMetaSection()
+        section1.options['custom'] = 1
+
+        section2 = DiffXMetaSection()
+        section2.options['custom'] = True
+
+        self.assertIs(type(section1.options['custom']), int)
+        self.assertIs(type(section2.options['custom']), bool)
+
     def test_content(self):
         """Testing DiffXMetaSection.content"""
         self.run_content_test(
@@ -0,0 +1,404 @@
+"""Unit tests for pydiffx.index."""
+
+import io
+import os
+import tempfile
+import threading
+
+import kgb
+
+from pydiffx.errors import DiffXContentError, DiffXIndexError
+from pydiffx.index import DiffXIndex
+from pydiffx.tests.testcases import TestCase
+from pydiffx.writer import DiffXWriter
+
+
+class DiffXIndexTests(kgb.SpyAgency, TestCase):
+    """Unit tests for pydiffx.index.DiffXIndex."""
+
+    def test_from_stream(self):
+        """Testing DiffXIndex.from_stream"""
+        data = self._build_diffx()
+        index = DiffXIndex.from_stream(io.BytesIO(data))
+
+        self.assertEqual(index.offset, 0)
+        self.assertEqual(index.length, len(data))
+        self.assertEqual(index.options, {
+            'encoding': 'utf-8',
+            'version': '1.0',
+        })
+        self.assertEqual(index.preamble.read(), 'All changes.\n')
+        self.assertEqual(index.meta.read(), {'key': 'value'})
+        self.assertEqual(len(index), 3)
+
+        # Each change and file should span its header and all its content,
+        # ending at the next section at the same or a higher level.
+        for change in index:
+            change_end = change.offset + change.length
+
+            self.assertTrue(data[change.offset:].startswith(b'#.change:'))
+            self.assertTrue(change_end == len(data) or
+                            data[change_end:].startswith(b'#.change:'))
+
+            for indexed_file in change.files:
+                file_end = indexed_file.offset + indexed_file.length
+
+                self.assertTrue(
+                    data[indexed_file.offset:].startswith(b'#..file:'))
+                self.assertTrue(file_end == change_end or
+                                data[file_end:].startswith(b'#..file:'))
+
+        self.assertEqual(index.changes[-1].offset + index.changes[-1].length,
+                         len(data))
+
+        change = index.get_change(1)
+        self.assertEqual(change.preamble.read(), 'Change 1.\n')
+        self.assertEqual(change.meta.read(), {'change': 1})
+        self.assertEqual([_file.path for _file in change.files],
+                         ['file0.c', 'file1.c'])
+
+        self.assertEqual(index.read_diff(2, 'file1.c'),
+                         b'--- file1.c\n+++ file1.c\n@@ change 2 @@\n')
+        self.assertEqual(index.get_file(0, 'file0.c').read_meta(), {
+            'path': 'file0.c',
+            'stats': 0,
+        })
+
+    def test_get_file_with_old_and_new_paths(self):
+        """Testing DiffXIndex.get_file with old and new paths"""
+        stream = io.BytesIO()
+        writer = DiffXWriter(stream)
+        writer.new_change()
+        writer.new_file()
+        writer.write_meta({
+            'path': {
+                'old': 'old.c',
+                'new': 'new.c',
+            },
+        })
+        writer.write_diff(b'--- old.c\n+++ new.c\n')
+        writer.new_file()
+        writer.write_meta({
+            'op': 'delete',
+            'path': 'deleted.c',
+        })
+
+        index = DiffXIndex.from_stream(io.BytesIO(stream.getvalue()))
+        change = index.get_change(0)
+        indexed_file = index.get_file(0, 'old.c')
+
+        self.assertIs(index.get_file(0, 'new.c'), indexed_file)
+        self.assertEqual(indexed_file.paths, ['new.c', 'old.c'])
+        self.assertEqual(indexed_file.read_diff(),
+                         b'--- old.c\n+++ new.c\n')
+
+        indexed_file = change.get_file('deleted.c')
+        self.assertIsNone(indexed_file.diff)
+        self.assertIsNone(indexed_file.read_diff())
+
+        with self.assertRaises(KeyError):
+            index.get_file(0, 'missing.c')
+
+        with self.assertRaises(IndexError):
+            index.get_file(1, 'new.c')
+
+    def test_from_path_with_mmap(self):
+        """Testing DiffXIndex.from_path with mmap=True"""
+        path = self._write_temp_file(self._build_diffx())
+
+        with DiffXIndex.from_path(path, mmap=True) as index:
+            diff = index.read_diff(1, 'file0.c')
+
+            self.assertIsInstance(diff, memoryview)
+            self.assertEqual(diff.tobytes(),
+                             b'--- file0.c\n+++ file0.c\n@@ change 1 @@\n')
+            diff.release()
+
+    def test_read_diff_with_unseekable_stream(self):
+        """Testing DiffXIndex.read_diff with a stream that cannot seek"""
+        class UnseekableStream(io.BytesIO):
+            def seekable(self):
+                return False
+
+        index = DiffXIndex.from_stream(UnseekableStream(self._build_diffx()),
+                                       block_size=16)
+
+        with self.assertRaises(DiffXContentError):
+            index.read_diff(0, 'file0.c')
+
+    def test_open_writes_sidecar(self):
+        """Testing DiffXIndex.open writes a sidecar file"""
+        path = self._write_temp_file(self._build_diffx())
+        sidecar_path = '%s.idx' % path
+        self.addCleanup(os.unlink, sidecar_path)
+
+        self.assertFalse(os.path.exists(sidecar_path))
+
+        with DiffXIndex.open(path) as index:
+            self.assertEqual(index.read_diff(2, 'file1.c'),
+                             b'--- file1.c\n+++ file1.c\n@@ change 2 @@\n')
+
+        self.assertTrue(os.path.exists(sidecar_path))
+
+    def test_open_with_sidecar(self):
+        """Testing DiffXIndex.open with an up-to-date sidecar file"""
+        path = self._write_temp_file(self._build_diffx())
+        sidecar_path = '%s.idx' % path
+        self.addCleanup(os.unlink, sidecar_path)
+
+        with DiffXIndex.open(path) as index:
+            expected = self._serialize_index(index)
+
+        self.spy_on(DiffXIndex.from_reader)
+
+        with DiffXIndex.open(path) as index:
+            self.assertEqual(self._serialize_index(index), expected)
+            self.assertEqual(index.get_change(1).preamble.read(),
+                             'Change 1.\n')
+            self.assertEqual(index.read_diff(2, 'file1.c'),
+                             b'--- file1.c\n+++ file1.c\n@@ change 2 @@\n')
+
+        self.assertSpyNotCalled(DiffXIndex.from_reader)
+
+    def test_open_with_stale_sidecar(self):
+        """Testing DiffXIndex.open with a sidecar file that no longer matches
+        the DiffX file
+        """
+        path = self._write_temp_file(self._build_diffx())
+        sidecar_path = '%s.idx' % path
+        self.addCleanup(os.unlink, sidecar_path)
+
+        DiffXIndex.open(path).close()
+
+        # Rewrite the file with different content, and make sure the index
+        # is rebuilt.
+        with open(path, 'wb') as fp:
+            fp.write(self._build_diffx(num_changes=1))
+
+        with self.assertRaisesMessage(DiffXIndexError,
+                                      'The index file is out of date'):
+            DiffXIndex.load(sidecar_path, path)
+
+        self.spy_on(DiffXIndex.from_reader)
+
+        with DiffXIndex.open(path) as index:
+            self.assertEqual(len(index), 1)
+
+        self.assertSpyCallCount(DiffXIndex.from_reader, 1)
+
+        with DiffXIndex.load(sidecar_path, path) as index:
+            self.assertEqual(len(index), 1)
+
+    def test_open_with_corrupt_sidecar(self):
+        """Testing DiffXIndex.open with a corrupt sidecar file"""
+        path = self._write_temp_file(self._build_diffx())
+        sidecar_path = '%s.idx' % path
+        self.addCleanup(os.unlink, sidecar_path)
+
+        DiffXIndex.open(path).close()
+
+        with open(sidecar_path, 'rb') as fp:
+            data = fp.read()
+
+        with open(sidecar_path, 'wb') as fp:
+            fp.write(data[:-1] + b'X')
+
+        with self.assertRaisesMessage(DiffXIndexError,
+                                      'The index file is corrupt'):
+            DiffXIndex.load(sidecar_path, path)
+
+        with DiffXIndex.open(path) as index:
+            self.assertEqual(len(index), 3)
+
+        with DiffXIndex.load(sidecar_path, path) as index:
+            self.assertEqual(len(index), 3)
+
+    def test_open_with_empty_file(self):
+        """Testing DiffXIndex.open with an empty DiffX file"""
+        path = self._write_temp_file(b'')
+        sidecar_path = '%s.idx' % path
+        self.addCleanup(os.unlink, sidecar_path)
+
+        with DiffXIndex.open(path) as index:
+            expected = self._serialize_index(index)
+            self.assertEqual(len(index), 0)
+            self.assertIsNone(index.offset)
+            self.assertIsNone(index.length)
+
+        self.spy_on(DiffXIndex.from_reader)
+
+        with DiffXIndex.open(path) as index:
+            self.assertEqual(self._serialize_index(index), expected)
+
+        self.assertSpyNotCalled(DiffXIndex.from_reader)
+
+    def test_load_with_invalid_file(self):
+        """Testing DiffXIndex.load with a file that isn't a sidecar file"""
+        path = self._write_temp_file(self._build_diffx())
+
+        with self.assertRaisesMessage(DiffXIndexError,
+                                      'The file is not a DiffX index file'):
+            DiffXIndex.load(path, path)
+
+    def test_open_with_save_false(self):
+        """Testing DiffXIndex.open with save=False"""
+        path = self._write_temp_file(self._build_diffx())
+
+        with DiffXIndex.open(path, save=False) as index:
+            self.assertEqual(len(index), 3)
+
+        self.assertFalse(os.path.exists('%s.idx' % path))
+
+    def test_open_with_unwritable_sidecar(self):
+        """Testing DiffXIndex.open with a sidecar file that can't be
+        written
+        """
+        path = self._write_temp_file(self._build_diffx())
+        sidecar_path = os.path.join(tempfile.gettempdir(), 'does-not-exist',
+                                    'file.diffx.idx')
+
+        self.spy_on(DiffXIndex.save)
+
+        with DiffXIndex.open(path, sidecar_path=sidecar_path) as index:
+            self.assertEqual(len(index), 3)
+            self.assertEqual(index.read_diff(2, 'file1.c'),
+                             b'--- file1.c\n+++ file1.c\n@@ change 2 @@\n')
+
+        self.assertSpyRaised(DiffXIndex.save, FileNotFoundError)
+        self.assertFalse(os.path.exists(sidecar_path))
+
+    def test_save_with_threads(self):
+        """Testing DiffXIndex.save from several threads at once"""
+        path = self._write_temp_file(self._build_diffx())
+        sidecar_path = '%s.idx' % path
+        self.addCleanup(os.unlink, sidecar_path)
+
+        with DiffXIndex.open(path, save=False) as index:
+            expected = self._serialize_index(index)
+            errors = []
+            barrier = threading.Barrier(4)
+
+            def _save():
+                barrier.wait()
+
+                try:
+                    for i in range(10):
+                        index.save(sidecar_path, path)
+                except Exception as e:
+                    errors.append(e)
+
+            threads = [
+                threading.Thread(target=_save)
+                for i in range(4)
+            ]
+
+            for thread in threads:
+                thread.start()
+
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(errors, [])
+
+        # No temporary files should be left behind.
+        self.assertFalse([
+            filename
+            for filename in os.listdir(os.path.dirname(sidecar_path))
+            if filename.startswith(os.path.basename(sidecar_path) + '.')
+        ])
+
+        with DiffXIndex.load(sidecar_path, path) as index:
+            self.assertEqual(self._serialize_index(index), expected)
+
+    def _serialize_index(self, index):
+        """Return a comparable representation of an index.
+
+        Args:
+            index (pydiffx.index.DiffXIndex):
+                The index to serialize.
+
+        Returns:
+            list:
+            The serialized index.
+        """
+        def _serialize_handle(handle):
+            if handle is None:
+                return None
+
+            return (handle.section_id, handle.offset, handle.options,
+                    handle.encoding, handle.line)
+
+        return [
+            (index.offset, index.length, index.options,
+             _serialize_handle(index.preamble),
+             _serialize_handle(index.meta)),
+        ] + [
+            (change.offset, change.length, change.options,
+             _serialize_handle(change.preamble),
+             _serialize_handle(change.meta),
+             [
+                 (indexed_file.offset, indexed_file.length,
+                  indexed_file.options, indexed_file.path,
+                  _serialize_handle(indexed_file.meta),
+                  _serialize_handle(indexed_file.diff))
+                 for indexed_file in change.files
+             ])
+            for change in index
+        ]
+
+    def _write_temp_file(self, data):
+        """Write data to a temporary file.
+
+        The file will be removed when the test finishes.
+
+        Args:
+            data (bytes):
+                The data to write.
+
+        Returns:
+            unicode:
+            The path to the file.
+        """
+        fd, path = tempfile.mkstemp(suffix='.diffx')
+        self.addCleanup(os.unlink, path)
+
+        with os.fdopen(fd, 'wb') as fp:
+            fp.write(data)
+
+        return path
+
+    def _build_diffx(self, num_changes=3):
+        """Return a DiffX file with several changes and files.
+
+        Args:
+            num_changes (int, optional):
+                The number of changes to write.
+
+        Returns:
+            bytes:
+            The DiffX file content.
+        """
+        stream = io.BytesIO()
+        writer = DiffXWriter(stream)
+        writer.write_preamble('All changes.')
+        writer.write_meta({'key': 'value'})
+
+        for change_num in range(num_changes):
+            writer.new_change()
+            writer.write_preamble('Change %d.' % change_num)
+            writer.write_meta({'change': change_num})
+
+            for file_num in range(2):
+                path = 'file%d.c' % file_num
+
+                writer.new_file()
+                writer.write_meta({
+                    'path': path,
+                    'stats': change_num,
+                })
+                writer.write_diff(b'--- %s\n+++ %s\n@@ change %d @@\n'
+                                  % (path.encode('ascii'),
+                                     path.encode('ascii'),
+                                     change_num))
+
+        return stream.getvalue()
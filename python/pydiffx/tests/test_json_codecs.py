@@ -0,0 +1,144 @@
+"""Unit tests for pydiffx.json_codecs."""
+
+import unittest
+
+from pydiffx.json_codecs import (OrjsonJSONCodec,
+                                 StdlibJSONCodec,
+                                 get_default_json_codec,
+                                 get_fast_json_codec,
+                                 set_default_json_codec)
+from pydiffx.tests.testcases import TestCase
+
+
+class StdlibJSONCodecTests(TestCase):
+    """Unit tests for pydiffx.json_codecs.StdlibJSONCodec."""
+
+    def test_dumps(self):
+        """Testing StdlibJSONCodec.dumps"""
+        self.assertEqual(
+            StdlibJSONCodec().dumps({
+                'path': '\xe9.txt',
+                'b': [1, 2],
+                'a': None,
+            }),
+            '{\n'
+            '    "a": null,\n'
+            '    "b": [\n'
+            '        1,\n'
+            '        2\n'
+            '    ],\n'
+            '    "path": "\\u00e9.txt"\n'
+            '}')
+
+    def test_dumps_with_compact(self):
+        """Testing StdlibJSONCodec.dumps with compact=True"""
+        self.assertEqual(
+            StdlibJSONCodec(compact=True).dumps({
+                'path': '\xe9.txt',
+                'b': [1, 2],
+                'a': None,
+            }),
+            '{"a":null,"b":[1,2],"path":"\\u00e9.txt"}')
+
+    def test_loads(self):
+        """Testing StdlibJSONCodec.loads"""
+        codec = StdlibJSONCodec()
+
+        self.assertEqual(codec.loads('{"a": [1, 2]}'), {'a': [1, 2]})
+        self.assertEqual(codec.loads(b'{"a": [1, 2]}'), {'a': [1, 2]})
+
+        with self.assertRaises(ValueError):
+            codec.loads('{')
+
+
+@unittest.skipUnless(OrjsonJSONCodec.is_available(),
+                     'orjson is not installed')
+class OrjsonJSONCodecTests(TestCase):
+    """Unit tests for pydiffx.json_codecs.OrjsonJSONCodec."""
+
+    def test_dumps(self):
+        """Testing OrjsonJSONCodec.dumps matches StdlibJSONCodec"""
+        data = {
+            'path': 'file.txt',
+            'b': [1, 2],
+            'a': None,
+        }
+
+        self.assertEqual(OrjsonJSONCodec().dumps(data),
+                         StdlibJSONCodec().dumps(data))
+
+    def test_dumps_with_compact(self):
+        """Testing OrjsonJSONCodec.dumps with compact=True"""
+        data = {
+            'path': 'file.txt',
+            'b': [1, 2],
+            'a': None,
+        }
+
+        self.assertEqual(OrjsonJSONCodec(compact=True).dumps(data),
+                         StdlibJSONCodec(compact=True).dumps(data))
+
+    def test_dumps_with_compact_and_non_ascii(self):
+        """Testing OrjsonJSONCodec.dumps with compact=True and non-ASCII
+        characters
+        """
+        self.assertEqual(
+            OrjsonJSONCodec(compact=True).dumps({'path': '\xe9.txt'}),
+            '{"path":"\\u00e9.txt"}')
+
+    def test_dumps_with_compact_and_unsupported_value(self):
+        """Testing OrjsonJSONCodec.dumps with compact=True and a value
+        orjson won't encode
+        """
+        self.assertEqual(
+            OrjsonJSONCodec(compact=True).dumps({'size': 2 ** 70}),
+            '{"size":%d}' % 2 ** 70)
+
+    def test_loads(self):
+        """Testing OrjsonJSONCodec.loads"""
+        codec = OrjsonJSONCodec()
+
+        self.assertEqual(codec.loads('{"a": [1, 2]}'), {'a': [1, 2]})
+        self.assertEqual(codec.loads(b'{"a": [1, 2]}'), {'a': [1, 2]})
+
+        with self.assertRaises(ValueError):
+            codec.loads('{')
+
+
+class DefaultJSONCodecTests(TestCase):
+    """Unit tests for the default JSON codec functions."""
+
+    def tearDown(self):
+        set_default_json_codec(None)
+
+        super(DefaultJSONCodecTests, self).tearDown()
+
+    def test_get_default_json_codec(self):
+        """Testing get_default_json_codec"""
+        codec = get_default_json_codec()
+
+        self.assertIsInstance(codec, StdlibJSONCodec)
+        self.assertFalse(codec.compact)
+
+    def test_set_default_json_codec(self):
+        """Testing set_default_json_codec"""
+        codec = StdlibJSONCodec(compact=True)
+        set_default_json_codec(codec)
+
+        self.assertIs(get_default_json_codec(), codec)
+
+        set_default_json_codec(None)
+
+        self.assertIsNot(get_default_json_codec(), codec)
+        self.assertFalse(get_default_json_codec().compact)
+
+    def test_get_fast_json_codec(self):
+        """Testing get_fast_json_codec"""
+        codec = get_fast_json_codec(compact=True)
+
+        if OrjsonJSONCodec.is_available():
+            self.assertIsInstance(codec, OrjsonJSONCodec)
+        else:
+            self.assertIsInstance(codec, StdlibJSONCodec)
+
+        self.assertTrue(codec.compact)
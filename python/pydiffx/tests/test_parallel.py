@@ -0,0 +1,161 @@
+"""Unit tests for pydiffx.parallel."""
+
+import gc
+import os
+import tempfile
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+from pydiffx.dom.objects import DiffX
+from pydiffx.errors import DiffXParseError
+from pydiffx.parallel import parse_parallel
+from pydiffx.tests.testcases import TestCase
+
+
+class ParseParallelTests(TestCase):
+    """Unit tests for pydiffx.parallel.parse_parallel."""
+
+    def test_parse_parallel(self):
+        """Testing parse_parallel"""
+        data = self._build_diffx()
+        path = self._write_temp_file(data)
+
+        diffx = parse_parallel(path, workers=2)
+
+        self.assertEqual(diffx, DiffX.from_bytes(data))
+        self.assertEqual(diffx.to_bytes(), data)
+        self.assertEqual(len(diffx.changes), 10)
+        self.assertEqual(diffx.changes[3].preamble, 'Change 3 \xe9.\n')
+        self.assertEqual(diffx.changes[3].files[1].meta,
+                         {'path': 'file1.c'})
+
+    def test_parse_parallel_with_generate_stats(self):
+        """Testing parse_parallel with generate_stats=True"""
+        data = self._build_diffx()
+        path = self._write_temp_file(data)
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            diffx = parse_parallel(path,
+                                   workers=2,
+                                   generate_stats=True,
+                                   executor=executor)
+
+        expected = DiffX.from_bytes(data)
+        expected.generate_stats()
+
+        self.assertEqual(diffx, expected)
+        self.assertEqual(
+            diffx.meta['stats'],
+            {
+                'changes': 10,
+                'deletions': 20,
+                'files': 20,
+                'insertions': 20,
+                'lines changed': 40,
+            })
+
+    def test_parse_parallel_with_one_worker(self):
+        """Testing parse_parallel with workers=1"""
+        data = self._build_diffx()
+        path = self._write_temp_file(data)
+
+        self.assertEqual(parse_parallel(path, workers=1),
+                         DiffX.from_bytes(data))
+
+    def test_parse_parallel_with_no_changes(self):
+        """Testing parse_parallel with no changes"""
+        data = b'#diffx: encoding=utf-8, version=1.0\n'
+        path = self._write_temp_file(data)
+
+        self.assertEqual(parse_parallel(path, workers=2),
+                         DiffX.from_bytes(data))
+
+    def test_parse_parallel_with_parse_error(self):
+        """Testing parse_parallel with an error in a change"""
+        data = self._build_diffx().replace(b'Change 8 \xc3\xa9.',
+                                           b'Change 88 \xc3\xa9.')
+        path = self._write_temp_file(data)
+
+        with self.assertRaises(DiffXParseError) as ctx:
+            DiffX.from_bytes(data)
+
+        expected_message = str(ctx.exception)
+        self.assertIn('line', expected_message)
+
+        with warnings.catch_warnings(record=True) as caught_warnings:
+            warnings.simplefilter('always', ResourceWarning)
+
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                with self.assertRaisesMessage(DiffXParseError,
+                                              expected_message):
+                    parse_parallel(path, workers=2, executor=executor)
+
+            # The file must have been closed when falling back to parsing
+            # serially.
+            gc.collect()
+
+        self.assertEqual(
+            [
+                _warning
+                for _warning in caught_warnings
+                if issubclass(_warning.category, ResourceWarning)
+            ],
+            [])
+
+    def _build_diffx(self):
+        """Return a DiffX file with several changes and files.
+
+        Returns:
+            bytes:
+            The DiffX file.
+        """
+        diffx = DiffX()
+        diffx.preamble = 'All changes.\n'
+        diffx.meta = {'key': 'value'}
+
+        for change_num in range(10):
+            if change_num % 3 == 0:
+                change = diffx.add_change(encoding='latin1')
+            else:
+                change = diffx.add_change()
+
+            change.preamble = 'Change %d \xe9.\n' % change_num
+            change.meta = {'id': change_num}
+
+            for file_num in range(2):
+                filename = 'file%d.c' % file_num
+                file_section = change.add_file()
+                file_section.meta = {'path': filename}
+                file_section.diff = (
+                    b'--- %(name)s\n'
+                    b'+++ %(name)s\n'
+                    b'@@ -1 +1 @@\n'
+                    b'-old line %(num)d\n'
+                    b'+new line %(num)d\n'
+                    % {
+                        b'name': filename.encode('ascii'),
+                        b'num': change_num,
+                    })
+
+        return diffx.to_bytes()
+
+    def _write_temp_file(self, data):
+        """Write data to a temporary file.
+
+        The file will be removed when the test finishes.
+
+        Args:
+            data (bytes):
+                The data to write.
+
+        Returns:
+            unicode:
+            The path to the file.
+        """
+        fd, path = tempfile.mkstemp(suffix='.diffx')
+        self.addCleanup(os.unlink, path)
+
+        with os.fdopen(fd, 'wb') as fp:
+            fp.write(data)
+
+        return path
@@ -0,0 +1,207 @@
+"""Unit tests for pydiffx.parser."""
+
+import io
+
+from pydiffx.errors import DiffXParseError
+from pydiffx.parser import DiffXParser
+from pydiffx.reader import DiffXReader, DiffXSectionInfo
+from pydiffx.sections import Section
+from pydiffx.tests.testcases import TestCase
+
+
+class DiffXParserTests(TestCase):
+    """Unit tests for pydiffx.parser.DiffXParser."""
+
+    DIFFX_DATA = (
+        b'#diffx: encoding=utf-8, version=1.0\n'
+        b'#.preamble: indent=2, length=35\n'
+        b'  Summary of the main preamble.\n'
+        b'  \n'
+        b'#.meta: format=json, length=23\n'
+        b'{\n'
+        b'    "key": "value"\n'
+        b'}\n'
+        b'#.change:\n'
+        b'#..preamble: indent=4, length=23\n'
+        b'    Summary of change.\n'
+        b'#..file:\n'
+        b'#...meta: format=json, length=27\n'
+        b'{\n'
+        b'    "path": "file.txt"\n'
+        b'}\n'
+        b'#...diff: length=58\n'
+        b'--- file.txt\n'
+        b'+++ file.txt\n'
+        b'@@ -1 +1 @@\n'
+        b'-old line\n'
+        b'+new line\n'
+        b'\n'
+        b'#.change: encoding=utf-16\n'
+        b'#..file:\n'
+        b'#...meta: format=json, length=56\n'
+        + '{\n    "path": "file2.txt"\n}\n'.encode('utf-16-le') +
+        b'#...diff: length=13\n'
+        b'Binary file\n'
+        b'\n'
+    )
+
+    def test_feed_all(self):
+        """Testing DiffXParser.feed with all data at once"""
+        parser = DiffXParser()
+        sections = parser.feed(self.DIFFX_DATA)
+        sections += parser.close()
+
+        self.assertEqual(sections,
+                         list(DiffXReader(io.BytesIO(self.DIFFX_DATA))))
+
+    def test_feed_with_section_records(self):
+        """Testing DiffXParser.feed with section_records=True"""
+        parser = DiffXParser(section_records=True)
+        sections = parser.feed(self.DIFFX_DATA)
+        sections += parser.close()
+
+        self.assertIsInstance(sections[0], DiffXSectionInfo)
+        self.assertEqual(sections,
+                         list(DiffXReader(io.BytesIO(self.DIFFX_DATA))))
+
+    def test_feed_byte_by_byte(self):
+        """Testing DiffXParser.feed with one byte at a time"""
+        parser = DiffXParser()
+        sections = []
+
+        for i in range(len(self.DIFFX_DATA)):
+            sections += parser.feed(self.DIFFX_DATA[i:i + 1])
+
+        # The last diff can't be returned until the content is complete.
+        self.assertEqual(sections[-1]['section'], Section.FILE_DIFF)
+        self.assertEqual(parser.close(), [])
+
+        self.assertEqual(sections,
+                         list(DiffXReader(io.BytesIO(self.DIFFX_DATA))))
+
+    def test_feed_returns_sections_when_ready(self):
+        """Testing DiffXParser.feed returns sections once enough data has
+        arrived
+        """
+        parser = DiffXParser()
+
+        self.assertEqual(parser.feed(b'#diffx: version='), [])
+        self.assertEqual(
+            parser.feed(b'1.0\n#.preamble: length=6\nTest'),
+            [
+                {
+                    'level': 0,
+                    'line': 0,
+                    'options': {
+                        'version': '1.0',
+                    },
+                    'section': Section.MAIN,
+                    'type': 'diffx',
+                },
+            ])
+        self.assertEqual(
+            parser.feed(b'.\n'),
+            [
+                {
+                    'level': 1,
+                    'line': 1,
+                    'options': {
+                        'length': 6,
+                    },
+                    'section': Section.MAIN_PREAMBLE,
+                    'text': b'Test.\n',
+                    'type': 'preamble',
+                },
+            ])
+        self.assertEqual(parser.close(), [])
+
+    def test_feed_with_file_filter(self):
+        """Testing DiffXParser.feed with file_filter"""
+        parser = DiffXParser(
+            file_filter=lambda metadata: metadata['path'] == 'file2.txt')
+        sections = []
+
+        for i in range(0, len(self.DIFFX_DATA), 7):
+            sections += parser.feed(self.DIFFX_DATA[i:i + 7])
+
+        sections += parser.close()
+
+        self.assertEqual(
+            [
+                (_section['section'], _section['line'])
+                for _section in sections
+            ],
+            [
+                (Section.MAIN, 0),
+                (Section.MAIN_PREAMBLE, 1),
+                (Section.MAIN_META, 4),
+                (Section.CHANGE, 8),
+                (Section.CHANGE_PREAMBLE, 9),
+                (Section.CHANGE, None),
+                (Section.FILE, None),
+                (Section.FILE_META, None),
+                (Section.FILE_DIFF, None),
+            ])
+        self.assertEqual(sections[7]['metadata'], {'path': 'file2.txt'})
+        self.assertEqual(sections[8]['diff'], b'Binary file\n\n')
+
+    def test_feed_with_parse_error(self):
+        """Testing DiffXParser.feed with an invalid header"""
+        parser = DiffXParser()
+        parser.feed(b'#diffx: version=1.0\n')
+
+        message = (
+            'Error on line 2: Unknown or unexpected section ID ".file". '
+            'Expected one of: ".change", ".meta", ".preamble"'
+        )
+
+        with self.assertRaisesMessage(DiffXParseError, message):
+            parser.feed(b'#.file:\n')
+
+    def test_feed_after_close(self):
+        """Testing DiffXParser.feed after DiffXParser.close"""
+        parser = DiffXParser()
+        parser.close()
+
+        with self.assertRaisesMessage(ValueError,
+                                      'Data cannot be fed to a closed '
+                                      'parser'):
+            parser.feed(b'#diffx: version=1.0\n')
+
+    def test_close_with_incomplete_content(self):
+        """Testing DiffXParser.close with incomplete content"""
+        parser = DiffXParser()
+        parser.feed(
+            b'#diffx: version=1.0\n'
+            b'#.preamble: length=20\n'
+            b'Test.\n'
+            b'No newline')
+
+        message = 'Error on line 3: Expected a newline after content'
+
+        with self.assertRaisesMessage(DiffXParseError, message):
+            parser.close()
+
+    def test_close_with_incomplete_filtered_content(self):
+        """Testing DiffXParser.close with incomplete content in a file that
+        was filtered out
+        """
+        parser = DiffXParser(file_filter=lambda metadata: False)
+        sections = parser.feed(
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.change:\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=3\n'
+            b'{}\n'
+            b'#...diff: length=100\n'
+            b'--- file.txt\n')
+
+        self.assertEqual(len(sections), 2)
+
+        message = (
+            'Error on line 6: Unexpected end of file. Expected 100 bytes of '
+            'content, but found 13'
+        )
+
+        with self.assertRaisesMessage(DiffXParseError, message):
+            parser.close()
@@ -1,14 +1,38 @@
 """Unit tests for pydiffx.reader."""
 
 import io
+import os
+import tempfile
+from types import MappingProxyType
 
-from pydiffx.errors import DiffXParseError
-from pydiffx.reader import DiffXReader
+import kgb
+
+from pydiffx.errors import DiffXContentError, DiffXParseError
+from pydiffx.json_codecs import StdlibJSONCodec
+from pydiffx.reader import DiffXLazyMetadata, DiffXReader, DiffXSectionInfo
 from pydiffx.sections import Section
 from pydiffx.tests.testcases import TestCase
 
 
-class DiffXReaderTests(TestCase):
+class UnseekableStream(io.RawIOBase):
+    """A read-only stream that cannot seek, like a pipe or socket."""
+
+    def __init__(self, data):
+        super(UnseekableStream, self).__init__()
+
+        self._stream = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        data = self._stream.read(len(b))
+        b[:len(data)] = data
+
+        return len(data)
+
+
+class DiffXReaderTests(kgb.SpyAgency, TestCase):
     """Unit tests for pydiffx.reader.DiffXReader."""
 
     def test_with_simple_diff(self):
@@ -1113,6 +1137,26 @@ class DiffXReaderTests(TestCase):
             },
         ])
 
+    def test_with_encoding_after_file_section(self):
+        """Testing DiffXReader with a change section following a file section
+        in a change with a different encoding
+        """
+        reader = DiffXReader(io.BytesIO(
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.change: encoding=latin1\n'
+            b'#..file:\n'
+            b'#...meta: length=14\n'
+            b'{"path": "\xe9"}\n'
+            b'#.change:\n'
+            b'#..preamble: length=3\n'
+            b'\xc3\xa9\n'
+        ))
+
+        sections = list(reader)
+
+        self.assertEqual(sections[3]['metadata'], {'path': '\xe9'})
+        self.assertEqual(sections[5]['text'], '\xe9\n')
+
     def test_with_header_long_line(self):
         """Testing DiffXReader with header with a very long length"""
         reader = DiffXReader(io.BytesIO(
@@ -1283,6 +1327,57 @@ class DiffXReaderTests(TestCase):
         with self.assertRaisesMessage(DiffXParseError, message):
             list(reader)
 
+    def test_with_header_option_values(self):
+        """Testing DiffXReader with header option values parsed without
+        full validation
+        """
+        reader = DiffXReader(io.BytesIO(
+            b'#diffx: a=1, b=-5, c=1_0, d=1.0, e=-, f=utf-8, g=01, h=_1, '
+            b'version=1.0\n'
+        ))
+        sections = list(reader)
+
+        self.assertEqual(
+            sections[0]['options'],
+            {
+                'a': 1,
+                'b': -5,
+                'c': 10,
+                'd': '1.0',
+                'e': '-',
+                'f': 'utf-8',
+                'g': 1,
+                'h': '_1',
+                'version': '1.0',
+            })
+        self.assertEqual(list(sections[0]['options']),
+                         ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'version'])
+
+        # These should match the result of fully validating the options.
+        self.assertEqual(
+            sections[0]['options'],
+            reader._parse_header_options(
+                header=b'',
+                options_str=(b'a=1, b=-5, c=1_0, d=1.0, e=-, f=utf-8, '
+                             b'g=01, h=_1, version=1.0'),
+                linenum=0))
+
+    def test_with_header_option_key_trailing_chars(self):
+        """Testing DiffXReader with header option key containing characters
+        after a valid prefix
+        """
+        reader = DiffXReader(io.BytesIO(
+            b'#diffx: encoding=utf-8, ke$y=value, version=1.0\n'
+        ))
+
+        self.assertEqual(
+            list(reader)[0]['options'],
+            {
+                'encoding': 'utf-8',
+                'ke$y': 'value',
+                'version': '1.0',
+            })
+
     def test_with_content_missing_length_option(self):
         """Testing DiffXReader with content section missing length= option
         """
@@ -1382,3 +1477,1256 @@ class DiffXReaderTests(TestCase):
 
         with self.assertRaisesMessage(DiffXParseError, message):
             list(reader)
+
+    def test_with_small_block_size(self):
+        """Testing DiffXReader with a block size smaller than headers and
+        content
+        """
+        data = (
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.change:\n'
+            b'#..preamble: indent=4, length=23\n'
+            b'    Summary of change.\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=27\n'
+            b'{\n'
+            b'    "path": "file.txt"\n'
+            b'}\n'
+            b'#...diff: length=58\n'
+            b'--- file.txt\n'
+            b'+++ file.txt\n'
+            b'@@ -1 +1 @@\n'
+            b'-old line\n'
+            b'+new line\n'
+        )
+
+        expected_sections = list(DiffXReader(io.BytesIO(data)))
+
+        for block_size in (1, 2, 7, 64):
+            reader = DiffXReader(io.BytesIO(data),
+                                 block_size=block_size)
+            self.assertEqual(list(reader), expected_sections)
+
+        self.assertEqual(expected_sections[-1]['diff'],
+                         b'--- file.txt\n'
+                         b'+++ file.txt\n'
+                         b'@@ -1 +1 @@\n'
+                         b'-old line\n'
+                         b'+new line\n')
+
+    def test_with_unseekable_stream(self):
+        """Testing DiffXReader with a stream that cannot seek"""
+        reader = DiffXReader(UnseekableStream(
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.change:\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=27\n'
+            b'{\n'
+            b'    "path": "file.txt"\n'
+            b'}\n'
+            b'#...diff: length=58\n'
+            b'--- file.txt\n'
+            b'+++ file.txt\n'
+            b'@@ -1 +1 @@\n'
+            b'-old line\n'
+            b'+new line\n'
+        ))
+
+        self.assertEqual(list(reader), [
+            {
+                'level': 0,
+                'line': 0,
+                'options': {
+                    'encoding': 'utf-8',
+                    'version': '1.0',
+                },
+                'section': Section.MAIN,
+                'type': 'diffx',
+            },
+            {
+                'level': 1,
+                'line': 1,
+                'options': {},
+                'section': Section.CHANGE,
+                'type': 'change',
+            },
+            {
+                'level': 2,
+                'line': 2,
+                'options': {},
+                'section': Section.FILE,
+                'type': 'file',
+            },
+            {
+                'level': 3,
+                'line': 3,
+                'metadata': {
+                    'path': 'file.txt',
+                },
+                'options': {
+                    'format': 'json',
+                    'length': 27,
+                },
+                'section': Section.FILE_META,
+                'type': 'meta',
+            },
+            {
+                'level': 3,
+                'line': 7,
+                'options': {
+                    'length': 58,
+                },
+                'section': Section.FILE_DIFF,
+                'diff': (
+                    b'--- file.txt\n'
+                    b'+++ file.txt\n'
+                    b'@@ -1 +1 @@\n'
+                    b'-old line\n'
+                    b'+new line\n'
+                ),
+                'type': 'diff',
+            },
+        ])
+
+    def test_with_invalid_block_size(self):
+        """Testing DiffXReader with an invalid block size"""
+        with self.assertRaisesMessage(ValueError,
+                                      'block_size must be a positive integer'):
+            DiffXReader(io.BytesIO(), block_size=0)
+
+    def test_from_path(self):
+        """Testing DiffXReader.from_path"""
+        path = self._write_temp_file(
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.change:\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=27\n'
+            b'{\n'
+            b'    "path": "file.txt"\n'
+            b'}\n'
+            b'#...diff: length=58\n'
+            b'--- file.txt\n'
+            b'+++ file.txt\n'
+            b'@@ -1 +1 @@\n'
+            b'-old line\n'
+            b'+new line\n'
+        )
+
+        with DiffXReader.from_path(path) as reader:
+            sections = list(reader)
+
+        self.assertEqual(len(sections), 5)
+        self.assertIsInstance(sections[-1]['diff'], bytes)
+        self.assertEqual(sections[-1]['diff'],
+                         b'--- file.txt\n'
+                         b'+++ file.txt\n'
+                         b'@@ -1 +1 @@\n'
+                         b'-old line\n'
+                         b'+new line\n')
+        self.assertTrue(reader._fp.closed)
+
+    def test_from_path_with_mmap(self):
+        """Testing DiffXReader.from_path with mmap=True"""
+        data = (
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.change:\n'
+            b'#..preamble: indent=4, length=23\n'
+            b'    Summary of change.\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=27\n'
+            b'{\n'
+            b'    "path": "file.txt"\n'
+            b'}\n'
+            b'#...diff: length=63, line_endings=dos\n'
+            b'--- file.txt\r\n'
+            b'+++ file.txt\r\n'
+            b'@@ -1 +1 @@\r\n'
+            b'-old line\r\n'
+            b'+new line\r\n'
+        )
+        path = self._write_temp_file(data)
+
+        with DiffXReader.from_path(path, mmap=True) as reader:
+            sections = list(reader)
+
+        # Aside from the diff content type, the results should be identical
+        # to reading the file normally.
+        expected_sections = list(DiffXReader(io.BytesIO(data)))
+        diff = sections[-1]['diff']
+
+        self.assertIsInstance(diff, memoryview)
+        self.assertEqual(diff.tobytes(), expected_sections[-1]['diff'])
+        self.assertEqual(sections[-1]['line'], expected_sections[-1]['line'])
+        self.assertEqual(sections[:-1], expected_sections[:-1])
+
+        diff.release()
+
+    def test_from_path_with_mmap_and_empty_file(self):
+        """Testing DiffXReader.from_path with mmap=True and an empty file"""
+        path = self._write_temp_file(b'')
+
+        with DiffXReader.from_path(path, mmap=True) as reader:
+            self.assertEqual(list(reader), [])
+
+    def test_from_path_with_mmap_and_missing_newline(self):
+        """Testing DiffXReader.from_path with mmap=True and diff content
+        missing a trailing newline
+        """
+        path = self._write_temp_file(
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.change:\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=3\n'
+            b'{}\n'
+            b'#...diff: length=3\n'
+            b'abc'
+        )
+
+        message = 'Error on line 7: Expected a newline after content'
+
+        with DiffXReader.from_path(path, mmap=True) as reader:
+            with self.assertRaisesMessage(DiffXParseError, message):
+                list(reader)
+
+    def test_iter_sections_with_lazy_content(self):
+        """Testing DiffXReader.iter_sections with lazy_content=True"""
+        data = (
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.change:\n'
+            b'#..preamble: indent=4, length=23\n'
+            b'    Summary of change.\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=27\n'
+            b'{\n'
+            b'    "path": "file.txt"\n'
+            b'}\n'
+            b'#...diff: length=58\n'
+            b'--- file.txt\n'
+            b'+++ file.txt\n'
+            b'@@ -1 +1 @@\n'
+            b'-old line\n'
+            b'+new line\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=28\n'
+            b'{\n'
+            b'    "path": "file2.txt"\n'
+            b'}\n'
+        )
+        reader = DiffXReader(UnseekableStream(data), block_size=16)
+        sections = []
+
+        for section in reader.iter_sections(lazy_content=True):
+            self.assertNotIn('text', section)
+            self.assertNotIn('metadata', section)
+            self.assertNotIn('diff', section)
+
+            handle = section.get('handle')
+
+            if handle is not None:
+                self.assertEqual(
+                    data[handle.offset:handle.offset + handle.length][-1:],
+                    b'\n')
+
+                if section['section'] == Section.FILE_META:
+                    section['metadata'] = handle.read()
+
+            sections.append(section)
+
+        self.assertEqual(
+            [
+                (_section['section'], _section['line'])
+                for _section in sections
+            ],
+            [
+                (Section.MAIN, 0),
+                (Section.CHANGE, 1),
+                (Section.CHANGE_PREAMBLE, 2),
+                (Section.FILE, None),
+                (Section.FILE_META, None),
+                (Section.FILE_DIFF, None),
+                (Section.FILE, None),
+                (Section.FILE_META, None),
+            ])
+        self.assertEqual(sections[4]['metadata'], {'path': 'file.txt'})
+        self.assertEqual(sections[7]['metadata'], {'path': 'file2.txt'})
+
+        handle = sections[5]['handle']
+        self.assertEqual(handle.section_id, Section.FILE_DIFF)
+        self.assertEqual(handle.offset, 191)
+        self.assertEqual(handle.length, 58)
+        self.assertIsNone(handle.encoding)
+        self.assertIsNone(handle.line_endings)
+
+        # The stream can't seek, and the content is no longer in the
+        # read-ahead buffer, so it can't be read.
+        message = (
+            'The content at offset 191 is no longer available, as the '
+            'stream does not support seeking'
+        )
+
+        with self.assertRaisesMessage(DiffXContentError, message):
+            handle.read()
+
+    def test_iter_sections_with_lazy_content_sections(self):
+        """Testing DiffXReader.iter_sections with lazy_content set to
+        specific sections and reading handles later from a seekable stream
+        """
+        reader = DiffXReader(io.BytesIO(
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.change:\n'
+            b'#..preamble: indent=4, length=23\n'
+            b'    Summary of change.\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=27\n'
+            b'{\n'
+            b'    "path": "file.txt"\n'
+            b'}\n'
+            b'#...diff: length=58\n'
+            b'--- file.txt\n'
+            b'+++ file.txt\n'
+            b'@@ -1 +1 @@\n'
+            b'-old line\n'
+            b'+new line\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=28\n'
+            b'{\n'
+            b'    "path": "file2.txt"\n'
+            b'}\n'
+            b'#...diff: length=13\n'
+            b'Binary file\n'
+            b'\n'
+        ), block_size=16)
+
+        sections = list(reader.iter_sections(
+            lazy_content={Section.CHANGE_PREAMBLE, Section.FILE_DIFF}))
+
+        self.assertEqual(len(sections), 9)
+        self.assertEqual(sections[4]['metadata'], {'path': 'file.txt'})
+        self.assertEqual(sections[7]['metadata'], {'path': 'file2.txt'})
+
+        # Line numbers aren't tracked after skipped content.
+        self.assertIsNone(sections[4]['line'])
+
+        self.assertEqual(sections[2]['handle'].read(),
+                         'Summary of change.\n')
+        self.assertEqual(sections[8]['handle'].read(),
+                         b'Binary file\n\n')
+        self.assertEqual(sections[5]['handle'].read(),
+                         b'--- file.txt\n'
+                         b'+++ file.txt\n'
+                         b'@@ -1 +1 @@\n'
+                         b'-old line\n'
+                         b'+new line\n')
+
+    def test_iter_sections_with_lazy_content_read_in_order(self):
+        """Testing DiffXReader.iter_sections with lazy_content=True and
+        reading each handle before advancing
+        """
+        data = (
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.change:\n'
+            b'#..preamble: indent=4, length=23\n'
+            b'    Summary of change.\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=27\n'
+            b'{\n'
+            b'    "path": "file.txt"\n'
+            b'}\n'
+            b'#...diff: length=58\n'
+            b'--- file.txt\n'
+            b'+++ file.txt\n'
+            b'@@ -1 +1 @@\n'
+            b'-old line\n'
+            b'+new line\n'
+        )
+        sections = []
+
+        for section in DiffXReader(UnseekableStream(data)).iter_sections(
+            lazy_content=True):
+            handle = section.pop('handle', None)
+
+            if handle is not None:
+                key = {
+                    Section.CHANGE_PREAMBLE: 'text',
+                    Section.FILE_META: 'metadata',
+                    Section.FILE_DIFF: 'diff',
+                }[section['section']]
+                section[key] = handle.read()
+
+            sections.append(section)
+
+        # Line numbers are still tracked, since all content was read.
+        self.assertEqual(sections, list(DiffXReader(io.BytesIO(data))))
+
+    def test_iter_sections_with_lazy_content_parse_error(self):
+        """Testing DiffXReader.iter_sections with lazy_content=True and
+        reading invalid content
+        """
+        reader = DiffXReader(io.BytesIO(
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.change:\n'
+            b'#..file:\n'
+            b'#...meta: length=2\n'
+            b'"\n'
+        ))
+
+        sections = list(reader.iter_sections(lazy_content=True))
+
+        message = (
+            'Error on line 4: JSON metadata could not be parsed: '
+            'Invalid control character at: line 1 column 2 (char 1)'
+        )
+
+        with self.assertRaisesMessage(DiffXParseError, message):
+            sections[-1]['handle'].read()
+
+
+    def test_iter_sections_with_lazy_content_truncated(self):
+        """Testing DiffXReader.iter_sections with lazy_content=True and
+        unread content past the end of the file
+        """
+        data = (
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.change:\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=3\n'
+            b'{}\n'
+            b'#...diff: length=100\n'
+            b'--- file.txt\n'
+        )
+        message = (
+            'Error: Unexpected end of file. Expected 100 bytes of content, '
+            'but found 13'
+        )
+
+        for stream in (io.BytesIO(data), UnseekableStream(data)):
+            reader = DiffXReader(stream)
+
+            with self.assertRaisesMessage(DiffXParseError, message):
+                list(reader.iter_sections(lazy_content=True))
+
+    def test_from_path_with_mmap_and_lazy_content(self):
+        """Testing DiffXReader.from_path with mmap=True and lazy_content"""
+        path = self._write_temp_file(
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.change:\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=27\n'
+            b'{\n'
+            b'    "path": "file.txt"\n'
+            b'}\n'
+            b'#...diff: length=58\n'
+            b'--- file.txt\n'
+            b'+++ file.txt\n'
+            b'@@ -1 +1 @@\n'
+            b'-old line\n'
+            b'+new line\n'
+        )
+
+        with DiffXReader.from_path(path, mmap=True) as reader:
+            sections = list(reader.iter_sections(lazy_content=True))
+
+            self.assertEqual(sections[3]['handle'].read(),
+                             {'path': 'file.txt'})
+
+            diff = sections[4]['handle'].read()
+            self.assertIsInstance(diff, memoryview)
+            self.assertEqual(diff.tobytes(),
+                             b'--- file.txt\n'
+                             b'+++ file.txt\n'
+                             b'@@ -1 +1 @@\n'
+                             b'-old line\n'
+                             b'+new line\n')
+            diff.release()
+
+    def test_iter_chunks(self):
+        """Testing DiffXContentHandle.iter_chunks"""
+        data = (
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.change:\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=27\n'
+            b'{\n'
+            b'    "path": "file.txt"\n'
+            b'}\n'
+            b'#...diff: length=39\n'
+            b'--- a\r\n'
+            b'+++ a\r\n'
+            b'@@ -1 +1 @@\r\n'
+            b'-old\r\n'
+            b'+new\r\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=27\n'
+            b'{\n'
+            b'    "path": "file.txt"\n'
+            b'}\n'
+        )
+        reader = DiffXReader(UnseekableStream(data), block_size=16)
+        sections = []
+
+        for section in reader.iter_sections(lazy_content={Section.FILE_DIFF}):
+            handle = section.pop('handle', None)
+
+            if handle is not None:
+                # This chunk size splits the first "\r\n" across chunks.
+                chunks = list(handle.iter_chunks(chunk_size=6))
+
+                self.assertEqual(
+                    chunks,
+                    [
+                        b'--- a\r',
+                        b'\n+++ a',
+                        b'\r\n@@ -',
+                        b'1 +1 @',
+                        b'@\r\n-ol',
+                        b'd\r\n+ne',
+                        b'w\r\n',
+                    ])
+                section['diff'] = b''.join(chunks)
+
+            sections.append(section)
+
+        # Line numbers are still tracked, since all content was read.
+        self.assertEqual(sections, list(DiffXReader(io.BytesIO(data))))
+
+    def test_iter_chunks_with_early_stop(self):
+        """Testing DiffXContentHandle.iter_chunks with iteration stopped
+        before the end of the content
+        """
+        reader = DiffXReader(UnseekableStream(
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.change:\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=27\n'
+            b'{\n'
+            b'    "path": "file.txt"\n'
+            b'}\n'
+            b'#...diff: length=39\n'
+            b'--- a\r\n'
+            b'+++ a\r\n'
+            b'@@ -1 +1 @@\r\n'
+            b'-old\r\n'
+            b'+new\r\n'
+            b'#..file:\n'
+        ))
+        sections = []
+
+        for section in reader.iter_sections(
+            lazy_content={Section.FILE_DIFF}):
+            if section['section'] == Section.FILE_DIFF:
+                handle = section['handle']
+                self.assertEqual(next(handle.iter_chunks(chunk_size=10)),
+                                 b'--- a\r\n+++')
+
+            sections.append(section)
+
+        self.assertEqual(
+            [
+                (_section['section'], _section['line'])
+                for _section in sections
+            ],
+            [
+                (Section.MAIN, 0),
+                (Section.CHANGE, 1),
+                (Section.FILE, 2),
+                (Section.FILE_META, 3),
+                (Section.FILE_DIFF, 7),
+                (Section.FILE, None),
+            ])
+
+    def test_iter_chunks_after_next_section(self):
+        """Testing DiffXContentHandle.iter_chunks after reading the next
+        section from a seekable stream
+        """
+        reader = DiffXReader(io.BytesIO(
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.change:\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=27\n'
+            b'{\n'
+            b'    "path": "file.txt"\n'
+            b'}\n'
+            b'#...diff: length=13\n'
+            b'Binary file\n'
+            b'\n'
+            b'#..file:\n'
+        ), block_size=16)
+
+        sections = list(reader.iter_sections(lazy_content=True))
+
+        self.assertEqual(
+            list(sections[4]['handle'].iter_chunks(chunk_size=8)),
+            [
+                b'Binary f',
+                b'ile\n\n',
+            ])
+
+    def test_iter_chunks_with_missing_newline(self):
+        """Testing DiffXContentHandle.iter_chunks with content missing a
+        trailing newline
+        """
+        reader = DiffXReader(io.BytesIO(
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.change:\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=27\n'
+            b'{\n'
+            b'    "path": "file.txt"\n'
+            b'}\n'
+            b'#...diff: length=11, line_endings=dos\n'
+            b'--- a\r\n'
+            b'+++\n'
+        ))
+        sections = list(reader.iter_sections(
+            lazy_content={Section.FILE_DIFF}))
+        chunks = sections[4]['handle'].iter_chunks(chunk_size=4)
+
+        # The error is only raised after the last chunk.
+        self.assertEqual(next(chunks), b'--- ')
+        self.assertEqual(next(chunks), b'a\r\n+')
+        self.assertEqual(next(chunks), b'++\n')
+
+        message = 'Error on line 9: Expected a newline after content'
+
+        with self.assertRaisesMessage(DiffXParseError, message):
+            next(chunks)
+
+    def test_iter_chunks_with_non_diff(self):
+        """Testing DiffXContentHandle.iter_chunks with a non-diff section"""
+        reader = DiffXReader(io.BytesIO(
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.preamble: length=6\n'
+            b'Test.\n'
+        ))
+        handle = list(reader.iter_sections(lazy_content=True))[1]['handle']
+
+        message = 'Only diff content can be read in chunks, not ".preamble"'
+
+        with self.assertRaisesMessage(DiffXContentError, message):
+            handle.iter_chunks()
+
+    def test_from_path_with_mmap_and_iter_chunks(self):
+        """Testing DiffXReader.from_path with mmap=True and
+        DiffXContentHandle.iter_chunks
+        """
+        path = self._write_temp_file(
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.change:\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=27\n'
+            b'{\n'
+            b'    "path": "file.txt"\n'
+            b'}\n'
+            b'#...diff: length=13\n'
+            b'Binary file\n'
+            b'\n'
+        )
+
+        with DiffXReader.from_path(path, mmap=True) as reader:
+            for section in reader.iter_sections(lazy_content=True):
+                if section['section'] == Section.FILE_DIFF:
+                    chunks = list(section['handle'].iter_chunks(
+                        chunk_size=8))
+
+                    self.assertEqual(len(chunks), 2)
+                    self.assertIsInstance(chunks[0], memoryview)
+                    self.assertEqual(
+                        b''.join(_chunk.tobytes() for _chunk in chunks),
+                        b'Binary file\n\n')
+
+                    for chunk in chunks:
+                        chunk.release()
+
+    def test_iter_sections_with_file_filter(self):
+        """Testing DiffXReader.iter_sections with file_filter"""
+        data = (
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.change:\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=27\n'
+            b'{\n'
+            b'    "path": "file.txt"\n'
+            b'}\n'
+            b'#...diff: length=58\n'
+            b'--- file.txt\n'
+            b'+++ file.txt\n'
+            b'@@ -1 +1 @@\n'
+            b'-old line\n'
+            b'+new line\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=28\n'
+            b'{\n'
+            b'    "path": "file2.txt"\n'
+            b'}\n'
+            b'#...diff: length=13\n'
+            b'Binary file\n'
+            b'\n'
+            b'#.change:\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=27\n'
+            b'{\n'
+            b'    "path": "file.txt"\n'
+            b'}\n'
+        )
+        reader = DiffXReader(UnseekableStream(data), block_size=16)
+        seen_metadata = []
+
+        def _file_filter(metadata):
+            seen_metadata.append(metadata)
+
+            return metadata['path'] == 'file2.txt'
+
+        sections = list(reader.iter_sections(file_filter=_file_filter))
+
+        self.assertEqual(
+            seen_metadata,
+            [
+                {'path': 'file.txt'},
+                {'path': 'file2.txt'},
+                {'path': 'file.txt'},
+            ])
+        self.assertEqual(
+            [
+                (_section['section'], _section['line'])
+                for _section in sections
+            ],
+            [
+                (Section.MAIN, 0),
+                (Section.CHANGE, 1),
+                (Section.FILE, None),
+                (Section.FILE_META, None),
+                (Section.FILE_DIFF, None),
+                (Section.CHANGE, None),
+            ])
+        self.assertEqual(sections[2]['level'], 2)
+        self.assertEqual(sections[3]['metadata'], {'path': 'file2.txt'})
+        self.assertEqual(sections[4]['diff'], b'Binary file\n\n')
+
+    def test_iter_sections_with_file_filter_and_lazy_content(self):
+        """Testing DiffXReader.iter_sections with file_filter and
+        lazy_content=True
+        """
+        reader = DiffXReader(io.BytesIO(
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.change:\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=27\n'
+            b'{\n'
+            b'    "path": "file.txt"\n'
+            b'}\n'
+            b'#...diff: length=58\n'
+            b'--- file.txt\n'
+            b'+++ file.txt\n'
+            b'@@ -1 +1 @@\n'
+            b'-old line\n'
+            b'+new line\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=28\n'
+            b'{\n'
+            b'    "path": "file2.txt"\n'
+            b'}\n'
+            b'#...diff: length=13\n'
+            b'Binary file\n'
+            b'\n'
+        ))
+
+        sections = list(reader.iter_sections(
+            lazy_content=True,
+            file_filter=lambda metadata: metadata['path'] == 'file.txt'))
+
+        self.assertEqual(
+            [
+                _section['section']
+                for _section in sections
+            ],
+            [
+                Section.MAIN,
+                Section.CHANGE,
+                Section.FILE,
+                Section.FILE_META,
+                Section.FILE_DIFF,
+            ])
+
+        # Metadata is always read when filtering.
+        self.assertEqual(sections[3]['metadata'], {'path': 'file.txt'})
+        self.assertNotIn('handle', sections[3])
+        self.assertEqual(sections[4]['handle'].read(),
+                         b'--- file.txt\n'
+                         b'+++ file.txt\n'
+                         b'@@ -1 +1 @@\n'
+                         b'-old line\n'
+                         b'+new line\n')
+
+
+    def test_iter_sections_with_file_filter_truncated(self):
+        """Testing DiffXReader.iter_sections with file_filter and filtered
+        content past the end of the file
+        """
+        data = (
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.change:\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=3\n'
+            b'{}\n'
+            b'#...diff: length=100\n'
+            b'--- file.txt\n'
+        )
+        message = (
+            'Error on line 6: Unexpected end of file. Expected 100 bytes of '
+            'content, but found 13'
+        )
+
+        for stream in (io.BytesIO(data), UnseekableStream(data)):
+            reader = DiffXReader(stream, block_size=4)
+
+            with self.assertRaisesMessage(DiffXParseError, message):
+                list(reader.iter_sections(
+                    file_filter=lambda metadata: False))
+
+    def test_iter_sections_with_lazy_metadata(self):
+        """Testing DiffXReader.iter_sections with lazy_metadata=True"""
+        reader = DiffXReader(io.BytesIO(
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.change:\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=27\n'
+            b'{\n'
+            b'    "path": "file.txt"\n'
+            b'}\n'
+        ))
+
+        sections = list(reader.iter_sections(lazy_metadata=True))
+        metadata = sections[3]['metadata']
+
+        self.assertIsInstance(metadata, DiffXLazyMetadata)
+        self.assertFalse(metadata.loaded)
+        self.assertEqual(metadata.raw,
+                         b'{\n'
+                         b'    "path": "file.txt"\n'
+                         b'}\n')
+
+        self.assertEqual(metadata['path'], 'file.txt')
+        self.assertTrue(metadata.loaded)
+        self.assertIs(metadata.load(), metadata.load())
+        self.assertEqual(metadata, {'path': 'file.txt'})
+
+    def test_iter_sections_with_lazy_metadata_null(self):
+        """Testing DiffXReader.iter_sections with lazy_metadata=True and
+        JSON content of null
+        """
+        class CountingJSONCodec(StdlibJSONCodec):
+            loads_calls = 0
+
+            def loads(self, data):
+                self.loads_calls += 1
+
+                return super(CountingJSONCodec, self).loads(data)
+
+        json_codec = CountingJSONCodec()
+        reader = DiffXReader(
+            io.BytesIO(
+                b'#diffx: encoding=utf-8, version=1.0\n'
+                b'#.change:\n'
+                b'#..file:\n'
+                b'#...meta: format=json, length=5\n'
+                b'null\n'
+            ),
+            json_codec=json_codec)
+
+        sections = list(reader.iter_sections(lazy_metadata=True))
+        metadata = sections[3]['metadata']
+
+        self.assertFalse(metadata.loaded)
+        self.assertIsNone(metadata.load())
+        self.assertTrue(metadata.loaded)
+        self.assertIsNone(metadata.load())
+        self.assertEqual(json_codec.loads_calls, 1)
+        self.assertEqual(repr(metadata), '<DiffXLazyMetadata(None)>')
+
+    def test_iter_sections_with_lazy_metadata_deserialize_error(self):
+        """Testing DiffXReader.iter_sections with lazy_metadata=True and
+        JSON content that could not be deserialized
+        """
+        reader = DiffXReader(io.BytesIO(
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.change:\n'
+            b'#..file:\n'
+            b'#...meta: length=2\n'
+            b'"\n'
+        ))
+
+        # The error is only raised once the metadata is accessed.
+        sections = list(reader.iter_sections(lazy_metadata=True))
+
+        message = (
+            'Error on line 4: JSON metadata could not be parsed: '
+            'Invalid control character at: line 1 column 2 (char 1)'
+        )
+
+        with self.assertRaisesMessage(DiffXParseError, message):
+            sections[3]['metadata'].load()
+
+    def test_iter_sections_with_section_records(self):
+        """Testing DiffXReader.iter_sections with section_records=True"""
+        data = (
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.preamble: length=6\n'
+            b'Test.\n'
+            b'#.change:\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=27\n'
+            b'{\n'
+            b'    "path": "file.txt"\n'
+            b'}\n'
+            b'#...diff: length=13\n'
+            b'Binary file\n'
+            b'\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=28\n'
+            b'{\n'
+            b'    "path": "file2.txt"\n'
+            b'}\n'
+        )
+        sections = list(DiffXReader(io.BytesIO(data)).iter_sections(
+            section_records=True))
+
+        self.assertEqual(sections, list(DiffXReader(io.BytesIO(data))))
+
+        for section in sections:
+            self.assertIsInstance(section, DiffXSectionInfo)
+
+        section = sections[5]
+        self.assertEqual(section.section, Section.FILE_DIFF)
+        self.assertEqual(section.level, 3)
+        self.assertEqual(section.type, 'diff')
+        self.assertEqual(section.line, 9)
+        self.assertEqual(section.options, {'length': 13})
+        self.assertEqual(section.diff, b'Binary file\n\n')
+
+        # Options without numeric values are shared between records, and
+        # can't be modified.
+        self.assertIs(sections[3].options, sections[6].options)
+        self.assertIsNot(sections[4].options, sections[7].options)
+
+        with self.assertRaises(TypeError):
+            sections[3].options['encoding'] = 'utf-16'
+
+    def test_iter_sections_with_section_records_and_file_filter(self):
+        """Testing DiffXReader.iter_sections with section_records=True and
+        file_filter sets fields directly
+        """
+        data = (
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.change:\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=27\n'
+            b'{\n'
+            b'    "path": "file.txt"\n'
+            b'}\n'
+            b'#...diff: length=13\n'
+            b'Binary file\n'
+            b'\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=28\n'
+            b'{\n'
+            b'    "path": "file2.txt"\n'
+            b'}\n'
+            b'#...diff: length=13\n'
+            b'Binary file\n'
+            b'\n'
+        )
+
+        self.spy_on(DiffXSectionInfo.__getitem__, owner=DiffXSectionInfo)
+        self.spy_on(DiffXSectionInfo.__setitem__, owner=DiffXSectionInfo)
+
+        reader = DiffXReader(io.BytesIO(data))
+        sections = list(reader.iter_sections(
+            file_filter=lambda metadata: metadata['path'] == 'file2.txt',
+            lazy_content={Section.FILE_DIFF},
+            section_records=True))
+
+        self.assertSpyNotCalled(DiffXSectionInfo.__getitem__)
+        self.assertSpyNotCalled(DiffXSectionInfo.__setitem__)
+
+        self.assertEqual(
+            [
+                (section.section, section.line)
+                for section in sections
+            ],
+            [
+                (Section.MAIN, 0),
+                (Section.CHANGE, 1),
+                (Section.FILE, None),
+                (Section.FILE_META, None),
+                (Section.FILE_DIFF, None),
+            ])
+        self.assertEqual(sections[3].metadata, {'path': 'file2.txt'})
+        self.assertEqual(sections[4].handle.read(), b'Binary file\n\n')
+
+    def test_iter_sections_with_section_records_and_lazy_content(self):
+        """Testing DiffXReader.iter_sections with section_records=True and
+        lazy_content=True
+        """
+        reader = DiffXReader(io.BytesIO(
+            b'#diffx: version=1.0\n'
+            b'#.preamble: length=6\n'
+            b'Test.\n'
+        ))
+        sections = list(reader.iter_sections(lazy_content=True,
+                                             section_records=True))
+
+        self.assertEqual(len(sections), 2)
+        self.assertNotIn('text', sections[1])
+        self.assertEqual(sections[1].handle.read(), b'Test.\n')
+
+    def test_with_validation_fast(self):
+        """Testing DiffXReader with validation='fast'"""
+        data = (
+            b'#diffx: encoding=utf-8, version=1.0\r\n'
+            b'#.preamble: indent=2, length=37\r\n'
+            b'  Summary of the main preamble.\r\n'
+            b'  \r\n'
+            b'#.meta: format=json, length=26\r\n'
+            b'{\r\n'
+            b'    "key": "value"\r\n'
+            b'}\r\n'
+            b'#.change:\r\n'
+            b'#..preamble: encoding=utf-16, indent=4, length=24\r\n'
+            b'    ' + 'Summary.\r\n'.encode('utf-16-le') +
+            b'#..file:\r\n'
+            b'#...meta: format=json, length=30\r\n'
+            b'{\r\n'
+            b'    "path": "file.txt"\r\n'
+            b'}\r\n'
+            b'#...diff: length=13\r\n'
+            b'Binary file\n'
+            b'\n'
+        )
+        expected = list(DiffXReader(io.BytesIO(data)))
+
+        for section in expected:
+            section['line'] = None
+
+        self.assertEqual(
+            list(DiffXReader(io.BytesIO(data), validation='fast')),
+            expected)
+        self.assertEqual(expected[1]['text'],
+                         'Summary of the main preamble.\r\n\r\n')
+        self.assertEqual(expected[4]['text'], 'Summary.\r\n')
+
+    def test_with_validation_fast_and_header_option_chars(self):
+        """Testing DiffXReader with validation='fast' and header containing
+        invalid characters in option key
+        """
+        reader = DiffXReader(
+            io.BytesIO(b'#diffx: #key=value, version=1.0\n'),
+            validation='fast')
+
+        self.assertEqual(
+            list(reader)[0]['options'],
+            {
+                '#key': 'value',
+                'version': '1.0',
+            })
+
+    def test_with_validation_fast_and_section_records(self):
+        """Testing DiffXReader with validation='fast' and
+        section_records=True doesn't affect later strict readers
+        """
+        data = (
+            b'#diffx: version=1.0\n'
+            b'#.change: 1foo=bar\n'
+        )
+        message = (
+            'Error on line 2, column 11: Header option key "1foo" contains '
+            'invalid characters'
+        )
+
+        with self.assertRaisesMessage(DiffXParseError, message):
+            list(DiffXReader(io.BytesIO(data)).iter_sections(
+                section_records=True))
+
+        reader = DiffXReader(io.BytesIO(data), validation='fast')
+        sections = list(reader.iter_sections(section_records=True))
+        self.assertEqual(sections[1].options, {'1foo': 'bar'})
+
+        with self.assertRaisesMessage(DiffXParseError, message):
+            list(DiffXReader(io.BytesIO(data)).iter_sections(
+                section_records=True))
+
+    def test_with_validation_fast_and_invalid_section_order(self):
+        """Testing DiffXReader with validation='fast' and an invalid section
+        order
+        """
+        reader = DiffXReader(
+            io.BytesIO(
+                b'#diffx: version=1.0\n'
+                b'#.change:\n'
+                b'#.meta: format=json, length=3\n'
+                b'{}\n'
+            ),
+            validation='fast')
+
+        message = (
+            'Error: Unknown or unexpected section ID ".meta". Expected one '
+            'of: "..file", "..meta", "..preamble"'
+        )
+
+        with self.assertRaisesMessage(DiffXParseError, message):
+            list(reader)
+
+    def test_with_validation_fast_and_content_missing_newline(self):
+        """Testing DiffXReader with validation='fast' and content not
+        ending in a newline
+        """
+        reader = DiffXReader(
+            io.BytesIO(
+                b'#diffx: version=1.0\n'
+                b'#.preamble: indent=2, length=6\n'
+                b'  Test\n'
+            ),
+            validation='fast')
+
+        with self.assertRaisesMessage(DiffXParseError,
+                                      'Error: Expected a newline after '
+                                      'content'):
+            list(reader)
+
+    def test_with_invalid_validation(self):
+        """Testing DiffXReader with an invalid validation mode"""
+        message = "validation must be one of strict, fast, not 'quick'"
+
+        with self.assertRaisesMessage(ValueError, message):
+            DiffXReader(io.BytesIO(), validation='quick')
+
+    def test_with_json_codec(self):
+        """Testing DiffXReader with json_codec"""
+        class MyJSONCodec(StdlibJSONCodec):
+            def loads(self, data):
+                result = super(MyJSONCodec, self).loads(data)
+                result['decoded'] = True
+
+                return result
+
+        reader = DiffXReader(
+            io.BytesIO(
+                b'#diffx: encoding=utf-8, version=1.0\n'
+                b'#.meta: format=json, length=23\n'
+                b'{\n'
+                b'    "key": "value"\n'
+                b'}\n'
+            ),
+            json_codec=MyJSONCodec())
+
+        self.assertEqual(
+            list(reader)[1]['metadata'],
+            {
+                'decoded': True,
+                'key': 'value',
+            })
+
+    def _write_temp_file(self, data):
+        """Write data to a temporary file.
+
+        The file will be removed when the test finishes.
+
+        Args:
+            data (bytes):
+                The data to write.
+
+        Returns:
+            unicode:
+            The path to the file.
+        """
+        fd, path = tempfile.mkstemp(suffix='.diffx')
+        self.addCleanup(os.unlink, path)
+
+        with os.fdopen(fd, 'wb') as fp:
+            fp.write(data)
+
+        return path
+
+
+class DiffXSectionInfoTests(TestCase):
+    """Unit tests for pydiffx.reader.DiffXSectionInfo."""
+
+    def test_getitem(self):
+        """Testing DiffXSectionInfo.__getitem__"""
+        section = self._create_section_info()
+
+        self.assertEqual(section['section'], Section.MAIN_PREAMBLE)
+        self.assertEqual(section['level'], 1)
+        self.assertEqual(section['options'], {'length': 6})
+
+        with self.assertRaises(KeyError):
+            section['text']
+
+        with self.assertRaises(KeyError):
+            section['__class__']
+
+    def test_setitem(self):
+        """Testing DiffXSectionInfo.__setitem__"""
+        section = self._create_section_info()
+        section['text'] = 'Test.\n'
+
+        self.assertEqual(section.text, 'Test.\n')
+
+        with self.assertRaises(KeyError):
+            section['foo'] = 'bar'
+
+    def test_delitem(self):
+        """Testing DiffXSectionInfo.__delitem__"""
+        section = self._create_section_info()
+        section.text = 'Test.\n'
+
+        del section['text']
+
+        self.assertNotIn('text', section)
+
+        with self.assertRaises(KeyError):
+            del section['text']
+
+    def test_iter(self):
+        """Testing DiffXSectionInfo.__iter__ and __len__"""
+        section = self._create_section_info()
+
+        self.assertEqual(list(section),
+                         ['level', 'line', 'options', 'section', 'type'])
+        self.assertEqual(len(section), 5)
+
+        section.text = 'Test.\n'
+
+        self.assertEqual(list(section),
+                         ['level', 'line', 'options', 'section', 'type',
+                          'text'])
+        self.assertEqual(len(section), 6)
+
+    def test_eq(self):
+        """Testing DiffXSectionInfo.__eq__"""
+        section = self._create_section_info()
+
+        self.assertEqual(
+            section,
+            {
+                'level': 1,
+                'line': 1,
+                'options': {
+                    'length': 6,
+                },
+                'section': Section.MAIN_PREAMBLE,
+                'type': 'preamble',
+            })
+        self.assertNotEqual(section, {'section': Section.MAIN_PREAMBLE})
+
+    def _create_section_info(self):
+        """Return a record for a main preamble section.
+
+        Returns:
+            pydiffx.reader.DiffXSectionInfo:
+            The new record.
+        """
+        return DiffXSectionInfo(section=Section.MAIN_PREAMBLE,
+                                level=1,
+                                section_type='preamble',
+                                line=1,
+                                options=MappingProxyType({'length': 6}))
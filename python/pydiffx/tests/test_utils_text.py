@@ -2,7 +2,13 @@
 
 from pydiffx.options import LineEndings
 from pydiffx.tests.testcases import TestCase
-from pydiffx.utils.text import get_newline_for_type
+from pydiffx.utils import text as text_utils
+from pydiffx.utils.text import (count_lines,
+                                dedent_lines,
+                                get_newline_for_type,
+                                guess_line_endings,
+                                indent_lines,
+                                split_lines)
 
 
 class GetNewlineForTypeTests(TestCase):
@@ -41,3 +47,154 @@ class GetNewlineForTypeTests(TestCase):
         with self.assertRaisesMessage(LookupError, message):
             get_newline_for_type(LineEndings.DOS,
                                  encoding='xxx-invalid')
+
+
+class BaseTextTestCase(TestCase):
+    """Base class for text utility tests."""
+
+    def set_scan_chunk_size(self, chunk_size):
+        """Set the memoryview scan chunk size for the duration of a test.
+
+        Args:
+            chunk_size (int):
+                The chunk size to set.
+        """
+        old_chunk_size = text_utils.VIEW_SCAN_CHUNK_SIZE
+        text_utils.VIEW_SCAN_CHUNK_SIZE = chunk_size
+        self.addCleanup(setattr, text_utils, 'VIEW_SCAN_CHUNK_SIZE',
+                        old_chunk_size)
+
+
+class CountLinesTests(BaseTextTestCase):
+    """Unit tests for pydiffx.utils.text.count_lines."""
+
+    def test_with_trailing_newline(self):
+        """Testing count_lines with trailing newline"""
+        self.assertEqual(count_lines(b'a\nb\nc\n', b'\n'), 3)
+
+    def test_without_trailing_newline(self):
+        """Testing count_lines without trailing newline"""
+        self.assertEqual(count_lines(b'a\nb\nc', b'\n'), 3)
+
+    def test_with_empty(self):
+        """Testing count_lines with empty data"""
+        self.assertEqual(count_lines(b'', b'\n'), 0)
+
+    def test_matches_split_lines(self):
+        """Testing count_lines matches the result of split_lines"""
+        for data in (b'a', b'a\r\n', b'a\r\nb\nc\r\n', b'\r\n\r\n',
+                     b'a\nb\r\nc'):
+            for newline in (b'\n', b'\r\n'):
+                self.assertEqual(
+                    count_lines(data, newline),
+                    len(split_lines(data, newline=newline)))
+
+    def test_with_memoryview(self):
+        """Testing count_lines with memoryview spanning multiple scan chunks
+        """
+        self.set_scan_chunk_size(3)
+
+        data = b'ab\r\ncd\r\n\r\nefg\r\n'
+
+        self.assertEqual(count_lines(memoryview(data), b'\r\n'), 4)
+        self.assertEqual(count_lines(memoryview(data[:-1]), b'\r\n'), 4)
+        self.assertEqual(count_lines(memoryview(data), b'\n'), 4)
+
+
+
+class IndentLinesTests(TestCase):
+    """Unit tests for pydiffx.utils.text.indent_lines."""
+
+    def test_with_trailing_newline(self):
+        """Testing indent_lines with trailing newline"""
+        self.assertEqual(indent_lines(b'a\n\nb\n', 2, b'\n'),
+                         b'  a\n  \n  b\n')
+
+    def test_without_trailing_newline(self):
+        """Testing indent_lines without trailing newline"""
+        self.assertEqual(indent_lines(b'a\r\nb', 2, b'\r\n'),
+                         b'  a\r\n  b')
+
+    def test_matches_split_lines(self):
+        """Testing indent_lines matches indenting the result of split_lines
+        """
+        for data in (b'a', b'\n', b'a\r\n', b'a\r\nb\nc\r\n', b'\r\n\r\n',
+                     b'a\nb\r\nc'):
+            for newline in (b'\n', b'\r\n'):
+                self.assertEqual(
+                    indent_lines(data, 4, newline),
+                    b''.join(
+                        b'    %s' % _line
+                        for _line in split_lines(data,
+                                                 newline=newline,
+                                                 keep_ends=True)
+                    ))
+
+
+class DedentLinesTests(TestCase):
+    """Unit tests for pydiffx.utils.text.dedent_lines."""
+
+    def test_with_full_indentation(self):
+        """Testing dedent_lines with every line fully indented"""
+        self.assertEqual(dedent_lines(b'  a\r\n  \r\n    b\r\n', 2,
+                                      b'\r\n'),
+                         b'a\r\n\r\n  b\r\n')
+
+    def test_with_short_indentation(self):
+        """Testing dedent_lines with lines with less indentation"""
+        self.assertEqual(dedent_lines(b'  a\n\n b\n   c', 2, b'\n'),
+                         b'a\n\nb\n c')
+
+    def test_with_other_newlines(self):
+        """Testing dedent_lines with newlines other than the one provided"""
+        self.assertEqual(dedent_lines(b'  a\n  b\r\n  c\r\n', 2, b'\r\n'),
+                         b'a\n  b\r\nc\r\n')
+
+    def test_with_utf16(self):
+        """Testing dedent_lines with UTF-16 content"""
+        self.assertEqual(
+            dedent_lines(b'  a\x00\n\x00 b\x00\n\x00', 2, b'\n\x00'),
+            b'a\x00\n\x00b\x00\n\x00')
+
+    def test_with_indent(self):
+        """Testing dedent_lines reverses indent_lines"""
+        for data in (b'a', b'\n', b'a\r\n', b'a\r\nb\nc\r\n', b'\r\n\r\n',
+                     b'a\nb\r\nc'):
+            for newline in (b'\n', b'\r\n'):
+                self.assertEqual(
+                    dedent_lines(indent_lines(data, 4, newline), 4, newline),
+                    data)
+
+
+class GuessLineEndingsTests(BaseTextTestCase):
+    """Unit tests for pydiffx.utils.text.guess_line_endings."""
+
+    def test_with_dos(self):
+        """Testing guess_line_endings with DOS line endings"""
+        self.assertEqual(guess_line_endings(b'abc\r\ndef\n'),
+                         (LineEndings.DOS, b'\r\n'))
+
+    def test_with_unix(self):
+        """Testing guess_line_endings with UNIX line endings"""
+        self.assertEqual(guess_line_endings(b'abc\ndef\r\n'),
+                         (LineEndings.UNIX, b'\n'))
+
+    def test_with_no_newlines(self):
+        """Testing guess_line_endings with no newlines"""
+        self.assertEqual(guess_line_endings('abc'),
+                         (LineEndings.UNIX, '\n'))
+
+    def test_with_memoryview(self):
+        """Testing guess_line_endings with memoryview"""
+        self.set_scan_chunk_size(2)
+
+        self.assertEqual(
+            guess_line_endings(memoryview(b'abcdef\r\ng\n')),
+            (LineEndings.DOS, b'\r\n'))
+        self.assertEqual(
+            guess_line_endings(memoryview(b'abcdefg\n\r\n')),
+            (LineEndings.UNIX, b'\n'))
+        self.assertEqual(
+            guess_line_endings(memoryview(b'a\x00\r\x00\n\x00'),
+                               encoding='utf-16-le'),
+            (LineEndings.DOS, b'\r\x00\n\x00'))
@@ -1,17 +1,24 @@
 """Unit tests for pydiffx.writer."""
 
 import io
+import os
+import pathlib
+import tempfile
+
+import kgb
 
 from pydiffx.errors import (DiffXContentError,
                             DiffXOptionValueChoiceError,
                             DiffXSectionOrderError)
+from pydiffx.json_codecs import StdlibJSONCodec
 from pydiffx.options import DiffType, LineEndings, PreambleMimeType
 from pydiffx.reader import DiffXReader
 from pydiffx.tests.testcases import TestCase
+from pydiffx import writer as writer_module
 from pydiffx.writer import DiffXWriter
 
 
-class DiffXWriterTests(TestCase):
+class DiffXWriterTests(kgb.SpyAgency, TestCase):
     """Unit tests for pydiffx.reader.DiffXWriter."""
 
     def test_with_simple_diff(self):
@@ -588,6 +595,67 @@ class DiffXWriterTests(TestCase):
             b'...\n'
         )
 
+    def test_write_diff_with_bytearray(self):
+        """Testing DiffXWriter.write_diff with bytearray"""
+        stream, writer = self._create_writer()
+        writer.new_change()
+        writer.new_file()
+        writer.write_meta({
+            'key': 'value',
+        })
+        writer.write_diff(bytearray(b'--- a\n+++ b'))
+
+        self._check_result(
+            stream,
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.change:\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=23\n'
+            b'{\n'
+            b'    "key": "value"\n'
+            b'}\n'
+            b'#...diff: length=12, line_endings=unix\n'
+            b'--- a\n'
+            b'+++ b\n'
+        )
+
+    def test_write_diff_with_memoryview(self):
+        """Testing DiffXWriter.write_diff with memoryview"""
+        stream, writer = self._create_writer()
+        writer.new_change()
+        writer.new_file()
+        writer.write_meta({
+            'key': 'value',
+        })
+        writer.write_diff(memoryview(b'xx--- a\r\n+++ b\r\nxx')[2:-2])
+        writer.new_file()
+        writer.write_meta({
+            'key': 'value',
+        })
+        writer.write_diff(memoryview(b'--- a\n+++ b'))
+
+        self._check_result(
+            stream,
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.change:\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=23\n'
+            b'{\n'
+            b'    "key": "value"\n'
+            b'}\n'
+            b'#...diff: length=14, line_endings=dos\n'
+            b'--- a\r\n'
+            b'+++ b\r\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=23\n'
+            b'{\n'
+            b'    "key": "value"\n'
+            b'}\n'
+            b'#...diff: length=12, line_endings=unix\n'
+            b'--- a\n'
+            b'+++ b\n'
+        )
+
     def test_write_diff_with_non_bytes(self):
         """Testing DiffXWriter.write_diff with non-bytes diff"""
         stream, writer = self._create_writer()
@@ -631,6 +699,458 @@ class DiffXWriterTests(TestCase):
             b'\xff\xfe.\x00.\x00.\x00\n\x00'
         )
 
+    def test_write_diff_with_file(self):
+        """Testing DiffXWriter.write_diff with a file"""
+        stream, writer = self._create_file_writer()
+
+        with io.BytesIO(b'xxx--- a\r\n+++ a\r\n-old\r\n+new') as fp:
+            fp.read(3)
+            writer.write_diff(fp)
+
+            self.assertEqual(fp.tell(), 27)
+
+        self._check_result(
+            stream,
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.change:\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=23\n'
+            b'{\n'
+            b'    "key": "value"\n'
+            b'}\n'
+            b'#...diff: length=26, line_endings=dos\n'
+            b'--- a\r\n'
+            b'+++ a\r\n'
+            b'-old\r\n'
+            b'+new\r\n'
+        )
+
+    def test_write_diff_with_unseekable_file(self):
+        """Testing DiffXWriter.write_diff with a file that can't seek"""
+        stream, writer = self._create_file_writer()
+        writer.COPY_CHUNK_SIZE = 4
+
+        r, w = os.pipe()
+
+        with os.fdopen(r, 'rb') as read_fp:
+            with os.fdopen(w, 'wb') as write_fp:
+                write_fp.write(b'--- a\n+++ a\n-old\n+new\n')
+
+            writer.write_diff(read_fp, diff_type=DiffType.TEXT)
+
+        self._check_result(
+            stream,
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.change:\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=23\n'
+            b'{\n'
+            b'    "key": "value"\n'
+            b'}\n'
+            b'#...diff: length=22, line_endings=unix, type=text\n'
+            b'--- a\n'
+            b'+++ a\n'
+            b'-old\n'
+            b'+new\n'
+        )
+
+    def test_write_diff_with_iterable(self):
+        """Testing DiffXWriter.write_diff with an iterable of byte strings"""
+        stream, writer = self._create_file_writer()
+        writer.COPY_CHUNK_SIZE = 4
+        writer.SPOOL_MAX_MEMORY_SIZE = 8
+
+        # The first line ending is split across chunks.
+        writer.write_diff(iter([
+            b'--- a\r',
+            b'\n+++ a\r\n',
+            b'-old\r\n+new',
+        ]))
+
+        self._check_result(
+            stream,
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.change:\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=23\n'
+            b'{\n'
+            b'    "key": "value"\n'
+            b'}\n'
+            b'#...diff: length=26, line_endings=dos\n'
+            b'--- a\r\n'
+            b'+++ a\r\n'
+            b'-old\r\n'
+            b'+new\r\n'
+        )
+
+    def test_write_diff_with_iterable_and_non_bytes(self):
+        """Testing DiffXWriter.write_diff with an iterable containing
+        non-bytes
+        """
+        stream, writer = self._create_file_writer()
+
+        message = 'diff chunks must be byte strings, not %s' % str
+
+        with self.assertRaisesMessage(DiffXContentError, message):
+            writer.write_diff([b'--- a\n', '+++ a\n'])
+
+    def test_write_diff_with_empty_iterable(self):
+        """Testing DiffXWriter.write_diff with an empty iterable"""
+        stream, writer = self._create_file_writer()
+
+        with self.assertRaisesMessage(DiffXContentError,
+                                      'The text cannot be empty.'):
+            writer.write_diff([])
+
+    def test_write_diff_with_invalid_type(self):
+        """Testing DiffXWriter.write_diff with an invalid type"""
+        stream, writer = self._create_file_writer()
+
+        message = (
+            'diff must be a byte string, file, path, or iterable of byte '
+            'strings, not %s'
+            % int
+        )
+
+        with self.assertRaisesMessage(DiffXContentError, message):
+            writer.write_diff(123)
+
+    def test_write_diff_with_path_to_file(self):
+        """Testing DiffXWriter.write_diff with a path, writing to a file"""
+        self.spy_on(writer_module._copy_file_range)
+        self.spy_on(writer_module._sendfile)
+
+        path = self._write_temp_file(b'Binary file\n')
+        out_path = self._write_temp_file(b'')
+
+        with open(out_path, 'wb') as out_fp:
+            writer = DiffXWriter(out_fp)
+            writer.new_change()
+            writer.new_file()
+            writer.write_meta({
+                'key': 'value',
+            })
+            writer.write_diff(pathlib.Path(path),
+                              diff_type=DiffType.BINARY)
+
+            # Make sure the stream's position is in sync after the copy.
+            self.assertEqual(out_fp.tell(), 175)
+
+            writer.new_file()
+
+        with open(out_path, 'rb') as fp:
+            data = fp.read()
+
+        self.assertMultiLineBytesEqual(
+            data,
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.change:\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=23\n'
+            b'{\n'
+            b'    "key": "value"\n'
+            b'}\n'
+            b'#...diff: length=12, line_endings=unix, type=binary\n'
+            b'Binary file\n'
+            b'#..file:\n')
+
+        # The content was copied by the operating system.
+        if writer_module._copy_file_range.called:
+            self.assertEqual(
+                writer_module._copy_file_range.last_call.return_value,
+                12)
+        else:
+            self.assertEqual(
+                writer_module._sendfile.last_call.return_value,
+                12)
+
+    def test_write_diff_with_iterable_before_file(self):
+        """Testing DiffXWriter.write_diff with an iterable before new_file
+        doesn't consume the iterable
+        """
+        stream, writer = self._create_writer()
+        writer.new_change()
+        chunks = iter([b'...\n'])
+
+        message = (
+            'write_diff() cannot be called at this stage (after '
+            'new_change()). Expected one of: new_file(), write_meta(), '
+            'write_preamble()'
+        )
+
+        with self.assertRaisesMessage(DiffXSectionOrderError, message):
+            writer.write_diff(chunks)
+
+        self.assertEqual(list(chunks), [b'...\n'])
+
+    def test_write_calls(self):
+        """Testing DiffXWriter writes each section in a single call"""
+        stream, writer = self._create_writer()
+
+        self.assertEqual(writer.write_calls, 1)
+
+        writer.new_change()
+        writer.new_file()
+        writer.write_meta({
+            'key': 'value',
+        })
+        writer.write_diff(b'Binary file')
+
+        self.assertEqual(writer.write_calls, 5)
+        self.assertEqual(writer.bytes_written, len(stream.getvalue()))
+
+        self._check_result(
+            stream,
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.change:\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=23\n'
+            b'{\n'
+            b'    "key": "value"\n'
+            b'}\n'
+            b'#...diff: length=12, line_endings=unix\n'
+            b'Binary file\n'
+        )
+
+    def test_write_calls_with_large_content(self):
+        """Testing DiffXWriter writes large content without joining it to
+        the header
+        """
+        stream, writer = self._create_file_writer()
+        writer.MAX_COALESCE_SIZE = 20
+
+        diff = b'%s\n' % (b'x' * 30)
+        writer.write_diff(diff)
+
+        self.assertEqual(writer.write_calls, 6)
+        self.assertEqual(writer.bytes_written, len(stream.getvalue()))
+        self.assertTrue(stream.getvalue().endswith(
+            b'#...diff: length=31, line_endings=unix\n%s' % diff))
+
+    def test_buffer_size(self):
+        """Testing DiffXWriter with buffer_size"""
+        stream, writer = self._create_writer(buffer_size=1024)
+        writer.new_change()
+        writer.new_file()
+        writer.write_meta({
+            'key': 'value',
+        })
+        writer.write_diff(b'Binary file\n')
+
+        self.assertEqual(stream.getvalue(), b'')
+        self.assertEqual(writer.write_calls, 0)
+        self.assertEqual(writer.bytes_written, 0)
+
+        writer.flush()
+
+        self.assertEqual(writer.write_calls, 1)
+        self.assertEqual(writer.bytes_written, 162)
+
+        self._check_result(
+            stream,
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.change:\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=23\n'
+            b'{\n'
+            b'    "key": "value"\n'
+            b'}\n'
+            b'#...diff: length=12, line_endings=unix\n'
+            b'Binary file\n'
+        )
+
+    def test_buffer_size_when_full(self):
+        """Testing DiffXWriter with buffer_size writes once the buffer is
+        full
+        """
+        stream, writer = self._create_writer(buffer_size=50)
+
+        self.assertEqual(stream.getvalue(), b'')
+
+        writer.new_change()
+        writer.new_file()
+
+        self.assertEqual(stream.getvalue(),
+                         b'#diffx: encoding=utf-8, version=1.0\n'
+                         b'#.change:\n'
+                         b'#..file:\n')
+        self.assertEqual(writer.write_calls, 1)
+
+        writer.write_meta({
+            'key': 'value',
+        })
+
+        # The buffer filled up partway through the section.
+        self.assertEqual(writer.write_calls, 2)
+        self.assertEqual(writer.bytes_written, 110)
+
+        writer.flush()
+
+        self.assertEqual(writer.write_calls, 3)
+        self.assertEqual(writer.bytes_written, len(stream.getvalue()))
+
+    def test_with_partial_writes(self):
+        """Testing DiffXWriter with a stream that writes partial data"""
+        class PartialStream(io.RawIOBase):
+            def __init__(self):
+                self.data = bytearray()
+
+            def writable(self):
+                return True
+
+            def write(self, data):
+                data = bytes(data[:16])
+                self.data += data
+
+                return len(data)
+
+        stream = PartialStream()
+        writer = DiffXWriter(stream, buffer_size=1024)
+        writer.new_change()
+        writer.new_file()
+        writer.write_meta({
+            'key': 'value',
+        })
+        writer.write_diff(b'...')
+        writer.flush()
+
+        expected = (
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.change:\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=23\n'
+            b'{\n'
+            b'    "key": "value"\n'
+            b'}\n'
+            b'#...diff: length=4, line_endings=unix\n'
+            b'...\n'
+        )
+
+        self.assertEqual(bytes(stream.data), expected)
+        self.assertEqual(writer.bytes_written, len(expected))
+        self.assertEqual(writer.write_calls, (len(expected) + 15) // 16)
+
+    def test_with_partial_writes_and_error(self):
+        """Testing DiffXWriter with a stream that fails partway through a
+        write
+        """
+        class FailingStream(io.RawIOBase):
+            def writable(self):
+                return True
+
+            def write(self, data):
+                if len(data) < 20:
+                    raise OSError('Connection reset')
+
+                return 10
+
+        writer = DiffXWriter(FailingStream(), buffer_size=1024)
+
+        with self.assertRaisesMessage(OSError, 'Connection reset'):
+            writer.flush()
+
+        self.assertEqual(writer.bytes_written, 20)
+
+    def test_with_partial_writes_and_stalled_stream(self):
+        """Testing DiffXWriter with a stream that stops accepting data
+        partway through a write
+        """
+        class StalledStream(io.RawIOBase):
+            def __init__(self):
+                self.data = bytearray()
+
+            def writable(self):
+                return True
+
+            def write(self, data):
+                data = bytes(data[:20 - len(self.data)])
+                self.data += data
+
+                return len(data)
+
+        stream = StalledStream()
+        writer = DiffXWriter(stream, buffer_size=1024)
+
+        message = (
+            'The stream did not accept any more data after 20 of 36 bytes'
+        )
+
+        with self.assertRaisesMessage(OSError, message):
+            writer.flush()
+
+        self.assertEqual(writer.bytes_written, 20)
+        self.assertEqual(writer.write_calls, 2)
+
+    def test_write_section_header(self):
+        """Testing DiffXWriter._write_section_header with cached templates
+        and custom options
+        """
+        stream, writer = self._create_writer()
+
+        writer._write_section_header('...diff', length=10, type=None,
+                                     encoding='utf-16')
+        writer._write_section_header('...diff', length=1234, type='text',
+                                     encoding=None)
+        writer._write_section_header('...diff', type=None)
+        writer._write_section_header('.meta', zzz='1', format='json',
+                                     length=5)
+        writer.flush()
+
+        self.assertMultiLineBytesEqual(
+            stream.getvalue(),
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#...diff: encoding=utf-16, length=10\n'
+            b'#...diff: length=1234, type=text\n'
+            b'#...diff:\n'
+            b'#.meta: format=json, length=5, zzz=1\n')
+
+    def test_write_raw_section(self):
+        """Testing DiffXWriter.write_raw_section"""
+        stream, writer = self._create_writer()
+        writer.write_raw_section('.change',
+                                 b'#.change: encoding=utf-16\n',
+                                 encoding='utf-16')
+        writer.write_raw_section('..file', b'#..file:\n')
+        writer.write_meta({
+            'key': 'value',
+        })
+        writer.write_raw_section('...diff', b'#...diff: length=4\n...\n')
+        writer.new_file()
+        writer.write_meta({
+            'key': 'value',
+        })
+        writer.flush()
+
+        meta = (
+            '{\n'
+            '    "key": "value"\n'
+            '}\n'
+        ).encode('utf-16')
+
+        self.assertMultiLineBytesEqual(
+            stream.getvalue(),
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.change: encoding=utf-16\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=48\n' + meta +
+            b'#...diff: length=4\n'
+            b'...\n'
+            b'#..file:\n'
+            b'#...meta: format=json, length=48\n' + meta)
+
+    def test_write_raw_section_out_of_order(self):
+        """Testing DiffXWriter.write_raw_section out of order"""
+        stream, writer = self._create_writer()
+
+        message = (
+            'write_diff() cannot be called at this stage (after '
+            'initialization). Expected one of: new_change(), write_meta(), '
+            'write_preamble()'
+        )
+
+        with self.assertRaisesMessage(DiffXSectionOrderError, message):
+            writer.write_raw_section('...diff', b'#...diff: length=4\n...\n')
+
     def test_write_diff_before_change(self):
         """Testing DiffXWriter.write_diff before new_change"""
         stream, writer = self._create_writer()
@@ -690,6 +1210,28 @@ class DiffXWriterTests(TestCase):
         with self.assertRaisesMessage(DiffXSectionOrderError, message):
             writer.write_diff(b'...')
 
+    def test_write_meta_with_json_codec(self):
+        """Testing DiffXWriter.write_meta with json_codec"""
+        stream, writer = self._create_writer(
+            json_codec=StdlibJSONCodec(compact=True))
+        writer.write_meta({
+            'key': 'value',
+            'a': [1, 2],
+        })
+
+        self.assertMultiLineBytesEqual(
+            stream.getvalue(),
+            b'#diffx: encoding=utf-8, version=1.0\n'
+            b'#.meta: format=json, length=26\n'
+            b'{"a":[1,2],"key":"value"}\n')
+
+        self.assertEqual(
+            list(DiffXReader(io.BytesIO(stream.getvalue())))[1]['metadata'],
+            {
+                'a': [1, 2],
+                'key': 'value',
+            })
+
     def test_write_meta_with_invalid_type(self):
         """Testing DiffXWriter.write_meta with non-dict"""
         stream, writer = self._create_writer()
@@ -1016,6 +1558,48 @@ class DiffXWriterTests(TestCase):
 
         return stream, writer
 
+    def _create_file_writer(self):
+        """Return a new stream and writer, ready for writing a diff.
+
+        A change, file, and file metadata will have been written.
+
+        Returns:
+            tuple:
+            A 2-tuple of:
+
+            1. The byte stream.
+            2. The writer.
+        """
+        stream, writer = self._create_writer()
+        writer.new_change()
+        writer.new_file()
+        writer.write_meta({
+            'key': 'value',
+        })
+
+        return stream, writer
+
+    def _write_temp_file(self, data):
+        """Write data to a temporary file.
+
+        The file will be removed when the test finishes.
+
+        Args:
+            data (bytes):
+                The data to write.
+
+        Returns:
+            unicode:
+            The path to the file.
+        """
+        fd, path = tempfile.mkstemp()
+        self.addCleanup(os.unlink, path)
+
+        with os.fdopen(fd, 'wb') as fp:
+            fp.write(data)
+
+        return path
+
     def _check_result(self, stream, expected_result,
                       line_endings=LineEndings.UNIX):
         """Check the result of a write.
@@ -1,6 +1,7 @@
 """Utilities for processing text."""
 
 import codecs
+import re
 
 from pydiffx.options import LineEndings
 
@@ -18,6 +19,13 @@ NEWLINE_FORMATS = {
 }
 
 
+#: The size of each chunk scanned when searching or counting in a memoryview.
+#:
+#: Type:
+#:     int
+VIEW_SCAN_CHUNK_SIZE = 1024 * 1024
+
+
 #: A mapping of encodings to possible BOM markers.
 BOMS = {
     'utf-8': (codecs.BOM_UTF8,),
@@ -74,6 +82,130 @@ def split_lines(data, newline, keep_ends=False):
     return lines
 
 
+def count_lines(data, newline):
+    """Return the number of lines in data.
+
+    This returns the same number of lines that :py:func:`split_lines` would
+    return, without building a list of lines. It also supports
+    :py:class:`memoryview` data (such as slices of a memory-mapped file),
+    which will be scanned in bounded chunks without copying the whole
+    buffer.
+
+    Args:
+        data (bytes or memoryview):
+            The data to count lines in.
+
+        newline (bytes):
+            The newline character(s) separating each line.
+
+    Returns:
+        int:
+        The number of lines.
+    """
+    assert newline
+
+    if not data:
+        return 0
+
+    if isinstance(data, memoryview):
+        num_newlines = 0
+
+        for start, chunk in _iter_view_chunks(data, len(newline)):
+            num_newlines += chunk.count(newline)
+
+        ends_with_newline = (data[-len(newline):] == newline)
+    else:
+        num_newlines = data.count(newline)
+        ends_with_newline = data.endswith(newline)
+
+    if ends_with_newline:
+        return num_newlines
+    else:
+        return num_newlines + 1
+
+
+def indent_lines(data, indent, newline):
+    """Indent each line in data.
+
+    This indents the same lines that :py:func:`split_lines` would return,
+    working on the data as a whole rather than on each line.
+
+    Args:
+        data (bytes):
+            The data to indent.
+
+        indent (int):
+            The number of spaces to add to the start of each line.
+
+        newline (bytes):
+            The newline character(s) separating each line.
+
+    Returns:
+        bytes:
+        The indented data.
+    """
+    assert newline
+
+    if not data or not indent:
+        return data
+
+    prefix, newline_prefix, dedent_re = _get_indent_state(indent, newline)
+    indented = data.replace(newline, newline_prefix)
+
+    if data.endswith(newline):
+        # Don't indent the empty remainder after the last newline.
+        indented = memoryview(indented)[:-indent]
+
+    return b''.join((prefix, indented))
+
+
+def dedent_lines(data, indent, newline):
+    """Remove indentation from each line in data.
+
+    Up to ``indent`` spaces will be removed from the start of each line that
+    :py:func:`split_lines` would return. Lines with less indentation (such
+    as blank lines, or lines with incorrect indentation) will have only the
+    spaces they contain removed.
+
+    Args:
+        data (bytes):
+            The data to dedent.
+
+        indent (int):
+            The maximum number of spaces to remove from the start of each
+            line.
+
+        newline (bytes):
+            The newline character(s) separating each line.
+
+    Returns:
+        bytes:
+        The dedented data.
+    """
+    assert newline
+
+    if not data or not indent:
+        return data
+
+    prefix, newline_prefix, dedent_re = _get_indent_state(indent, newline)
+
+    # Lines begin at the start of the data and after each newline, aside
+    # from one at the very end.
+    num_line_starts = data.count(newline)
+
+    if data.endswith(newline):
+        num_line_starts -= 1
+
+    if (data.startswith(prefix) and
+        data.count(newline_prefix) == num_line_starts):
+        # Every line is fully indented, which is always the case for
+        # content we've written. The indentation can be removed with a
+        # simple replacement.
+        return data[indent:].replace(newline_prefix, newline)
+
+    return dedent_re.sub(b'', data)
+
+
 def get_newline_for_type(line_endings, encoding=None):
     """Return the newline for a given type of line endings.
 
@@ -131,7 +263,7 @@ def guess_line_endings(text, encoding=None):
     If there are no newlines, UNIX line endings are assumed.
 
     Args:
-        text (bytes or unicode):
+        text (bytes or bytearray or memoryview or unicode):
             The text to guess line endings from.
 
         encoding (unicode, optional):
@@ -148,7 +280,7 @@ def guess_line_endings(text, encoding=None):
     unix_newline = NEWLINE_FORMATS[LineEndings.UNIX]
     dos_newline = NEWLINE_FORMATS[LineEndings.DOS]
 
-    if isinstance(text, bytes):
+    if isinstance(text, (bytes, bytearray, memoryview)):
         if encoding is None:
             encoding = 'ascii'
 
@@ -157,9 +289,16 @@ def guess_line_endings(text, encoding=None):
         dos_newline = strip_bom(dos_newline.encode(encoding),
                                 encoding)
 
-    i = text.find(unix_newline)
+    if isinstance(text, memoryview):
+        i = _find_in_view(text, unix_newline)
+    else:
+        i = text.find(unix_newline)
+
+    end = i + len(unix_newline)
 
-    if i != -1 and text[:i + len(unix_newline)].endswith(dos_newline):
+    if (i != -1 and
+        end >= len(dos_newline) and
+        text[end - len(dos_newline):end] == dos_newline):
         return LineEndings.DOS, dos_newline
     else:
         # This should either be UNIX newlines, or the content may
@@ -191,3 +330,100 @@ def strip_bom(data, encoding):
         data = data[len(boms[0]):]
 
     return data
+
+
+def _get_indent_state(indent, newline):
+    """Return cached state for indenting or dedenting lines.
+
+    Args:
+        indent (int):
+            The number of spaces of indentation.
+
+        newline (bytes):
+            The newline character(s) separating each line.
+
+    Returns:
+        tuple:
+        A 3-tuple of:
+
+        1. The indentation (:py:class:`bytes`).
+        2. A newline followed by the indentation (:py:class:`bytes`).
+        3. A compiled regex matching up to the indentation at the start of
+           each line.
+    """
+    key = (indent, newline)
+
+    try:
+        return _indent_states[key]
+    except KeyError:
+        pass
+
+    prefix = b' ' * indent
+    state = (
+        prefix,
+        newline + prefix,
+        re.compile(br'(?:\A|(?<=%s)) {1,%d}' % (re.escape(newline), indent)),
+    )
+
+    if len(_indent_states) < _INDENT_STATES_MAX_SIZE:
+        _indent_states[key] = state
+
+    return state
+
+
+# Cached state from _get_indent_state(), keyed off by indent and newline.
+_indent_states = {}
+
+# The maximum number of entries in _indent_states.
+_INDENT_STATES_MAX_SIZE = 64
+
+
+def _iter_view_chunks(view, sub_len):
+    """Iterate through bounded chunks of a memoryview.
+
+    Each chunk overlaps the next by ``sub_len - 1`` bytes, so that any
+    occurrence of a substring of that length starts in exactly one chunk's
+    non-overlapping portion.
+
+    Args:
+        view (memoryview):
+            The memoryview to iterate through.
+
+        sub_len (int):
+            The length of the substring being searched for.
+
+    Yields:
+        tuple:
+        A 2-tuple of:
+
+        1. The offset of the chunk within the view.
+        2. The chunk, as a byte string.
+    """
+    overlap = sub_len - 1
+    chunk_size = VIEW_SCAN_CHUNK_SIZE
+
+    for start in range(0, len(view), chunk_size):
+        yield start, view[start:start + chunk_size + overlap].tobytes()
+
+
+def _find_in_view(view, sub):
+    """Return the offset of the first occurrence of a substring in a view.
+
+    Args:
+        view (memoryview):
+            The memoryview to search.
+
+        sub (bytes):
+            The substring to find.
+
+    Returns:
+        int:
+        The offset of the substring, or -1 if not found.
+    """
+    for start, chunk in _iter_view_chunks(view, len(sub)):
+        i = chunk.find(sub)
+
+        if i != -1:
+            return start + i
+
+    return -1
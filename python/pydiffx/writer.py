@@ -1,11 +1,13 @@
 """A streaming writer for DiffX files."""
 
-import io
-import json
+import os
+import stat
+from tempfile import SpooledTemporaryFile
 
 from pydiffx.errors import (DiffXContentError,
                             DiffXOptionValueChoiceError,
                             DiffXSectionOrderError)
+from pydiffx.json_codecs import get_default_json_codec
 from pydiffx.options import (DiffType,
                              LineEndings,
                              MetaFormat,
@@ -13,8 +15,9 @@ from pydiffx.options import (DiffType,
                              SpecVersion)
 from pydiffx.sections import Section, VALID_SECTION_STATES
 from pydiffx.utils.text import (NEWLINE_FORMATS,
+                                get_newline_for_type,
                                 guess_line_endings,
-                                split_lines,
+                                indent_lines,
                                 strip_bom)
 
 
@@ -29,6 +32,33 @@ class DiffXWriter(object):
     diff contents to the stream without keeping it all in memory up-front.
     Consumers are responsible for including any necessary metadata for each
     section.
+
+    The header and content of each section are coalesced into as few writes
+    to the stream as possible. By default, everything is written to the
+    stream before each method returns. If a ``buffer_size`` is provided,
+    output will instead be held until that much has accumulated, which
+    reduces the number of writes (and system calls on unbuffered streams,
+    such as sockets or raw file descriptors) when writing many small
+    sections. In that case, :py:meth:`flush` must be called once writing
+    is complete.
+
+    Attributes:
+        buffer_size (int):
+            The amount of output to buffer before writing it to the stream.
+            If 0, output is written at the end of each call.
+
+        bytes_written (int):
+            The number of bytes written to the stream so far.
+
+        fp (file or io.IOBase):
+            The stream being written to.
+
+        json_codec (pydiffx.json_codecs.BaseJSONCodec):
+            The codec used to encode JSON metadata.
+
+        write_calls (int):
+            The number of times the stream's ``write()`` method has been
+            called so far.
     """
 
     #: The supported version of the DiffX specification.
@@ -40,12 +70,44 @@ class DiffXWriter(object):
     #: Default encoding to use for the DiffX file.
     DEFAULT_ENCODING = 'utf-8'
 
+    #: The maximum size of each chunk copied when streaming diff content.
+    #:
+    #: Type:
+    #:     int
+    COPY_CHUNK_SIZE = 64 * 1024
+
+    #: The maximum size of diff content of unknown length kept in memory.
+    #:
+    #: Content of unknown length must be spooled before it's written, in
+    #: order to compute the length. Anything larger than this will be
+    #: spooled to a temporary file.
+    #:
+    #: Type:
+    #:     int
+    SPOOL_MAX_MEMORY_SIZE = 1024 * 1024
+
+    #: A suggested output buffer size, for the ``buffer_size`` argument.
+    #:
+    #: Type:
+    #:     int
+    DEFAULT_BUFFER_SIZE = 64 * 1024
+
+    #: The maximum size of output that will be joined into a single write.
+    #:
+    #: Anything larger is written on its own, rather than copied in order to
+    #: join it with the data around it.
+    #:
+    #: Type:
+    #:     int
+    MAX_COALESCE_SIZE = 64 * 1024
+
     _LEVEL_NONE = 0
     _LEVEL_MAIN = 1
     _LEVEL_CHANGE = 2
     _LEVEL_FILE = 3
 
-    def __init__(self, fp, encoding=DEFAULT_ENCODING, version=VERSION):
+    def __init__(self, fp, encoding=DEFAULT_ENCODING, version=VERSION,
+                 json_codec=None, buffer_size=0):
         """Initialize the writer.
 
         Args:
@@ -61,6 +123,19 @@ class DiffXWriter(object):
                 The version of the DiffX file to write.
 
                 This must currently be ``1.0``.
+
+            json_codec (pydiffx.json_codecs.BaseJSONCodec, optional):
+                The codec used to encode JSON metadata. This defaults to
+                the result of
+                :py:func:`~pydiffx.json_codecs.get_default_json_codec`.
+
+            buffer_size (int, optional):
+                The amount of output to buffer before writing it to the
+                stream. :py:attr:`DEFAULT_BUFFER_SIZE` is a good choice when
+                writing many sections.
+
+                If set, :py:meth:`flush` must be called once writing is
+                complete. If 0, output is written at the end of each call.
         """
         if version not in SpecVersion.VALID_VALUES:
             raise DiffXOptionValueChoiceError(
@@ -68,7 +143,16 @@ class DiffXWriter(object):
                 value=version,
                 choices=SpecVersion.VALID_VALUES)
 
+        if json_codec is None:
+            json_codec = get_default_json_codec()
+
         self.fp = fp
+        self.json_codec = json_codec
+        self.buffer_size = buffer_size
+        self.bytes_written = 0
+        self.write_calls = 0
+        self._pending = []
+        self._pending_len = 0
         self._stack = [{
             'encoding': encoding,
         }]
@@ -97,6 +181,21 @@ class DiffXWriter(object):
         """
         return self._stack[-1]['encoding']
 
+    def flush(self):
+        """Write any buffered output to the stream.
+
+        If the stream has a ``flush()`` method, it will be called as well.
+
+        This must be called once writing is complete if a ``buffer_size``
+        was provided.
+        """
+        self._write_pending()
+
+        flush = getattr(self.fp, 'flush', None)
+
+        if flush is not None:
+            flush()
+
     def new_change(self, encoding=None):
         """Write a new change section to the stream.
 
@@ -264,10 +363,7 @@ class DiffXWriter(object):
         #       a different metadata format is ever provided.
         self._new_content_section(
             section_name='meta',
-            content=json.dumps(metadata,
-                               indent=4,
-                               separators=(',', ': '),
-                               sort_keys=True),
+            content=self.json_codec.dumps(metadata),
             encoding=encoding,
             format=meta_format,
             write_line_endings_option=False)
@@ -279,10 +375,31 @@ class DiffXWriter(object):
         This must be called after :py:meth:`new_file`, and must be after the
         :py:meth:`write_meta` call.
 
+        The content may be provided as a byte string (or other bytes-like
+        object, such as a :py:class:`memoryview`), or streamed from a
+        file, a path, or an iterable of byte strings. Streamed content is
+        copied to the stream in bounded chunks, without being held in
+        memory. If both the source and the stream are files on disk, the
+        content will be copied by the operating system where possible.
+
+        Content of unknown length (iterables, or files that can't seek,
+        such as pipes) will first be spooled (in memory if small, or to a
+        temporary file otherwise), so that the length can be written in the
+        header.
+
         Args:
-            content (bytes):
+            content (bytes or bytearray or memoryview or file or
+                     os.PathLike or iterable):
                 The diff content to write.
 
+                This may be a byte string, a :py:class:`bytearray` or
+                :py:class:`memoryview` (such as content returned by
+                :py:class:`~pydiffx.reader.DiffXReader` when memory-mapped),
+                a file opened in binary mode
+                (which will be read from its current position to the end),
+                a path to a file (as a :py:class:`pathlib.Path` or other
+                :py:class:`os.PathLike`), or an iterable of byte strings.
+
             diff_type (unicode, optional):
                 The type of diff to write. This must be one of
                 :py:attr:`DIFF_TYPE_TEXT` or :py:attr:`DIFF_TYPE_BINARY`.
@@ -307,8 +424,11 @@ class DiffXWriter(object):
 
             pydiffx.errors.DiffXSectionOrderError:
                 This was called at the wrong point in diff generation.
+
+            OSError:
+                The diff content could not be read.
         """
-        if not isinstance(content, bytes):
+        if isinstance(content, str):
             raise DiffXContentError('diff must be a byte string, not %s'
                                     % type(content))
 
@@ -319,13 +439,364 @@ class DiffXWriter(object):
                 value=diff_type,
                 choices=DiffType.VALID_VALUES)
 
-        self._new_content_section(
-            section_name='diff',
-            content=content,
-            encoding=encoding,
-            line_endings=line_endings,
-            type=diff_type,
-            inherit_encoding=False)
+        if isinstance(content, (bytes, bytearray, memoryview)):
+            self._new_content_section(
+                section_name='diff',
+                content=content,
+                encoding=encoding,
+                line_endings=line_endings,
+                type=diff_type,
+                inherit_encoding=False)
+            return
+
+        if isinstance(content, os.PathLike):
+            source = None
+        elif hasattr(content, 'read'):
+            source = content
+        elif hasattr(content, '__iter__'):
+            source = None
+        else:
+            raise DiffXContentError(
+                'diff must be a byte string, file, path, or iterable of '
+                'byte strings, not %s'
+                % type(content))
+
+        if (line_endings is not None and
+            line_endings not in LineEndings.VALID_VALUES):
+            raise DiffXOptionValueChoiceError(
+                option='line_endings',
+                value=line_endings,
+                choices=LineEndings.VALID_VALUES)
+
+        # Make sure the section can be written before consuming anything.
+        section = self._build_section(self._cur_section_level + 1, 'diff')
+        self._validate_section(section)
+
+        stream_kwargs = {
+            'section': section,
+            'encoding': encoding,
+            'line_endings': line_endings,
+            'type': diff_type,
+        }
+
+        if isinstance(content, os.PathLike):
+            with open(content, 'rb') as fp:
+                self._write_streamed_content(fp, **stream_kwargs)
+        elif _is_seekable(source):
+            self._write_streamed_content(source, **stream_kwargs)
+        else:
+            with SpooledTemporaryFile(
+                max_size=self.SPOOL_MAX_MEMORY_SIZE) as spool:
+                if source is not None:
+                    self._spool_file(source, spool)
+                else:
+                    self._spool_iterable(content, spool)
+
+                spool.seek(0)
+                self._write_streamed_content(spool,
+                                             allow_os_copy=False,
+                                             **stream_kwargs)
+
+    def write_raw_section(self, section_id, data, encoding=None):
+        """Write a section that has already been encoded.
+
+        This copies a section's header and any content directly to the
+        stream, such as a section read from another DiffX file. The section
+        must still be written in the correct order, but its data won't
+        otherwise be checked.
+
+        The main ``#diffx:`` section can't be written this way, as it's
+        written when the writer is created.
+
+        Args:
+            section_id (unicode):
+                The ID of the section, such as ``.change`` or ``...diff``.
+
+            data (bytes or memoryview):
+                The encoded section, including its header line and any
+                content.
+
+            encoding (unicode, optional):
+                The encoding set in the header of a change or file section.
+                This is used for any sections written within it.
+
+        Raises:
+            pydiffx.errors.DiffXSectionOrderError:
+                This was called at the wrong point in diff generation.
+        """
+        self._validate_section(section_id)
+
+        if section_id in (Section.CHANGE, Section.FILE):
+            section_level = len(section_id) - len(section_id.lstrip('.')) + 1
+
+            for i in range(self._cur_section_level - section_level + 1):
+                self._stack.pop()
+
+            self._stack.append({
+                'encoding': encoding or self._cur_encoding,
+            })
+
+        self._write(data)
+        self._prev_section = section_id
+        self._finish_write()
+
+    def _spool_file(self, fp, spool):
+        """Spool the remaining content of a file that can't seek.
+
+        Args:
+            fp (file):
+                The file to read from.
+
+            spool (tempfile.SpooledTemporaryFile):
+                The spool to write to.
+        """
+        chunk_size = self.COPY_CHUNK_SIZE
+
+        while True:
+            chunk = fp.read(chunk_size)
+
+            if not chunk:
+                break
+
+            spool.write(chunk)
+
+    def _spool_iterable(self, chunks, spool):
+        """Spool the content from an iterable of byte strings.
+
+        Args:
+            chunks (iterable of bytes):
+                The chunks of content.
+
+            spool (tempfile.SpooledTemporaryFile):
+                The spool to write to.
+
+        Raises:
+            pydiffx.errors.DiffXContentError:
+                A chunk was not a byte string.
+        """
+        for chunk in chunks:
+            if not isinstance(chunk, (bytes, bytearray, memoryview)):
+                raise DiffXContentError(
+                    'diff chunks must be byte strings, not %s'
+                    % type(chunk))
+
+            spool.write(chunk)
+
+    def _write_streamed_content(self, fp, section, encoding=None,
+                                line_endings=None, allow_os_copy=True,
+                                **options):
+        """Write a content section streamed from a seekable file.
+
+        The content from the file's current position to the end of the file
+        will be scanned for the line endings (if not provided) and a trailing
+        newline, and then copied to the stream in bounded chunks. A newline
+        will be written after the content if it's missing.
+
+        Args:
+            fp (file):
+                The seekable file to read the content from.
+
+            section (unicode):
+                The ID of the section being written. This must already have
+                been validated.
+
+            encoding (unicode, optional):
+                The encoding of the content.
+
+            line_endings (unicode, optional):
+                The type of line endings in the content ("dos" or "unix").
+                If not provided, it will be computed based on the line
+                endings of the first line.
+
+            allow_os_copy (bool, optional):
+                Whether the content may be copied by the operating system,
+                if both the file and the stream are backed by file
+                descriptors.
+
+            **options (dict):
+                Additional options for the header.
+
+        Raises:
+            pydiffx.errors.DiffXContentError:
+                The content was empty.
+
+            OSError:
+                The content could not be read or written.
+        """
+        start = fp.tell()
+        length = fp.seek(0, os.SEEK_END) - start
+
+        if length <= 0:
+            raise DiffXContentError('The text cannot be empty.')
+
+        newline_encoding = encoding or 'ascii'
+
+        if line_endings is None:
+            fp.seek(start)
+            line_endings, newline = self._guess_streamed_line_endings(
+                fp, newline_encoding)
+        else:
+            newline = get_newline_for_type(line_endings,
+                                           encoding=newline_encoding)
+
+        # If the content doesn't end in a newline, we'll need to add one.
+        if length >= len(newline):
+            fp.seek(start + length - len(newline))
+            ends_with_newline = (fp.read(len(newline)) == newline)
+        else:
+            ends_with_newline = False
+
+        if ends_with_newline:
+            suffix = b''
+        else:
+            suffix = newline
+
+        self._write_section_header(section,
+                                   encoding=encoding,
+                                   length=length + len(suffix),
+                                   line_endings=line_endings,
+                                   **options)
+
+        fp.seek(start)
+        copied = 0
+
+        if allow_os_copy:
+            copied = self._copy_with_os(fp, start, length)
+
+        if copied < length:
+            fp.seek(start + copied)
+            self._copy_chunks(fp, length - copied)
+        else:
+            fp.seek(start + length)
+
+        if suffix:
+            self._write(suffix)
+
+        self._finish_write()
+
+    def _guess_streamed_line_endings(self, fp, encoding):
+        """Return the line endings used for the content in a file.
+
+        This will read the file in chunks until the first line ending is
+        found.
+
+        Args:
+            fp (file):
+                The file to read from, positioned at the start of the
+                content.
+
+            encoding (unicode):
+                The encoding of the content.
+
+        Returns:
+            tuple:
+            A 2-tuple of:
+
+            1. The guessed line endings type (as a ``line_endings=`` option
+               value).
+            2. The line ending characters, as a byte string.
+        """
+        unix_newline = get_newline_for_type(LineEndings.UNIX,
+                                            encoding=encoding)
+        tail_len = len(get_newline_for_type(LineEndings.DOS,
+                                            encoding=encoding))
+        chunk_size = self.COPY_CHUNK_SIZE
+        tail = b''
+
+        while True:
+            chunk = fp.read(chunk_size)
+
+            if not chunk:
+                break
+
+            # Keep the end of the previous chunk, so we can find line
+            # endings spanning both chunks.
+            window = tail + chunk
+
+            if window.find(unix_newline) != -1:
+                return guess_line_endings(window, encoding=encoding)
+
+            tail = window[-tail_len:]
+
+        return guess_line_endings(tail, encoding=encoding)
+
+    def _copy_with_os(self, fp, offset, length):
+        """Copy content from a file to the stream using the operating system.
+
+        This uses :py:func:`os.copy_file_range` or :py:func:`os.sendfile`
+        (depending on availability and support for the file types) to copy
+        the content without reading it into Python. This is only possible
+        if both the file and the stream are backed by file descriptors.
+
+        Args:
+            fp (file):
+                The file to copy from.
+
+            offset (int):
+                The offset of the content in the file.
+
+            length (int):
+                The length of the content to copy.
+
+        Returns:
+            int:
+            The number of bytes copied. The caller is responsible for copying
+            anything remaining.
+        """
+        out_fp = self.fp
+
+        try:
+            in_fd = fp.fileno()
+            out_fd = out_fp.fileno()
+        except (AttributeError, OSError, ValueError):
+            return 0
+
+        if not stat.S_ISREG(os.fstat(in_fd).st_mode):
+            return 0
+
+        # Anything buffered must be written before the copied content.
+        self._write_pending()
+        out_fp.flush()
+
+        copied = 0
+
+        for copy_func in (_copy_file_range, _sendfile):
+            copied += copy_func(in_fd, out_fd, offset + copied,
+                                length - copied)
+
+            if copied >= length:
+                break
+
+        if copied > 0 and _is_seekable(out_fp):
+            # The file descriptor's offset was advanced directly. Make sure
+            # the stream knows where it is.
+            out_fp.seek(os.lseek(out_fd, 0, os.SEEK_CUR))
+
+        self.bytes_written += copied
+
+        return copied
+
+    def _copy_chunks(self, fp, length):
+        """Copy content from a file to the stream in bounded chunks.
+
+        Args:
+            fp (file):
+                The file to copy from, positioned at the start of the
+                content.
+
+            length (int):
+                The length of the content to copy.
+        """
+        chunk_size = self.COPY_CHUNK_SIZE
+
+        while length > 0:
+            chunk = fp.read(min(length, chunk_size))
+
+            if not chunk:
+                break
+
+            self._write(chunk)
+            length -= len(chunk)
 
     def _build_section(self, level, section_name):
         """Return a section with the given name and level.
@@ -462,6 +933,7 @@ class DiffXWriter(object):
         self._write_section_header(section=section,
                                    encoding=encoding,
                                    **options)
+        self._finish_write()
 
     def _new_content_section(self,
                              section_name,
@@ -478,7 +950,7 @@ class DiffXWriter(object):
             section_name (unicode):
                 The name of the section being written.
 
-            content (bytes or unicode):
+            content (bytes or bytearray or memoryview or unicode):
                 The content to write to the section.
 
             line_endings (unicode, optional):
@@ -517,7 +989,7 @@ class DiffXWriter(object):
                                       section_name)
         self._validate_section(section)
 
-        content, line_endings = self._prepare_content(
+        content, suffix, line_endings = self._prepare_content(
             content,
             line_endings=line_endings,
             indent=indent,
@@ -527,18 +999,30 @@ class DiffXWriter(object):
         header_options = dict(options, **{
             'encoding': encoding,
             'indent': indent,
-            'length': len(content),
+            'length': len(content) + len(suffix),
         })
 
         if write_line_endings_option:
             header_options['line_endings'] = line_endings
 
         self._write_section_header(section, **header_options)
-        self.fp.write(content)
+        self._write(content)
+
+        if suffix:
+            self._write(suffix)
+
+        self._finish_write()
 
     def _write_section_header(self, section, **options):
         """Write a section header to the stream.
 
+        Options are written in sorted order, skipping any that are ``None``.
+
+        This is called for every section, so the header is built from a
+        template of precomputed byte strings for the section ID and the
+        option names, in sorted order. Templates are cached for each section
+        ID and set of option names.
+
         Args:
             section (unicode):
                 The section being written.
@@ -546,23 +1030,162 @@ class DiffXWriter(object):
             **options (dict):
                 Additional options to provide in the header.
         """
-        options_str = ', '.join(
-            '%s=%s' % (_key, _value)
-            for _key, _value in sorted(options.items(),
-                                       key=lambda pair: pair[0])
-            if _value is not None
-        )
+        template_key = (section, tuple(options))
+
+        try:
+            prefix, option_prefixes = _HEADER_TEMPLATES[template_key]
+        except KeyError:
+            prefix = b'#%s:' % section.encode('ascii')
+            option_prefixes = tuple(
+                (_key, b'%s=' % _key.encode('ascii'))
+                for _key in sorted(options)
+            )
+            _HEADER_TEMPLATES[template_key] = (prefix, option_prefixes)
+
+        option_parts = []
+
+        for key, key_prefix in option_prefixes:
+            value = options[key]
+
+            if value is not None:
+                if type(value) is int:
+                    option_parts.append(b'%s%d' % (key_prefix, value))
+                else:
+                    option_parts.append(key_prefix +
+                                        str(value).encode('ascii'))
+
+        if option_parts:
+            self._write(b'%s %s\n' % (prefix, b', '.join(option_parts)))
+        else:
+            self._write(prefix + b'\n')
+
+        self._prev_section = section
 
-        fp = self.fp
-        fp.write(b'#%s:' % section.encode('ascii'))
+    def _write(self, data):
+        """Queue data to be written to the stream.
 
-        if options_str:
-            fp.write(b' ')
-            fp.write(options_str.encode('ascii'))
+        If the buffer is full, the buffered data will be written. If output
+        isn't being buffered, queued data will still be written once it
+        exceeds :py:attr:`MAX_COALESCE_SIZE`, so that streamed content isn't
+        held in memory.
 
-        fp.write(b'\n')
+        Args:
+            data (bytes or memoryview):
+                The data to write.
+        """
+        self._pending.append(data)
+        self._pending_len += len(data)
 
-        self._prev_section = section
+        if self._pending_len >= (self.buffer_size or self.MAX_COALESCE_SIZE):
+            self._write_pending()
+
+    def _finish_write(self):
+        """Finish writing a section.
+
+        If output isn't being buffered, any queued data will be written to
+        the stream.
+        """
+        if not self.buffer_size:
+            self._write_pending()
+
+    def _write_pending(self):
+        """Write all queued data to the stream.
+
+        Consecutive pieces of data are joined into a single write, unless
+        they're larger than :py:attr:`MAX_COALESCE_SIZE`, in which case
+        they're written on their own to avoid copying them.
+        """
+        pending = self._pending
+
+        if not pending:
+            return
+
+        self._pending = []
+        self._pending_len = 0
+
+        max_coalesce_size = self.MAX_COALESCE_SIZE
+        group = []
+        group_len = 0
+
+        for data in pending:
+            data_len = len(data)
+
+            if group and group_len + data_len > max_coalesce_size:
+                self._write_to_stream(group)
+                group = []
+                group_len = 0
+
+            group.append(data)
+            group_len += data_len
+
+        self._write_to_stream(group)
+
+    def _write_to_stream(self, group):
+        """Write a group of data to the stream.
+
+        Unbuffered streams (such as sockets or raw file descriptors) may
+        only write part of the data in a call. The rest will be written in
+        further calls, until all data has been written.
+
+        Streams returning ``None`` from ``write()`` are assumed to have
+        written all the data, as many file-like objects don't return the
+        number of bytes written. This means non-blocking streams are not
+        supported.
+
+        Args:
+            group (list of bytes):
+                The data to write.
+
+        Raises:
+            OSError:
+                The data could not be written to the stream. This includes
+                streams that stop accepting data before all of it has been
+                written.
+        """
+        if len(group) == 1:
+            data = group[0]
+        else:
+            data = b''.join(group)
+
+        write = self.fp.write
+        data_len = len(data)
+        written = 0
+        view = None
+
+        try:
+            while True:
+                if written == 0:
+                    result = write(data)
+                else:
+                    if view is None:
+                        view = memoryview(data)
+
+                    result = write(view[written:])
+
+                self.write_calls += 1
+
+                if result is None:
+                    written = data_len
+                elif result == 0:
+                    # Trying again would loop forever.
+                    raise OSError(
+                        'The stream did not accept any more data after '
+                        '%(written)d of %(length)d bytes'
+                        % {
+                            'length': data_len,
+                            'written': written,
+                        })
+                else:
+                    written += result
+
+                if written >= data_len:
+                    break
+        finally:
+            if view is not None:
+                view.release()
+
+            # Only count what made it to the stream, in case of an error.
+            self.bytes_written += written
 
     def _prepare_content(self, content, indent=None, line_endings=None,
                          encoding=None, inherit_encoding=True):
@@ -570,12 +1193,14 @@ class DiffXWriter(object):
 
         This will take care to encode and indent the content, if needed, and
         add any necessary newline if missing. The result will be a byte string
-        that can be written to the stream.
+        that can be written to the stream, followed by any newline that must
+        be written after it. The newline is returned separately, so that
+        large content doesn't need to be copied in order to append it.
 
         The text cannot be empty.
 
         Args:
-            content (bytes or unicode):
+            content (bytes or bytearray or memoryview or unicode):
                 The content to prepare.
 
             indent (int, optional):
@@ -596,10 +1221,12 @@ class DiffXWriter(object):
 
         Returns:
             tuple:
-            A 2-tuple containing:
+            A 3-tuple containing:
 
             1. The prepared content as a byte string.
-            2. The newline format, for the header.
+            2. The newline to write after the content, or an empty byte
+               string if the content already ends with one.
+            3. The newline format, for the header.
 
         Raises:
             pydiffx.errors.DiffXOptionValueError:
@@ -615,7 +1242,7 @@ class DiffXWriter(object):
                 value=line_endings,
                 choices=LineEndings.VALID_VALUES)
 
-        assert isinstance(content, (bytes, str))
+        assert isinstance(content, (bytes, bytearray, memoryview, str))
 
         if not encoding and inherit_encoding:
             encoding = self._cur_encoding
@@ -632,7 +1259,7 @@ class DiffXWriter(object):
             line_endings, newline = guess_line_endings(
                 content,
                 encoding=newline_encoding)
-        elif isinstance(content, bytes):
+        elif not isinstance(content, str):
             newline = newline.encode(newline_encoding)
 
         # Encode the content and newline in the specified encoding.
@@ -648,25 +1275,139 @@ class DiffXWriter(object):
                             encoding=encoding)
 
         # If the content doesn't end in a newline, we'll need to add one.
-        if not content.endswith(newline):
-            content += newline
+        if isinstance(content, memoryview):
+            # Memory views can't be searched, but can be compared.
+            ends_with_newline = (
+                content[len(content) - len(newline):] == newline)
+        else:
+            ends_with_newline = content.endswith(newline)
 
-        # Write the string to a byte stream. This is more efficient than
-        # building and joining lists of byte strings, or concatenating them.
+        if ends_with_newline:
+            suffix = b''
+        else:
+            suffix = newline
+
+        # Indented content is indented as a whole, with the missing
+        # newline included. Otherwise, the content is returned unchanged,
+        # with the newline returned separately so the content isn't copied.
         if indent:
-            stream = io.BytesIO()
-            indent_str = b' ' * indent
-            lines = split_lines(content,
-                                keep_ends=True,
-                                newline=newline)
-
-            for line in lines:
-                stream.write(indent_str)
-                stream.write(line)
-
-            result = stream.getvalue()
-            stream.close()
+            result = indent_lines(content + suffix, indent, newline)
+            suffix = b''
         else:
             result = content
 
-        return result, line_endings
+        return result, suffix, line_endings
+
+
+#: Cached header templates, keyed off by section ID and option names.
+#:
+#: Each template contains the start of the header and the start of each
+#: option, in sorted order.
+#:
+#: Type:
+#:     dict
+_HEADER_TEMPLATES = {}
+
+
+def _is_seekable(fp):
+    """Return whether a file supports seeking.
+
+    Args:
+        fp (file):
+            The file to check.
+
+    Returns:
+        bool:
+        ``True`` if the file supports seeking.
+    """
+    try:
+        return fp.seekable()
+    except (AttributeError, OSError, ValueError):
+        return False
+
+
+def _copy_file_range(in_fd, out_fd, offset, length):
+    """Copy data between file descriptors using os.copy_file_range().
+
+    The output file descriptor's offset will be advanced.
+
+    Args:
+        in_fd (int):
+            The file descriptor to copy from.
+
+        out_fd (int):
+            The file descriptor to copy to.
+
+        offset (int):
+            The offset to copy from.
+
+        length (int):
+            The number of bytes to copy.
+
+    Returns:
+        int:
+        The number of bytes copied. This will be less than ``length`` if
+        the copy isn't supported, or failed part of the way through.
+    """
+    copy_file_range = getattr(os, 'copy_file_range', None)
+    copied = 0
+
+    if copy_file_range is not None:
+        try:
+            while copied < length:
+                num_bytes = copy_file_range(in_fd, out_fd, length - copied,
+                                            offset + copied)
+
+                if num_bytes == 0:
+                    break
+
+                copied += num_bytes
+        except OSError:
+            # This may not be supported for these files (for instance, on
+            # some kernels when copying across filesystems).
+            pass
+
+    return copied
+
+
+def _sendfile(in_fd, out_fd, offset, length):
+    """Copy data between file descriptors using os.sendfile().
+
+    The output file descriptor's offset will be advanced.
+
+    Args:
+        in_fd (int):
+            The file descriptor to copy from.
+
+        out_fd (int):
+            The file descriptor to copy to.
+
+        offset (int):
+            The offset to copy from.
+
+        length (int):
+            The number of bytes to copy.
+
+    Returns:
+        int:
+        The number of bytes copied. This will be less than ``length`` if
+        the copy isn't supported, or failed part of the way through.
+    """
+    sendfile = getattr(os, 'sendfile', None)
+    copied = 0
+
+    if sendfile is not None:
+        try:
+            while copied < length:
+                num_bytes = sendfile(out_fd, in_fd, offset + copied,
+                                     length - copied)
+
+                if num_bytes == 0:
+                    break
+
+                copied += num_bytes
+        except OSError:
+            # Some platforms only support sending to sockets.
+            pass
+
+    return copied